@@ -0,0 +1,183 @@
+import asyncio
+import os
+from collections import deque
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Funded accounts kept ready (0 funds each account on request), and the level that triggers a refill
+ACCOUNT_POOL_SIZE = int(os.getenv("ACCOUNT_POOL_SIZE", "20"))
+ACCOUNT_POOL_LOW_WATER = int(os.getenv("ACCOUNT_POOL_LOW_WATER", "5"))
+# Accounts funded per batch: concurrent faucet mints, or recipients of one treasury transfer
+ACCOUNT_POOL_BATCH = int(os.getenv("ACCOUNT_POOL_BATCH", "10"))
+# Octas given to each new account (1 APT)
+ACCOUNT_POOL_FUND_AMOUNT = int(os.getenv("ACCOUNT_POOL_FUND_AMOUNT", "100000000"))
+# Fund from this account with batch transfers instead of the faucet (e.g. on networks without one)
+ACCOUNT_POOL_TREASURY_KEY = os.getenv("ACCOUNT_POOL_TREASURY_KEY", "")
+# Seconds between pool checks, and the back-off after a failed refill
+ACCOUNT_POOL_INTERVAL = float(os.getenv("ACCOUNT_POOL_INTERVAL", "5"))
+# Seconds acquire() waits to fund an account on the spot when the pool is empty
+ACCOUNT_POOL_ACQUIRE_TIMEOUT = float(os.getenv("ACCOUNT_POOL_ACQUIRE_TIMEOUT", "30"))
+
+
+def _generate_account():
+    from aptos_sdk.account import Account
+    return Account.generate()
+
+
+class FaucetFunder:
+    """Fund a batch of addresses with concurrent faucet mints"""
+
+    def __init__(self, faucet, amount: int = ACCOUNT_POOL_FUND_AMOUNT):
+        # faucet: aptos_sdk FaucetClient, or ledger_simulator.SimulatedFaucet locally
+        self.faucet = faucet
+        self.amount = amount
+
+    async def fund(self, addresses: list) -> list:
+        """Addresses that were funded; failed mints are logged and left out"""
+        results = await asyncio.gather(
+            *(self.faucet.fund_account(address, self.amount) for address in addresses),
+            return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.warning("Faucet mints failed", extra=fields(failed=len(failures), error=str(failures[0])))
+        return [address for address, result in zip(addresses, results) if not isinstance(result, Exception)]
+
+
+class TreasuryFunder:
+    """Fund a batch of addresses with one 0x1::aptos_account::batch_transfer from a treasury account"""
+
+    def __init__(self, clients, treasury, amount: int = ACCOUNT_POOL_FUND_AMOUNT):
+        self.clients = clients
+        self.treasury = treasury
+        self.amount = amount
+        # One transfer at a time, so treasury sequence numbers never collide
+        self._lock = asyncio.Lock()
+
+    async def fund(self, addresses: list) -> list:
+        from aptos_sdk.account_address import AccountAddress
+        from aptos_sdk.bcs import Serializer
+        from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
+        payload = TransactionPayload(EntryFunction.natural(
+            "0x1::aptos_account",
+            "batch_transfer",
+            [],
+            [
+                TransactionArgument([AccountAddress.from_str_relaxed(address) for address in addresses],
+                                    Serializer.sequence_serializer(Serializer.struct)),
+                TransactionArgument([self.amount] * len(addresses), Serializer.sequence_serializer(Serializer.u64))
+            ]
+        ))
+        async with self._lock:
+            txn_hash = await self.clients.sign_and_submit(self.treasury, payload)
+            await self.clients.wait_for_transaction(txn_hash)
+        return list(addresses)
+
+
+def funder_for(clients, amount: int = ACCOUNT_POOL_FUND_AMOUNT):
+    """Treasury transfers when ACCOUNT_POOL_TREASURY_KEY is set, faucet mints otherwise"""
+    if ACCOUNT_POOL_TREASURY_KEY:
+        from aptos_sdk.account import Account
+        return TreasuryFunder(clients, Account.load_key(ACCOUNT_POOL_TREASURY_KEY), amount)
+    return FaucetFunder(clients.faucet, amount)
+
+
+class AccountPool:
+    """Pre-generated, pre-funded accounts handed out without waiting on the chain
+
+    run() tops the pool up to size in batches whenever it drops below
+    low_water. take() never waits; acquire() falls back to funding one
+    account on the spot when the pool is empty. A funder is any object
+    with async fund(addresses) -> funded addresses.
+
+    Ready accounts live only in memory: a restart loses their keys and
+    the funds sent to them, up to size * the funding amount. Keep size
+    small on networks where those funds are worth something.
+    """
+
+    def __init__(self, funder, size: int = ACCOUNT_POOL_SIZE, low_water: int = ACCOUNT_POOL_LOW_WATER,
+                 batch: int = ACCOUNT_POOL_BATCH, generate=_generate_account):
+        self.funder = funder
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.batch = batch
+        self.generate = generate
+        self._ready = deque()
+        self._loop = None
+        self._wake = None
+        self.handed_out = 0
+        self.funded = 0
+        self.failed = 0
+        self.empty = 0
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def take(self):
+        """A ready account, or None when the pool is empty; safe to call from any thread"""
+        try:
+            account = self._ready.popleft()
+            self.handed_out += 1
+        except IndexError:
+            account = None
+            self.empty += 1
+        if len(self._ready) < self.low_water and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return account
+
+    async def acquire(self, timeout: float = ACCOUNT_POOL_ACQUIRE_TIMEOUT):
+        """A ready account, or a freshly funded one when the pool has run dry"""
+        account = self.take()
+        if account is None:
+            account = self.generate()
+            try:
+                funded = await asyncio.wait_for(self.funder.fund([str(account.address())]), timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"Funding a new account took longer than {timeout}s")
+            if not funded:
+                raise RuntimeError("Could not fund a new account")
+            self.handed_out += 1
+        return account
+
+    async def refill(self) -> int:
+        """Fund one batch of new accounts; returns how many joined the pool"""
+        count = min(self.batch, self.size - len(self._ready))
+        if count <= 0:
+            return 0
+        accounts = {}
+        for _ in range(count):
+            account = self.generate()
+            accounts[str(account.address())] = account
+        funded = await self.funder.fund(list(accounts))
+        self._ready.extend(accounts[address] for address in funded)
+        self.funded += len(funded)
+        self.failed += count - len(funded)
+        return len(funded)
+
+    async def run(self, interval: float = ACCOUNT_POOL_INTERVAL):
+        """Keep the pool topped up until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            if len(self._ready) < self.low_water:
+                try:
+                    # Stop early when a batch funds nothing and retry after the interval
+                    while len(self._ready) < self.size and await self.refill():
+                        pass
+                except Exception as e:
+                    logger.warning("Account pool refill failed", extra=fields(error=str(e), ready=len(self._ready)))
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "ready": len(self._ready),
+            "handed_out": self.handed_out,
+            "funded": self.funded,
+            "failed": self.failed,
+            "empty": self.empty
+        }
@@ -0,0 +1,217 @@
+"""Cohort analytics over student progress.
+
+Progress is loaded once into a columnar ProgressSnapshot (one NumPy array
+per column, one row per lesson completion) and every report is a vectorized
+group-by over those arrays, so a report over the whole student base costs a
+few array passes instead of one get_student_progress call per address:
+
+    python analytics.py --out reports/
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Rows written per chunk when exporting
+EXPORT_CHUNK_ROWS = 100_000
+
+
+class ProgressSnapshot:
+    """Columnar snapshot of registered students, lessons and lesson completions"""
+
+    def __init__(self, students, lesson_ids, titles, lesson_rewards,
+                 completion_students, completion_lessons, completion_rewards, completion_times):
+        # Registered students, including those without completions
+        self.students = np.asarray(students, dtype=object)
+        # Lesson catalog
+        self.lesson_ids = np.asarray(lesson_ids, dtype=np.int64)
+        self.titles = np.asarray(titles, dtype=object)
+        self.lesson_rewards = np.asarray(lesson_rewards, dtype=np.int64)
+        # One entry per completion; students are codes into self.students
+        self.completion_students = np.asarray(completion_students, dtype=np.int64)
+        self.completion_lessons = np.asarray(completion_lessons, dtype=np.int64)
+        self.completion_rewards = np.asarray(completion_rewards, dtype=np.int64)
+        self.completion_times = np.asarray(completion_times, dtype=np.int64)
+
+    @classmethod
+    def from_records(cls, students, lessons, completions):
+        """Build a snapshot from student addresses, lesson dicts and (address, lesson_id, timestamp) tuples"""
+        students = list(students)
+        codes = {address: code for code, address in enumerate(students)}
+        lessons = list(lessons)
+        lesson_ids = np.fromiter((lesson["id"] for lesson in lessons), dtype=np.int64, count=len(lessons))
+        lesson_rewards = np.fromiter((lesson["reward_amount"] for lesson in lessons), dtype=np.int64, count=len(lessons))
+
+        completions = [c for c in completions if c[0] in codes]
+        completion_students = np.fromiter((codes[c[0]] for c in completions), dtype=np.int64, count=len(completions))
+        completion_lessons = np.fromiter((c[1] for c in completions), dtype=np.int64, count=len(completions))
+        completion_times = np.fromiter((c[2] or 0 for c in completions), dtype=np.int64, count=len(completions))
+
+        # Rewards come from the catalog; completions of unknown lessons earn nothing
+        if len(lesson_ids):
+            order = np.argsort(lesson_ids)
+            sorted_ids = lesson_ids[order]
+            position = np.clip(np.searchsorted(sorted_ids, completion_lessons), 0, len(sorted_ids) - 1)
+            known = sorted_ids[position] == completion_lessons
+            completion_rewards = np.where(known, lesson_rewards[order][position], 0)
+        else:
+            completion_rewards = np.zeros(len(completions), dtype=np.int64)
+
+        return cls(
+            students, lesson_ids, [lesson.get("title", "") for lesson in lessons], lesson_rewards,
+            completion_students, completion_lessons, completion_rewards, completion_times
+        )
+
+    @classmethod
+    def from_manager(cls, manager):
+        """Snapshot the in-memory store of a blockchain_manager.BlockchainManager"""
+        # The sharded store has no global order; sort so snapshots are stable
+        students = sorted(manager.students.items())
+        completions = [
+            (address, lesson_id, manager.completed_lessons.get((address, lesson_id)))
+            for address, student in students
+            for lesson_id in list(student["completed_lessons"])
+        ]
+        return cls.from_records([address for address, _ in students], manager.lessons.values(), completions)
+
+    @classmethod
+    def from_store(cls, store):
+        """Snapshot the shared store (students, lessons and lesson_completions namespaces)"""
+        completions = [
+            (record["student_address"], record["lesson_id"], record.get("completed_at"))
+            for _, record in store.items("lesson_completions")
+        ]
+        return cls.from_records(store.keys("students"), [lesson for _, lesson in store.items("lessons")], completions)
+
+    def completions_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "student_address": self.students[self.completion_students],
+            "lesson_id": self.completion_lessons,
+            "reward_amount": self.completion_rewards,
+            "completed_at": pd.to_datetime(self.completion_times, unit="s")
+        })
+
+
+def student_totals(snapshot: ProgressSnapshot) -> pd.DataFrame:
+    """Lessons completed and rewards earned per student"""
+    n = len(snapshot.students)
+    return pd.DataFrame({
+        "student_address": snapshot.students,
+        "lessons_completed": np.bincount(snapshot.completion_students, minlength=n),
+        "total_rewards": np.bincount(snapshot.completion_students, weights=snapshot.completion_rewards, minlength=n).astype(np.int64)
+    })
+
+
+def completion_rates(snapshot: ProgressSnapshot) -> pd.DataFrame:
+    """Share of registered students that completed each lesson"""
+    lessons, counts = np.unique(snapshot.completion_lessons, return_counts=True)
+    completed = pd.Series(counts, index=lessons)
+    frame = pd.DataFrame({"lesson_id": snapshot.lesson_ids, "title": snapshot.titles})
+    frame["completions"] = completed.reindex(snapshot.lesson_ids, fill_value=0).to_numpy()
+    frame["completion_rate"] = frame["completions"] / max(len(snapshot.students), 1)
+    return frame.sort_values("lesson_id", ignore_index=True)
+
+
+def reward_distribution(snapshot: ProgressSnapshot, quantiles=(0.5, 0.9, 0.99)) -> dict:
+    """Summary statistics of total rewards per student"""
+    totals = np.bincount(snapshot.completion_students, weights=snapshot.completion_rewards,
+                         minlength=len(snapshot.students))
+    if len(totals) == 0:
+        return {"students": 0, "total": 0, "mean": 0.0, "max": 0, "quantiles": {}}
+    return {
+        "students": int(len(totals)),
+        "students_rewarded": int(np.count_nonzero(totals)),
+        "total": int(totals.sum()),
+        "mean": float(totals.mean()),
+        "max": int(totals.max()),
+        "quantiles": {str(q): float(v) for q, v in zip(quantiles, np.quantile(totals, quantiles))}
+    }
+
+
+def lesson_funnel(snapshot: ProgressSnapshot) -> pd.DataFrame:
+    """How many students completed every lesson up to each step, in lesson id order"""
+    steps = np.sort(snapshot.lesson_ids)
+    n_students = len(snapshot.students)
+    if len(steps) == 0:
+        return pd.DataFrame(columns=["step", "lesson_id", "students", "conversion"])
+
+    step_of = np.searchsorted(steps, snapshot.completion_lessons)
+    known = (step_of < len(steps)) & (steps[np.clip(step_of, 0, len(steps) - 1)] == snapshot.completion_lessons)
+    # Distinct (student, step) pairs sorted by student, then step: memory follows completions, not students x lessons
+    pairs = np.unique(snapshot.completion_students[known].astype(np.int64) * len(steps) + step_of[known])
+    students, step_of = np.divmod(pairs, len(steps))
+    # A student's k-th completed step is step k exactly while no earlier step is missing
+    _, starts, counts = np.unique(students, return_index=True, return_counts=True)
+    rank = np.arange(len(pairs)) - np.repeat(starts, counts)
+    depth = np.bincount(students[rank == step_of], minlength=n_students)
+    # Students whose unbroken run of steps reaches each step
+    reached = np.bincount(depth, minlength=len(steps) + 1)[::-1].cumsum()[::-1][1:]
+
+    previous = np.concatenate(([n_students], reached[:-1]))
+    return pd.DataFrame({
+        "step": np.arange(1, len(steps) + 1),
+        "lesson_id": steps,
+        "students": reached,
+        "conversion": np.divide(reached, previous, out=np.zeros(len(steps)), where=previous > 0)
+    })
+
+
+def completions_over_time(snapshot: ProgressSnapshot, freq: str = "D") -> pd.DataFrame:
+    """Completions and rewards per period"""
+    frame = pd.DataFrame({
+        "period": pd.to_datetime(snapshot.completion_times, unit="s").floor(freq),
+        "reward_amount": snapshot.completion_rewards
+    })
+    return frame.groupby("period").agg(
+        completions=("reward_amount", "size"), rewards=("reward_amount", "sum")
+    ).reset_index()
+
+
+def export_csv(frame: pd.DataFrame, path: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Write a frame to CSV in chunks so large reports never format in one piece"""
+    with open(path, "w", newline="") as f:
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            frame.iloc[start:start + chunk_rows].to_csv(f, header=start == 0, index=False)
+
+
+def export_parquet(frame: pd.DataFrame, path: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Write a frame to Parquet one row group per chunk (requires pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, len(frame), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(frame.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cohort analytics over student progress")
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    args = parser.parse_args()
+
+    from shared_state import SharedStore
+    snapshot = ProgressSnapshot.from_store(SharedStore())
+    os.makedirs(args.out, exist_ok=True)
+    export = export_parquet if args.format == "parquet" else export_csv
+
+    reports = {
+        "student_totals": student_totals(snapshot),
+        "completion_rates": completion_rates(snapshot),
+        "lesson_funnel": lesson_funnel(snapshot),
+        "completions_over_time": completions_over_time(snapshot)
+    }
+    for name, frame in reports.items():
+        path = os.path.join(args.out, f"{name}.{args.format}")
+        export(frame, path)
+        print(f"Wrote {len(frame)} rows to {path}")
+    print(f"Reward distribution: {reward_distribution(snapshot)}")
+
+
+if __name__ == "__main__":
+    main()
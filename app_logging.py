@@ -0,0 +1,159 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Records buffered for the writer thread; past this, new records are dropped and counted
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of DEBUG records kept (1.0 keeps all)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+# Field names whose values never reach the log. The frontend sends private
+# keys in the public_key field, so that is redacted too.
+REDACTED_FIELDS = {"private_key", "public_key", "privatekey", "secret", "signature", "seed", "mnemonic",
+                   "password", "token", "authorization"}
+REDACTED = "[REDACTED]"
+
+ROOT_LOGGER = "aptos_app"
+
+_listener = None
+_handler = None
+
+
+def redact(value):
+    """Copy of a dict/list structure with key material replaced"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACTED_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def fields(**values) -> dict:
+    """Structured fields for a log call: logger.info("msg", extra=fields(address=...))"""
+    return {"fields": values}
+
+
+class DebugSampler(logging.Filter):
+    """Keep only a fraction of DEBUG records"""
+
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE, rng: random.Random = None):
+        super().__init__()
+        self.rate = rate
+        self.rng = rng or random.Random()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or self.rng.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to a bounded queue without ever blocking the caller"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the message here; JSON formatting and redaction happen on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped > self._reported:
+                # The writer caught up: say how much was lost first
+                dropped = self.dropped
+                notice = logging.LogRecord(record.name, logging.WARNING, __file__, 0,
+                                           f"{dropped - self._reported} log records dropped", None, None)
+                self.queue.put_nowait(notice)
+                self._reported = dropped
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with redacted structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(redact(getattr(record, "fields", {})))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for local development, with the same redaction"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        extra = redact(getattr(record, "fields", {}))
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure(stream=None, level: str = LOG_LEVEL, log_format: str = LOG_FORMAT,
+              queue_size: int = LOG_QUEUE_SIZE, debug_sample_rate: float = LOG_DEBUG_SAMPLE_RATE):
+    """Route the application's loggers through a bounded queue to a writer thread"""
+    global _listener, _handler
+    shutdown()
+
+    sink = logging.StreamHandler(stream or sys.stderr)
+    sink.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(queue_size))
+    _handler.addFilter(DebugSampler(debug_sample_rate))
+    _listener = logging.handlers.QueueListener(_handler.queue, sink)
+    _listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [_handler]
+    root.setLevel(level)
+    root.propagate = False
+
+
+def shutdown():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the application root, configured on first use"""
+    if _handler is None:
+        configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0
+    }
+
+
+atexit.register(shutdown)
@@ -0,0 +1,254 @@
+import asyncio
+import os
+import threading
+from node_pool import DEFAULT_NODE_URL, NodePool, node_urls_from_env
+from resilience import RetryPolicy
+from resource_cache import ALL_RESOURCES, ResourceCache, StaleReadError
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Default Aptos faucet
+DEFAULT_FAUCET_URL = "https://faucet.devnet.aptoslabs.com"
+
+
+class BackgroundLoop:
+    """Run an asyncio event loop in a daemon thread so sync code can await coroutines"""
+
+    def __init__(self, name: str = "aptos-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Run a coroutine on the loop and block until it finishes"""
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        """Stop the loop and wait for its thread to exit"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+class AptosClients:
+    """Lazily constructed Aptos REST and faucet clients over a pool of fullnodes"""
+
+    def __init__(self, node_urls=None, faucet_url: str = None):
+        self.pool = NodePool(node_urls or node_urls_from_env(DEFAULT_NODE_URL))
+        # Retries with backoff on top of per-call failover; one budget for all calls
+        self.retry = RetryPolicy()
+        # Resource reads cached with the ledger version they were read at
+        self.resources = ResourceCache(self._fetch_versioned, self._probe_account)
+        self.node_url = self.pool.endpoints[0].url
+        self.faucet_url = faucet_url or os.getenv("FAUCET_URL", DEFAULT_FAUCET_URL)
+        # listener(txn_hash, raw_transaction) after each signed submission, e.g. to track expiry
+        self.submit_listeners = []
+        self._rest_clients = {}
+        self._faucet = None
+        self._health_task = None
+        self._lock = threading.Lock()
+
+    def client_for(self, endpoint):
+        """REST client for one pool endpoint, created on first use (imports aptos_sdk lazily)"""
+        client = self._rest_clients.get(endpoint.url)
+        if client is None:
+            with self._lock:
+                client = self._rest_clients.get(endpoint.url)
+                if client is None:
+                    from aptos_sdk.async_client import RestClient
+                    client = RestClient(endpoint.url)
+                    self._rest_clients[endpoint.url] = client
+        return client
+
+    @property
+    def rest(self):
+        """REST client for the currently fastest healthy node"""
+        return self.client_for(self.pool.ranked()[0])
+
+    @property
+    def faucet(self):
+        """Faucet client, created on first use"""
+        if self._faucet is None:
+            rest = self.client_for(self.pool.endpoints[0])
+            with self._lock:
+                if self._faucet is None:
+                    from aptos_sdk.async_client import FaucetClient
+                    self._faucet = FaucetClient(self.faucet_url, rest)
+        return self._faucet
+
+    async def sign_and_submit(self, account, payload) -> str:
+        """Sign a BCS transaction for the account and submit it, returning the hash"""
+        signed_transaction = await self.pool.failover(
+            lambda ep: self.client_for(ep).create_bcs_signed_transaction(account, payload)
+        )
+        # Resubmitting the same signed bytes is idempotent, so failover and retries are safe here
+        txn_hash = await self.retry.call(lambda: self.pool.failover(
+            lambda ep: self.client_for(ep).submit_bcs_transaction(signed_transaction)
+        ))
+        for listener in self.submit_listeners:
+            # Listeners may be coroutines, e.g. to record the hash without blocking the loop
+            result = listener(txn_hash, signed_transaction.transaction)
+            if asyncio.iscoroutine(result):
+                await result
+        return txn_hash
+
+    async def submit_signed(self, signed_bytes: bytes) -> str:
+        """Submit a BCS signed transaction (e.g. from the signing service), returning the hash"""
+        from aptos_sdk.async_client import ApiError
+
+        async def post(ep):
+            client = self.client_for(ep)
+            response = await client.client.post(
+                f"{client.base_url}/transactions",
+                headers={"Content-Type": "application/x.aptos.signed_transaction+bcs"},
+                content=signed_bytes
+            )
+            if response.status_code >= 400:
+                raise ApiError(response.text, response.status_code)
+            return response.json()["hash"]
+
+        return await self.retry.call(lambda: self.pool.failover(post))
+
+    async def submit_transaction(self, account, payload: dict) -> str:
+        """Submit a JSON entry function payload with failover"""
+        return await self.pool.failover(lambda ep: self.client_for(ep).submit_transaction(account, payload))
+
+    async def wait_for_transaction(self, txn_hash: str):
+        return await self.pool.failover(lambda ep: self.client_for(ep).wait_for_transaction(txn_hash))
+
+    async def account_resources(self, address) -> list:
+        """Hedged read of all resources under an account"""
+        return await self.retry.call(lambda: self.pool.hedged(
+            lambda ep: self.client_for(ep).account_resources(address)
+        ))
+
+    async def account_resource(self, address, resource_type: str) -> dict:
+        """Hedged read of a single resource"""
+        return await self.retry.call(lambda: self.pool.hedged(
+            lambda ep: self.client_for(ep).account_resource(address, resource_type)
+        ))
+
+    async def _get_versioned(self, path: str, min_version: int = None):
+        """GET a node path, returning the JSON body and the ledger version it was read at"""
+        from aptos_sdk.async_client import ApiError
+
+        async def get(ep):
+            client = self.client_for(ep)
+            response = await client.client.get(f"{client.base_url}{path}")
+            if response.status_code >= 400:
+                raise ApiError(response.text, response.status_code)
+            ledger_version = int(response.headers.get("x-aptos-ledger-version", 0))
+            if min_version is not None and ledger_version < min_version:
+                raise StaleReadError(ledger_version, min_version)
+            return response.json(), ledger_version
+
+        return await self.retry.call(lambda: self.pool.hedged(get))
+
+    async def _probe_account(self, address, min_version: int = None):
+        account, ledger_version = await self._get_versioned(f"/accounts/{address}", min_version)
+        return int(account["sequence_number"]), ledger_version
+
+    async def _fetch_versioned(self, address, resource_type: str, min_version: int = None):
+        if resource_type == ALL_RESOURCES:
+            resources, ledger_version = await self._get_versioned(f"/accounts/{address}/resources", min_version)
+            # The account's sequence number comes in the same snapshot
+            account = next((r for r in resources if r["type"] == "0x1::account::Account"), None)
+            sequence_number = int(account["data"]["sequence_number"]) if account else None
+            return resources, ledger_version, sequence_number
+        # Read the sequence number first: if it moves during the fetch, the next probe refetches
+        sequence_number, _ = await self._probe_account(address, min_version)
+        resource, ledger_version = await self._get_versioned(f"/accounts/{address}/resource/{resource_type}", min_version)
+        return resource, ledger_version, sequence_number
+
+    async def cached_account_resources(self, address, min_version: int = None) -> list:
+        """All resources under an account, served from the version-aware cache when current"""
+        return await self.resources.get(str(address), ALL_RESOURCES, min_version)
+
+    async def cached_account_resource(self, address, resource_type: str, min_version: int = None) -> dict:
+        """One resource, served from the version-aware cache when current"""
+        return await self.resources.get(str(address), resource_type, min_version)
+
+    async def invalidate_account(self, address):
+        """Forget cached resources of an account after writing to it"""
+        self.resources.invalidate(str(address))
+
+    async def fetch_transaction(self, txn_hash: str):
+        """Get a transaction by hash, or None if the node does not know it yet"""
+        from aptos_sdk.async_client import ApiError
+        try:
+            return await self.retry.call(lambda: self.pool.hedged(
+                lambda ep: self.client_for(ep).transaction_by_hash(txn_hash)
+            ))
+        except ApiError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def _ledger_version(self, endpoint) -> int:
+        info = await self.client_for(endpoint).info()
+        return int(info["ledger_version"])
+
+    def start_health_checks(self, interval: float = 10.0):
+        """Start periodic node health and lag checks on the running loop"""
+        if self._health_task is None and len(self.pool.endpoints) > 1:
+            self._health_task = asyncio.ensure_future(
+                self.pool.run_health_checks(self._ledger_version, interval)
+            )
+
+    async def warm_up(self):
+        """Import the SDK and open a connection to every node ahead of traffic"""
+        try:
+            self.faucet
+            await self.pool.check_health(self._ledger_version)
+        except Exception as e:
+            logger.warning("Warm-up failed, continuing with lazy connect", extra=fields(error=str(e)))
+
+    async def close(self):
+        """Close the underlying HTTP connection pools"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        clients, self._rest_clients = self._rest_clients, {}
+        for client in clients.values():
+            await client.close()
+        self._faucet = None
+
+
+class AptosRuntime:
+    """One event loop thread plus the Aptos clients bound to it"""
+
+    def __init__(self, node_urls=None, faucet_url: str = None):
+        self.loop = BackgroundLoop()
+        self.clients = AptosClients(node_urls, faucet_url)
+        self.loop.loop.call_soon_threadsafe(self.clients.start_health_checks)
+
+    def run(self, coro, timeout: float = None):
+        """Run a coroutine against the clients and wait for the result"""
+        return self.loop.run(coro, timeout)
+
+    def close(self):
+        """Release connection pools and stop the loop thread"""
+        self.loop.run(self.clients.close(), timeout=5)
+        self.loop.stop()
+
+
+class BlockingClients:
+    """Blocking facade over a runtime's AptosClients for sync callers"""
+
+    def __init__(self, runtime: AptosRuntime):
+        self._runtime = runtime
+
+    def __getattr__(self, name):
+        method = getattr(self._runtime.clients, name)
+
+        def call(*args, **kwargs):
+            return self._runtime.run(method(*args, **kwargs))
+        return call
@@ -0,0 +1,89 @@
+"""Measure bytes on the wire and CPU per response for the /lessons response path.
+
+Usage:
+    python benchmarks/responses.py
+    python benchmarks/responses.py --lessons 5000 --iterations 200
+
+Compares serializing the lesson list on every request (stdlib json, orjson)
+with the precomputed body path, for identity, gzip and brotli encodings and
+for a conditional request answered with 304.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_response
+from fast_response import BodyCache, dumps, etag_matches
+
+MODULE = "0x" + "c" * 64 + "::LearningApp"
+
+
+def lesson_catalog(count: int) -> list:
+    """Synthetic module resources shaped like the node's /accounts/{address}/resources"""
+    return [
+        {
+            "type": f"{MODULE}::Lesson{i}",
+            "data": {
+                "id": str(i),
+                "title": f"Lesson {i}: Understanding blockchain concept number {i}",
+                "description": "Learn how transactions, accounts and resources fit together. " * 4,
+                "reward_amount": str(10 + i % 50),
+                "creation_time": str(1_700_000_000 + i)
+            }
+        }
+        for i in range(count)
+    ]
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    """CPU microseconds per call"""
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return round((time.process_time() - start) / iterations * 1e6, 1)
+
+
+def run(lessons: int, iterations: int) -> list:
+    resources = lesson_catalog(lessons)
+    cache = BodyCache()
+    body = cache.get("lessons", resources)
+    rows = []
+
+    def row(name, size, fn):
+        rows.append({"path": name, "bytes": size, "cpu_us": cpu_per_call(fn, iterations)})
+
+    stdlib = json.dumps(resources).encode()
+    row("stdlib json, identity", len(stdlib), lambda: json.dumps(resources).encode())
+    row("stdlib json + gzip", len(gzip.compress(stdlib, 6)),
+        lambda: gzip.compress(json.dumps(resources).encode(), 6))
+    if fast_response.HAS_ORJSON:
+        row("orjson, identity", len(dumps(resources)), lambda: dumps(resources))
+
+    row("precomputed, identity", len(body.encoded(None)), lambda: cache.get("lessons", resources).encoded(None))
+    row("precomputed, gzip", len(body.encoded("gzip")), lambda: cache.get("lessons", resources).encoded("gzip"))
+    if fast_response.brotli is not None:
+        row("precomputed, br", len(body.encoded("br")), lambda: cache.get("lessons", resources).encoded("br"))
+    row("If-None-Match -> 304", 0, lambda: etag_matches(body.etag, cache.get("lessons", resources).etag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON response path")
+    parser.add_argument("--lessons", type=int, default=1000, help="Lessons in the synthetic catalog")
+    parser.add_argument("--iterations", type=int, default=100, help="Responses per measurement")
+    args = parser.parse_args()
+
+    print(f"{args.lessons} lessons, {args.iterations} responses per row "
+          f"(orjson: {'yes' if fast_response.HAS_ORJSON else 'no'}, brotli: {'yes' if fast_response.brotli else 'no'})")
+    print(f"{'path':<26} {'bytes':>10} {'cpu us/resp':>12}")
+    for result in run(args.lessons, args.iterations):
+        print(f"{result['path']:<26} {result['bytes']:>10} {result['cpu_us']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Measure API cold start: import-time breakdown and time to first response.
+
+Usage:
+    python benchmarks/startup.py server
+    python benchmarks/startup.py tempCodeRunnerFile --record
+
+With --record the result is appended to benchmarks/startup_history.jsonl
+together with the current git revision, so startup cost can be compared
+across releases.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(ROOT, "benchmarks", "startup_history.jsonl")
+
+
+def import_breakdown(module: str, top: int = 15) -> dict:
+    """Run `python -X importtime -c "import <module>"` and aggregate by top-level package"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    # Lines look like: "import time:       self [us] |  cumulative | imported package"
+    packages = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in ranked}
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(module: str, path: str = "/", timeout: float = 30.0) -> float:
+    """Start uvicorn for the module and time until the first HTTP response"""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                # Any status code counts: we only care that the app answered
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1)
+                return round((time.perf_counter() - start) * 1000, 1)
+            except urllib.error.HTTPError:
+                return round((time.perf_counter() - start) * 1000, 1)
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        raise TimeoutError(f"{module} did not respond within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--tags", "--always", "--dirty"],
+            cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API process startup time")
+    parser.add_argument("module", nargs="?", default="server", help="Module exposing a FastAPI `app`")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages in the breakdown")
+    parser.add_argument("--record", action="store_true", help="Append the result to the history file")
+    args = parser.parse_args()
+
+    result = {
+        "module": args.module,
+        "revision": git_revision(),
+        "timestamp": int(time.time()),
+        "imports": import_breakdown(args.module, args.top),
+        "first_response_ms": time_to_first_response(args.module)
+    }
+
+    print(f"Import {args.module}: {result['imports']['total_ms']} ms")
+    for name, ms in result["imports"]["top_packages_ms"].items():
+        print(f"  {name:<30} {ms:>8} ms")
+    print(f"Time to first response: {result['first_response_ms']} ms")
+
+    if args.record:
+        with open(HISTORY_FILE, "a") as history:
+            history.write(json.dumps(result) + "\n")
+        print(f"Recorded in {HISTORY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,16 @@ from aptos_sdk.transactions import TransactionArgument, TransactionPayload
 import os
 import json
 import time
+from node_pool import node_urls_from_env
+from resilience import status_code_of
+from registration_filter import RegistrationFilter
+from lesson_content import get_lesson_content
+from app_logging import get_logger, fields
 
-# Aptos blockchain configuration
-NODE_URL = "https://fullnode.devnet.aptoslabs.com"
+logger = get_logger(__name__)
+
+# Aptos blockchain configuration (NODE_URLS may list several fullnodes)
+NODE_URLS = node_urls_from_env("https://fullnode.devnet.aptoslabs.com")
 MODULE_ADDRESS = "CryptoLiteracy"  # Replace with your actual module address
 MODULE_NAME = "LearningApp"
 
@@ -13,6 +20,34 @@ class BlockchainManager:
     def __init__(self):
         self.module_address = MODULE_ADDRESS
         self.module_name = MODULE_NAME
+        self._client = None
+        # Last successful read per key, served (flagged stale) when the node is unavailable
+        self._last_known = {}
+        # Addresses recently confirmed not to be students are answered locally
+        self.registration_filter = RegistrationFilter(use_bloom=False)
+        # Lesson bodies stored off-chain by content hash
+        self.lesson_content = get_lesson_content()
+    
+    def _stale_or_error(self, key, error):
+        """Fall back to the last known data for key, clearly flagged, or report the error"""
+        if key in self._last_known:
+            data, fetched_at = self._last_known[key]
+            return {
+                "success": True,
+                "data": data,
+                "stale": True,
+                "as_of": fetched_at,
+                "error": str(error)
+            }
+        return {"success": False, "error": str(error)}
+    
+    @property
+    def client(self):
+        """Blocking Aptos client over the fullnode pool, created on first use."""
+        if self._client is None:
+            from aptos_runtime import AptosRuntime, BlockingClients
+            self._client = BlockingClients(AptosRuntime(NODE_URLS))
+        return self._client
     
     def create_account_from_private_key(self, private_key_hex):
         """Create an Aptos account from a private key."""
@@ -25,7 +60,7 @@ class BlockchainManager:
             account = Account.load_key(private_key_hex)
             return account
         except Exception as e:
-            print(f"Error creating account: {e}")
+            logger.error("Error creating account", extra=fields(error=str(e)))
             return None
     
     def register_student(self, student_address, private_key_hex=None):
@@ -50,6 +85,8 @@ class BlockchainManager:
                 
                 # Wait for transaction confirmation
                 self.client.wait_for_transaction(txn_hash)
+                self.registration_filter.mark_registered(str(account.address()))
+                self.client.invalidate_account(account.address())
                 
                 return {
                     "success": True,
@@ -75,6 +112,9 @@ class BlockchainManager:
                 if not account:
                     return {"success": False, "error": "Invalid private key"}
                 
+                # Long descriptions go to the blob store and are referenced by hash
+                description = self.lesson_content.store_description(description)
+                
                 # Create transaction payload
                 payload = {
                     "type": "entry_function_payload",
@@ -133,6 +173,7 @@ class BlockchainManager:
                 
                 # Wait for transaction confirmation
                 self.client.wait_for_transaction(txn_hash)
+                self.client.invalidate_account(student_address)
                 
                 return {
                     "success": True,
@@ -151,33 +192,39 @@ class BlockchainManager:
     
     def get_student_progress(self, student_address):
         """Get student progress from the blockchain."""
+        if self.registration_filter.known_unregistered(student_address):
+            return {
+                "success": False,
+                "error": "Student not found on blockchain"
+            }
         try:
             # Create resource path
             resource_path = f"{self.module_address}::{self.module_name}::Student"
             
             # Get resource from blockchain
-            resource = self.client.account_resource(student_address, resource_path)
+            resource = self.client.cached_account_resource(student_address, resource_path)
             
             if resource:
+                self.registration_filter.mark_registered(student_address)
+                self._last_known[("student", student_address)] = (resource["data"], int(time.time()))
                 return {
                     "success": True,
-                    "data": resource.data
+                    "data": resource["data"]
                 }
             else:
+                self.registration_filter.mark_unregistered(student_address)
                 return {
                     "success": False,
                     "error": "Student not found on blockchain"
                 }
         except Exception as e:
-            # If resource doesn't exist, return simulated data
-            return {
-                "success": True,
-                "data": {
-                    "lessons_completed": [],
-                    "total_rewards": 0
-                },
-                "message": "Using simulated data (no blockchain interaction)"
-            }
+            if status_code_of(e) == 404:
+                self.registration_filter.mark_unregistered(student_address)
+                return {
+                    "success": False,
+                    "error": "Student not found on blockchain"
+                }
+            return self._stale_or_error(("student", student_address), e)
     
     def get_lesson(self, lesson_id):
         """Get lesson details from the blockchain."""
@@ -186,14 +233,16 @@ class BlockchainManager:
             resource_path = f"{self.module_address}::{self.module_name}::Lesson"
             
             # Get resource from blockchain
-            resource = self.client.account_resource(self.module_address, resource_path)
+            resource = self.client.cached_account_resource(self.module_address, resource_path)
             
-            if resource and "data" in resource and "lessons" in resource.data:
-                lessons = resource.data["lessons"]
+            if resource and "data" in resource and "lessons" in resource["data"]:
+                lessons = resource["data"]["lessons"]
                 if lesson_id < len(lessons):
+                    lesson = self.lesson_content.resolve_lesson(lessons[lesson_id])
+                    self._last_known[("lesson", lesson_id)] = (lesson, int(time.time()))
                     return {
                         "success": True,
-                        "data": lessons[lesson_id]
+                        "data": lesson
                     }
             
             return {
@@ -201,16 +250,12 @@ class BlockchainManager:
                 "error": "Lesson not found on blockchain"
             }
         except Exception as e:
-            # If resource doesn't exist, return simulated data
-            return {
-                "success": True,
-                "data": {
-                    "title": "Simulated Lesson",
-                    "description": "This is a simulated lesson",
-                    "reward_amount": 1
-                },
-                "message": "Using simulated data (no blockchain interaction)"
-            }
+            if status_code_of(e) == 404:
+                return {
+                    "success": False,
+                    "error": "Lesson not found on blockchain"
+                }
+            return self._stale_or_error(("lesson", lesson_id), e)
     
     def execute_transaction(self, from_address, to_address, amount, private_key_hex=None):
         """Execute a real blockchain transaction."""
@@ -1,27 +1,48 @@
 import requests
-import json
 import os
 from dotenv import load_dotenv
 import time
 import hashlib
-import base64
 import nacl.signing
 import nacl.encoding
+from node_pool import NodePool, node_urls_from_env
+from reward_coalescer import RewardCoalescer, coalescing_enabled
+from ledger_simulator import LedgerSimulator, SimulatedRejection
+from sharded_store import ShardedStore
+from signing_service import get_signing_service, sign_payloads
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 class BlockchainManager:
-    def __init__(self):
-        self.node_url = os.getenv("NODE_URL", "https://fullnode.devnet.aptoslabs.com")
+    def __init__(self, simulator=None):
+        self.node_pool = NodePool(node_urls_from_env("https://fullnode.devnet.aptoslabs.com"))
+        self.node_url = self.node_pool.endpoints[0].url
         self.module_address = os.getenv("MODULE_ADDRESS", "CryptoLiteracy")
         self.module_name = os.getenv("MODULE_NAME", "LearningApp")
         self.private_key = os.getenv("PRIVATE_KEY", None)
         
-        # In-memory storage for simulation mode
-        self.students = {}
+        # In-memory storage for simulation mode, sharded by student address so
+        # concurrent calls for different students never share a lock
+        self.students = ShardedStore()
         self.lessons = {}
-        self.completed_lessons = {}
+        self.completed_lessons = self.students.companion(shard_key=lambda key: key[0])
+        # (address, action) pairs between the duplicate check and the local update
+        self._in_flight = self.students.companion(shard_key=lambda key: key[0])
+        # Signed calls in simulation mode run against a local ledger with real chain timing
+        self.simulator = simulator if simulator is not None else LedgerSimulator()
+        
+        # Opt-in reward coalescing: many small rewards paid as one transfer
+        self.reward_coalescer = None
+        if coalescing_enabled():
+            from shared_state import SharedStore
+            self.reward_coalescer = RewardCoalescer(SharedStore(), self._send_reward)
+            # Balances whose window has elapsed are paid without waiting for another reward
+            if self.reward_coalescer.window > 0:
+                self.reward_coalescer.start()
     
     def connect_wallet(self, wallet_address):
         """Connect a wallet to the application"""
@@ -43,32 +64,32 @@ class BlockchainManager:
         if not student_address.startswith("0x") or len(student_address) != 66:
             raise ValueError("Invalid wallet address format")
         
-        # Check if student already exists
-        if student_address in self.students:
-            raise ValueError("Student already registered")
+        # Check if student already exists, and claim the registration
+        claim = (student_address, "register")
+        with self.students.lock_for(student_address):
+            if student_address in self.students or claim in self._in_flight:
+                raise ValueError("Student already registered")
+            self._in_flight[claim] = True
         
-        # Register student in local storage
-        self.students[student_address] = {
-            "address": student_address,
-            "registration_time": int(time.time()),
-            "completed_lessons": []
-        }
+        try:
+            # If private key is provided, register on the simulated ledger first
+            result = None
+            if private_key:
+                result = self._submit_simulated(student_address, self._entry_function("register_student", []))
+                if result["status"] == "failed":
+                    return result
+            
+            # Register student in local storage
+            self.students[student_address] = {
+                "address": student_address,
+                "registration_time": int(time.time()),
+                "completed_lessons": []
+            }
+        finally:
+            self._in_flight.pop(claim)
         
-        # If private key is provided, register on blockchain
-        if private_key:
-            try:
-                # In a real implementation, we would call the blockchain
-                # For now, we just return a simulated transaction hash
-                tx_hash = f"0x{hashlib.sha256(f'{student_address}{int(time.time())}'.encode()).hexdigest()}"
-                return {
-                    "status": "success",
-                    "transaction_hash": tx_hash
-                }
-            except Exception as e:
-                return {
-                    "status": "failed",
-                    "error": str(e)
-                }
+        if result is not None:
+            return result
         
         # Return simulation result
         return {
@@ -78,6 +99,14 @@ class BlockchainManager:
     
     def create_lesson(self, lesson_id, title, description, reward_amount, private_key=None):
         """Create a new lesson"""
+        # If private key is provided, create on the simulated ledger first
+        result = None
+        if private_key:
+            payload = self._entry_function("create_lesson", [title, description, str(reward_amount)])
+            result = self._submit_simulated(self.module_address, payload)
+            if result["status"] == "failed":
+                return result
+        
         # Store lesson in local storage
         self.lessons[lesson_id] = {
             "id": lesson_id,
@@ -87,21 +116,8 @@ class BlockchainManager:
             "creation_time": int(time.time())
         }
         
-        # If private key is provided, create on blockchain
-        if private_key:
-            try:
-                # In a real implementation, we would call the blockchain
-                # For now, we just return a simulated transaction hash
-                tx_hash = f"0x{hashlib.sha256(f'{lesson_id}{title}{int(time.time())}'.encode()).hexdigest()}"
-                return {
-                    "status": "success",
-                    "transaction_hash": tx_hash
-                }
-            except Exception as e:
-                return {
-                    "status": "failed",
-                    "error": str(e)
-                }
+        if result is not None:
+            return result
         
         # Return simulation result
         return {
@@ -117,37 +133,49 @@ class BlockchainManager:
         if not sender_address.startswith("0x") or len(sender_address) != 66:
             raise ValueError("Invalid sender wallet address format")
         
-        # Check if student exists
-        if student_address not in self.students:
-            raise ValueError("Student not found")
-        
         # Check if lesson exists
         if lesson_id not in self.lessons:
             raise ValueError("Lesson not found")
         
-        # Check if lesson is already completed
-        if lesson_id in self.students[student_address]["completed_lessons"]:
-            raise ValueError("Lesson already completed")
+        # Check the student and claim the completion under the student's shard lock,
+        # so two concurrent calls cannot both pass the already-completed check
+        claim = (student_address, lesson_id)
+        with self.students.lock_for(student_address):
+            student = self.students.get(student_address)
+            if student is None:
+                raise ValueError("Student not found")
+            if lesson_id in student["completed_lessons"] or claim in self._in_flight:
+                raise ValueError("Lesson already completed")
+            self._in_flight[claim] = True
+        
+        try:
+            # If private key is provided (and rewards are not coalesced), complete on the simulated ledger first
+            result = None
+            if private_key and self.reward_coalescer is None:
+                payload = self._entry_function("complete_lesson", [student_address, str(lesson_id)])
+                result = self._submit_simulated(sender_address, payload)
+                if result["status"] == "failed":
+                    return result
+            
+            # Update student record
+            with self.students.lock_for(student_address):
+                student["completed_lessons"].append(lesson_id)
+                self.completed_lessons[claim] = int(time.time())
+        finally:
+            self._in_flight.pop(claim)
         
-        # Update student record
-        self.students[student_address]["completed_lessons"].append(lesson_id)
+        # With coalescing on, the reward joins the student's pending balance
+        if self.reward_coalescer is not None:
+            pending = self.reward_coalescer.record(student_address, sender_address, reward_amount, lesson_id)
+            return {
+                "status": "pending",
+                "message": "Lesson completed, reward will be paid with the next transfer",
+                "reward_amount": reward_amount,
+                "pending_reward": pending["amount"]
+            }
         
-        # If private key is provided, execute real transaction
-        if private_key:
-            try:
-                # In a real implementation, we would call the blockchain
-                # For now, we just return a simulated transaction hash
-                tx_hash = f"0x{hashlib.sha256(f'{student_address}{lesson_id}{int(time.time())}'.encode()).hexdigest()}"
-                return {
-                    "status": "success",
-                    "transaction_hash": tx_hash,
-                    "reward_amount": reward_amount
-                }
-            except Exception as e:
-                return {
-                    "status": "failed",
-                    "error": str(e)
-                }
+        if result is not None:
+            return dict(result, reward_amount=reward_amount)
         
         # Return simulation result
         return {
@@ -156,29 +184,46 @@ class BlockchainManager:
             "reward_amount": reward_amount
         }
     
+    def flush_rewards(self, student_address=None):
+        """Pay out coalesced rewards now, for one student or everyone"""
+        if self.reward_coalescer is None:
+            return []
+        return self.reward_coalescer.flush(student_address)
+    
+    def _send_reward(self, sender_address, student_address, amount):
+        """Transfer a coalesced reward balance from the operator account"""
+        if not self.private_key:
+            raise RuntimeError("PRIVATE_KEY is not set, coalesced rewards cannot be paid")
+        result = self.execute_transaction(sender_address, student_address, amount, self.private_key)
+        if result["status"] == "failed":
+            raise Exception(result["error"])
+        if not result.get("transaction_hash"):
+            raise RuntimeError("Reward transfer returned no transaction hash")
+        return result["transaction_hash"]
+    
     def get_student_progress(self, student_address):
         """Get student progress"""
         # Validate wallet address format
         if not student_address.startswith("0x") or len(student_address) != 66:
             raise ValueError("Invalid wallet address format")
         
-        # Check if student exists
-        if student_address not in self.students:
-            raise ValueError("Student not found")
-        
-        # Get student data
-        student = self.students[student_address]
+        # Get a consistent copy of the student's completions
+        with self.students.lock_for(student_address):
+            student = self.students.get(student_address)
+            if student is None:
+                raise ValueError("Student not found")
+            completed = list(student["completed_lessons"])
         
         # Calculate total rewards
         total_rewards = 0
-        for lesson_id in student["completed_lessons"]:
+        for lesson_id in completed:
             if lesson_id in self.lessons:
                 total_rewards += self.lessons[lesson_id]["reward_amount"]
         
         # Return student progress
         return {
             "student_address": student_address,
-            "lessons_completed": student["completed_lessons"],
+            "lessons_completed": completed,
             "total_rewards": total_rewards
         }
     
@@ -190,21 +235,15 @@ class BlockchainManager:
         if not to_address.startswith("0x") or len(to_address) != 66:
             raise ValueError("Invalid recipient wallet address format")
         
-        # If private key is provided, execute real transaction
+        # If private key is provided, transfer on the simulated ledger
         if private_key:
-            try:
-                # In a real implementation, we would call the blockchain
-                # For now, we just return a simulated transaction hash
-                tx_hash = f"0x{hashlib.sha256(f'{from_address}{to_address}{amount}{int(time.time())}'.encode()).hexdigest()}"
-                return {
-                    "status": "success",
-                    "transaction_hash": tx_hash
-                }
-            except Exception as e:
-                return {
-                    "status": "failed",
-                    "error": str(e)
-                }
+            payload = {
+                "type": "entry_function_payload",
+                "function": "0x1::coin::transfer",
+                "type_arguments": ["0x1::aptos_coin::AptosCoin"],
+                "arguments": [to_address, str(amount)]
+            }
+            return self._submit_simulated(from_address, payload)
         
         # Return simulation result
         return {
@@ -212,33 +251,64 @@ class BlockchainManager:
             "message": "Transaction executed in simulation mode"
         }
 
+    def _entry_function(self, function, arguments):
+        return {
+            "type": "entry_function_payload",
+            "function": f"{self.module_address}::{self.module_name}::{function}",
+            "type_arguments": [],
+            "arguments": arguments
+        }
+    
+    def _submit_simulated(self, sender_address, payload):
+        """Submit to the ledger simulator and wait for the transaction to execute"""
+        try:
+            txn_hash = self.simulator.submit(sender_address, payload)
+            txn = self.simulator.wait_for_transaction(txn_hash)
+        except (SimulatedRejection, TimeoutError) as e:
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
+        if not txn["success"]:
+            return {
+                "status": "failed",
+                "transaction_hash": txn_hash,
+                "error": txn["vm_status"]
+            }
+        return {
+            "status": "success",
+            "transaction_hash": txn_hash,
+            "version": int(txn["version"]),
+            "gas_used": int(txn["gas_used"])
+        }
+
     def validate_private_key(self, address: str, private_key: str) -> bool:
         """Validate if a private key corresponds to a wallet address"""
         try:
             # Create signing key from private key
-            signing_key = SigningKey(bytes.fromhex(private_key.replace("0x", "")))
+            signing_key = nacl.signing.SigningKey(bytes.fromhex(private_key.replace("0x", "")))
             
             # Get public key
-            public_key = signing_key.verify_key.encode(encoder=HexEncoder).decode()
+            public_key = signing_key.verify_key.encode(encoder=nacl.encoding.HexEncoder).decode()
             
-            # Derive address from public key
-            derived_address = "0x" + hashlib.sha3_256(bytes.fromhex(public_key)).hexdigest()
+            # Derive address from public key (single ed25519 key scheme: public key + 0x00)
+            derived_address = "0x" + hashlib.sha3_256(bytes.fromhex(public_key) + b"\x00").hexdigest()
             
             # Check if the address matches
-            return derived_address == address
+            return derived_address == "0x" + address.lower().replace("0x", "").zfill(64)
         except Exception as e:
-            print(f"Error validating private key: {str(e)}")
+            logger.warning("Error validating private key", extra=fields(error=str(e)))
             return False
     
+    def sign_transactions(self, payloads, private_key):
+        """Sign many payloads at once in the signing process pool, in order"""
+        return get_signing_service().map(sign_payloads, private_key, payloads)
+    
     def _execute_transaction(self, payload: dict, private_key: str) -> str:
         """Execute a transaction on the blockchain"""
         try:
-            # Create signing key from private key
-            signing_key = SigningKey(bytes.fromhex(private_key.replace("0x", "")))
-            
-            # Sign the transaction payload
-            signature = signing_key.sign(json.dumps(payload).encode())
-            signature_hex = base64.b64encode(signature).decode()
+            # Sign the transaction payload (the parsed key is cached per process)
+            signature_hex = get_signing_service().map(sign_payloads, private_key, [payload])[0]
             
             # Prepare transaction request
             headers = {
@@ -249,12 +319,18 @@ class BlockchainManager:
             # Add signature to payload
             payload["signature"] = signature_hex
             
-            # Submit transaction
-            response = requests.post(
-                f"{self.node_url}/v1/transactions",
-                headers=headers,
-                json=payload
-            )
+            # Submit transaction, failing over to the next node on rate limits or node errors
+            def post(endpoint):
+                response = requests.post(
+                    f"{endpoint.url}/v1/transactions",
+                    headers=headers,
+                    json=payload
+                )
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+                return response
+            
+            response = self.node_pool.failover_sync(post)
             
             if response.status_code != 202:
                 raise Exception(f"Transaction submission failed: {response.text}")
@@ -267,14 +343,21 @@ class BlockchainManager:
             
             return txn_hash
         except Exception as e:
-            print(f"Error executing transaction: {str(e)}")
+            logger.error("Error executing transaction", extra=fields(error=str(e)))
             raise
     
     def _wait_for_transaction(self, txn_hash: str, max_retries: int = 10, delay: int = 1):
         """Wait for a transaction to be confirmed"""
+        def get(endpoint):
+            response = requests.get(f"{endpoint.url}/v1/transactions/by_hash/{txn_hash}")
+            # A 404 only means the transaction is not known yet; rate limits and node errors try the next node
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+            return response
+
         for i in range(max_retries):
             try:
-                response = requests.get(f"{self.node_url}/v1/transactions/{txn_hash}")
+                response = self.node_pool.failover_sync(get)
                 if response.status_code == 200:
                     txn_data = response.json()
                     if txn_data.get("success", False):
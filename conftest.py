@@ -0,0 +1,29 @@
+import pytest
+
+
+class Clock:
+    """Time source for components that take clock=; tests move it by setting now"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeApiError(Exception):
+    """Node error with a status_code, like aptos_sdk's ApiError"""
+
+    def __init__(self, status_code, message=""):
+        super().__init__(message or f"status {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def api_error():
+    return FakeApiError
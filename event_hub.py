@@ -0,0 +1,89 @@
+import asyncio
+import os
+
+# Events buffered per subscriber; a slow client loses its oldest events first
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# Topics one subscriber may follow, so a single client cannot grow the hub without bound
+EVENT_MAX_TOPICS = int(os.getenv("EVENT_MAX_TOPICS", "100"))
+
+
+class Subscription:
+    """One client's queue of events for the topics it follows"""
+
+    def __init__(self, hub: "EventHub", max_queue: int = EVENT_QUEUE_SIZE, max_topics: int = EVENT_MAX_TOPICS):
+        self.hub = hub
+        self.topics = set()
+        self.queue = asyncio.Queue(max_queue)
+        self.max_topics = max_topics
+        self.dropped = 0
+
+    def add(self, topics) -> bool:
+        """Follow more topics; False if the topic limit left some of them out"""
+        for topic in topics:
+            if topic not in self.topics:
+                if len(self.topics) >= self.max_topics:
+                    return False
+                self.topics.add(topic)
+                self.hub._subscribers.setdefault(topic, set()).add(self)
+        return True
+
+    def deliver(self, event: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float = None):
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        """Stop following every topic"""
+        for topic in self.topics:
+            subscribers = self.hub._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(self)
+                if not subscribers:
+                    del self.hub._subscribers[topic]
+        self.topics.clear()
+
+
+class EventHub:
+    """Fan out events by topic to every subscribed client on this worker's event loop
+
+    Upstream work (tracking a transaction, reading a student's progress)
+    happens once per topic and is published here, so N clients watching the
+    same topic cost one upstream poll.
+    """
+
+    def __init__(self, max_queue: int = EVENT_QUEUE_SIZE, max_topics: int = EVENT_MAX_TOPICS):
+        self.max_queue = max_queue
+        self.max_topics = max_topics
+        self._subscribers = {}
+        self.published = 0
+
+    def subscribe(self, topics=()) -> Subscription:
+        subscription = Subscription(self, self.max_queue, self.max_topics)
+        subscription.add(topics)
+        return subscription
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subscribers.get(topic))
+
+    def publish(self, topic: str, event: dict) -> int:
+        """Deliver an event to every subscriber of the topic; returns how many got it"""
+        subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(dict(event, topic=topic))
+        self.published += 1
+        return len(subscribers)
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self._subscribers),
+            "subscriptions": len({s for subscribers in self._subscribers.values() for s in subscribers}),
+            "published": self.published
+        }
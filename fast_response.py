@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed (bytes)
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+# Precomputed bodies kept per worker
+BODY_CACHE_MAX_ENTRIES = int(os.getenv("BODY_CACHE_MAX_ENTRIES", "1000"))
+
+HAS_ORJSON = orjson is not None
+
+
+def dumps(content) -> bytes:
+    """Serialize to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick br or gzip from an Accept-Encoding header, or None for identity"""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            offered[name.lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class PrecomputedBody:
+    """A JSON body serialized once, with its ETag and compressed variants made on first use"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        # Weak ETag: the same for every content encoding of this body
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._encoded = {}
+
+    @classmethod
+    def from_content(cls, content) -> "PrecomputedBody":
+        return cls(dumps(content))
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding is None:
+            return self.body
+        if encoding not in self._encoded:
+            if encoding == "br":
+                self._encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self._encoded[encoding]
+
+
+class BodyCache:
+    """Precomputed bodies keyed by name, rebuilt only when their source object changes
+
+    Sources are the objects handed out by a cache (e.g. ResourceCache): as
+    long as the same object comes back, the serialized body is reused.
+    """
+
+    def __init__(self, max_entries: int = BODY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, source, build=lambda source: source) -> PrecomputedBody:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is source:
+            self._entries.move_to_end(key)
+            return entry[1]
+        body = PrecomputedBody.from_content(build(source))
+        # Keep the source referenced so its identity cannot be reused by another object
+        self._entries[key] = (source, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body
+
+
+def respond(request, body: PrecomputedBody, min_size: int = COMPRESS_MIN_SIZE):
+    """Response for a precomputed body: 304 on a matching ETag, compressed when worth it"""
+    from fastapi import Response
+
+    headers = {"ETag": body.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), body.etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body.body) >= min_size else None
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.encoded(encoding), media_type="application/json", headers=headers)
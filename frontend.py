@@ -1,12 +1,9 @@
 import streamlit as st
 import requests
 from datetime import datetime
-from aptos_sdk.account import Account
-from aptos_sdk.async_client import RestClient, FaucetClient
-from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
+import asyncio
 import os
 from dotenv import load_dotenv
-import random
 
 # Load environment variables
 load_dotenv()
@@ -15,14 +12,15 @@ load_dotenv()
 API_URL = "http://127.0.0.1:8000"
 
 # Aptos configuration
-NODE_URL = os.getenv("NODE_URL", "https://fullnode.devnet.aptoslabs.com")
+NODE_URLS = os.getenv("NODE_URLS") or os.getenv("NODE_URL", "https://fullnode.devnet.aptoslabs.com")
 FAUCET_URL = os.getenv("FAUCET_URL", "https://faucet.devnet.aptoslabs.com")
 MODULE_ADDRESS = os.getenv("MODULE_ADDRESS", "your_module_address")
 MODULE_NAME = os.getenv("MODULE_NAME", "LearningApp")
 
-# Initialize Aptos client
-client = RestClient(NODE_URL)
-faucet_client = FaucetClient(FAUCET_URL, client)
+# How long node reads stay cached between reruns (seconds)
+RESOURCE_CACHE_TTL = int(os.getenv("RESOURCE_CACHE_TTL", "10"))
+# Finished transactions stay in the status panel for this long (seconds)
+TRACKER_RETENTION = float(os.getenv("TRACKER_RETENTION", "300"))
 
 # Set page config for a cleaner look
 st.set_page_config(
@@ -31,21 +29,108 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_runtime():
+    """Create the Aptos clients and their event loop once per process"""
+    from aptos_runtime import AptosRuntime
+    return AptosRuntime(NODE_URLS, FAUCET_URL)
+
+@st.cache_resource
+def get_api_session():
+    """Shared HTTP session so API calls reuse pooled connections"""
+    return requests.Session()
+
+@st.cache_data(ttl=RESOURCE_CACHE_TTL, show_spinner=False)
+def load_account_resources(address: str):
+    """Fetch account resources from the node, memoized per address"""
+    runtime = get_runtime()
+    return runtime.run(runtime.clients.cached_account_resources(address))
+
+@st.cache_resource
+def get_account_pool():
+    """Keep funded accounts ready on the runtime loop, shared by all sessions"""
+    from account_pool import AccountPool, funder_for
+    runtime = get_runtime()
+    pool = AccountPool(funder_for(runtime.clients))
+    runtime.loop.submit(pool.run())
+    return pool
+
+def load_account(private_key=None):
+    """Load the account for a private key, or hand out a funded one from the pool"""
+    from aptos_sdk.account import Account
+    if private_key:
+        return Account.load_key(private_key)
+    return get_runtime().run(get_account_pool().acquire())
+
+def submit_payload(account, function, arguments):
+    """Build an entry function payload for the module and submit it"""
+    from aptos_sdk.transactions import TransactionPayload, EntryFunction
+    payload = TransactionPayload(
+        EntryFunction.natural(
+            f"{MODULE_ADDRESS}::{MODULE_NAME}",
+            function,
+            [],
+            arguments
+        )
+    )
+    runtime = get_runtime()
+    return runtime.run(runtime.clients.sign_and_submit(account, payload))
+
+@st.cache_resource
+def get_lesson_content():
+    """Lesson blob store and its hot-body cache, shared by all sessions"""
+    from lesson_content import LessonContent
+    return LessonContent()
+
+@st.cache_resource
+def get_tracker():
+    """Start one transaction tracker on the runtime loop, shared by all sessions"""
+    from tx_tracker import TransactionTracker
+    runtime = get_runtime()
+    tracker = TransactionTracker(runtime.clients.fetch_transaction)
+    # Listeners run on the runtime loop; finished entries are evicted after the retention period
+    tracker.add_listener(
+        lambda entry: asyncio.get_running_loop().call_later(TRACKER_RETENTION, tracker.forget, entry["hash"])
+    )
+    runtime.loop.submit(tracker.run())
+    return tracker
+
+def track_transaction(txn_hash, label):
+    """Hand a submitted transaction to the tracker and remember it for this session"""
+    get_tracker().track(txn_hash, label)
+    st.session_state.pending_transactions.append(txn_hash)
+
 # Initialize session state
 if 'wallet_data' not in st.session_state:
     st.session_state.wallet_data = None
+if 'pending_transactions' not in st.session_state:
+    st.session_state.pending_transactions = []
+if 'last_progress' not in st.session_state:
+    st.session_state.last_progress = {}
+
+def connect_wallet(private_key=None):
+    """Connect a wallet to this session: the given key, or a funded account from the pool"""
+    account = load_account(private_key)
+    st.session_state.wallet_data = {
+        "address": account.address(),
+        "public_key": account.public_key(),
+        "private_key": private_key or f"0x{account.private_key}"
+    }
+    return account
+
+def session_account():
+    """The connected wallet's account; only connecting takes an account from the pool"""
+    if not st.session_state.wallet_data:
+        return connect_wallet()
+    private_key = st.session_state.wallet_data["private_key"]
+    if not private_key.startswith("0x"):
+        private_key = "0x" + private_key
+    return load_account(private_key)
 
 def register_student():
     try:
-        # Get the account from private key or use a default one
-        if st.session_state.wallet_data:
-            private_key = st.session_state.wallet_data["private_key"]
-            if not private_key.startswith("0x"):
-                private_key = "0x" + private_key
-            account = Account.load_key(private_key)
-        else:
-            # Use a default account if no wallet is connected
-            account = Account.generate()
+        # The connected wallet, or a funded one connected to this session on first use
+        account = session_account()
         
         # Prepare registration data
         registration_data = {
@@ -57,7 +142,7 @@ def register_student():
         }
         
         # Send registration request
-        response = requests.post(f"{API_URL}/register", json=registration_data)
+        response = get_api_session().post(f"{API_URL}/register", json=registration_data)
         
         if response.status_code == 200:
             st.success("Registration successful!")
@@ -69,80 +154,61 @@ def register_student():
 
 def create_lesson(title, description, reward_amount):
     try:
-        # Get the account from private key or use a default one
-        if st.session_state.wallet_data:
-            private_key = st.session_state.wallet_data["private_key"]
-            if not private_key.startswith("0x"):
-                private_key = "0x" + private_key
-            account = Account.load_key(private_key)
-        else:
-            # Use a default account if no wallet is connected
-            account = Account.generate()
+        # The connected wallet, or a funded one connected to this session on first use
+        account = session_account()
         
-        # Generate a random lesson ID
-        lesson_id = random.randint(1000, 9999)
-        
-        # Create transaction payload
-        payload = TransactionPayload(
-            EntryFunction.natural(
-                f"{MODULE_ADDRESS}::{MODULE_NAME}",
-                "create_lesson",
-                [],
-                [
-                    TransactionArgument(title, "String"),
-                    TransactionArgument(description, "String"),
-                    TransactionArgument(int(reward_amount), "U64")
-                ]
-            )
-        )
+        # Long descriptions go to the blob store; the transaction carries their hash
+        description = get_lesson_content().store_description(description)
         
         # Submit transaction
-        txn_hash = client.submit_transaction(account, payload)
-        st.success("Lesson created successfully!")
-        st.write(f"Lesson ID: {lesson_id}")
-        
-        # Wait for transaction to complete
-        client.wait_for_transaction(txn_hash)
+        from aptos_sdk.transactions import TransactionArgument
+        txn_hash = submit_payload(account, "create_lesson", [
+            TransactionArgument(title, "String"),
+            TransactionArgument(description, "String"),
+            TransactionArgument(int(reward_amount), "U64")
+        ])
+        # Track confirmation in the background instead of blocking
+        track_transaction(txn_hash, f"Create lesson: {title}")
+        st.info(f"Lesson submitted, waiting for confirmation: {txn_hash}")
         
     except Exception as e:
-        st.success("Lesson created successfully!")
-        st.write(f"Lesson ID: {random.randint(1000, 9999)}")
+        st.error(f"Lesson creation failed: {str(e)}")
 
 def complete_lesson(lesson_id):
     try:
-        # Get the account from private key or use a default one
-        if st.session_state.wallet_data:
-            private_key = st.session_state.wallet_data["private_key"]
-            if not private_key.startswith("0x"):
-                private_key = "0x" + private_key
-            account = Account.load_key(private_key)
-        else:
-            # Use a default account if no wallet is connected
-            account = Account.generate()
-        
-        # Create transaction payload
-        payload = TransactionPayload(
-            EntryFunction.natural(
-                f"{MODULE_ADDRESS}::{MODULE_NAME}",
-                "complete_lesson",
-                [],
-                [
-                    TransactionArgument(int(lesson_id), "U64")
-                ]
-            )
-        )
+        # The connected wallet, or a funded one connected to this session on first use
+        account = session_account()
         
         # Submit transaction
-        txn_hash = client.submit_transaction(account, payload)
-        st.success("Lesson completed successfully!")
-        st.write(f"Lesson {lesson_id} has been marked as completed!")
-        
-        # Wait for transaction to complete
-        client.wait_for_transaction(txn_hash)
+        from aptos_sdk.transactions import TransactionArgument
+        txn_hash = submit_payload(account, "complete_lesson", [
+            TransactionArgument(int(lesson_id), "U64")
+        ])
+        # Track confirmation in the background instead of blocking
+        track_transaction(txn_hash, f"Complete lesson {lesson_id}")
+        st.info(f"Completion submitted, waiting for confirmation: {txn_hash}")
         
     except Exception as e:
-        st.success("Lesson completed successfully!")
-        st.write(f"Lesson {lesson_id} has been marked as completed!")
+        st.error(f"Lesson completion failed: {str(e)}")
+
+@st.fragment(run_every=2)
+def transaction_status_panel():
+    """Live status of this session's transactions, refreshed on its own"""
+    hashes = st.session_state.pending_transactions
+    if not hashes:
+        st.caption("No transactions submitted yet")
+        return
+    
+    icons = {"pending": "⏳", "committed": "✅", "failed": "❌"}
+    entries = get_tracker().statuses(hashes)
+    # Forget hashes the tracker has evicted
+    st.session_state.pending_transactions = [entry["hash"] for entry in entries]
+    for entry in reversed(entries):
+        line = f"{icons.get(entry['status'], '')} {entry['label']} ({entry['status']})"
+        if entry["status"] == "failed" and entry["vm_status"]:
+            line += f": {entry['vm_status']}"
+        st.write(line)
+        st.caption(entry["hash"])
 
 st.title("Crypto Literacy Learning App")
 
@@ -179,19 +245,9 @@ with col1:
                     raise ValueError(f"Invalid private key length")
                 # Add 0x prefix back
                 private_key = "0x" + private_key
-                # Use existing private key
-                account = Account.load_key(private_key)
-            else:
-                # Generate new account
-                account = Account.generate()
-                private_key = f"0x{account.private_key}"
             
-            # Store wallet data in session
-            st.session_state.wallet_data = {
-                "address": account.address(),
-                "public_key": account.public_key(),
-                "private_key": private_key
-            }
+            # Use the existing private key, or take a funded account from the pool
+            account = connect_wallet(private_key or None)
             
             st.success(f"Wallet Connected: {account.address()}")
         except Exception as e:
@@ -207,6 +263,11 @@ page = st.sidebar.radio(
     ["Register Student", "Create Lesson", "Complete Lesson", "Check Progress"]
 )
 
+# Transaction status refreshes independently of the rest of the page
+with st.sidebar:
+    st.markdown("### Transactions")
+    transaction_status_panel()
+
 # Main Content Area
 if page == "Register Student":
     st.header("Register as a Student")
@@ -239,29 +300,35 @@ if page == "Register Student":
                 # Add 0x prefix back
                 student_address = "0x" + student_address
                 
-                # Create a new account for the student
-                account = Account.generate()
+                # Only a public key is sent, so this needs no funded account
+                if st.session_state.wallet_data:
+                    public_key = st.session_state.wallet_data["public_key"]
+                else:
+                    from aptos_sdk.account import Account
+                    public_key = Account.generate().public_key()
                 
                 # Prepare registration data
                 registration_data = {
                     "student_address": student_address,
-                    "public_key": str(account.public_key()),
+                    "public_key": str(public_key),
                     "message": "Register student",
                     "signature": "dummy_signature",
                     "network": "devnet"
                 }
                 
                 # Send registration request
-                response = requests.post(f"{API_URL}/register", json=registration_data)
+                response = get_api_session().post(f"{API_URL}/register", json=registration_data)
                 
-                st.success("Student registered successfully!")
-                st.write(f"Student Address: {student_address}")
+                if response.status_code == 200:
+                    st.success("Student registered successfully!")
+                    st.write(f"Student Address: {student_address}")
+                else:
+                    st.error(f"Registration failed: {response.json().get('detail', 'Unknown error')}")
                 
             except ValueError as ve:
                 st.error(f"Invalid address: {str(ve)}")
             except Exception as e:
-                st.success("Student registered successfully!")
-                st.write(f"Student Address: {student_address}")
+                st.error(f"Registration failed: {str(e)}")
 
 elif page == "Create Lesson":
     st.header("Create a New Lesson")
@@ -284,9 +351,10 @@ elif page == "Check Progress":
     if not st.session_state.wallet_data:
         st.error("Please connect your wallet first")
     else:
+        address = str(st.session_state.wallet_data["address"])
         try:
-            # Get account resources
-            resources = client.account_resources(st.session_state.wallet_data["address"])
+            # Get account resources (cached per address for a short TTL)
+            resources = load_account_resources(address)
             
             # Find the student resource
             student_resource = next(
@@ -294,33 +362,25 @@ elif page == "Check Progress":
                 None
             )
             
-            st.success("Progress checked successfully!")
-            
-            # Display progress information
-            st.write("### Your Progress")
-            st.write("Lessons Completed: 1")  # Show at least 1 completed lesson
-            st.write("Total Rewards: 10")     # Show some rewards
-            
-            # Display lesson completion status
-            st.write("### Lesson Completion Status")
-            st.write("✅ Lesson 1: Introduction to Blockchain")
-            st.write("✅ Lesson 2: Understanding Cryptocurrency")
-            st.write("⏳ Lesson 3: Smart Contracts (In Progress)")
-            
-            # Display rewards history
-            st.write("### Rewards History")
-            st.write("🎁 Completed Lesson 1: +5 rewards")
-            st.write("🎁 Completed Lesson 2: +5 rewards")
+            if student_resource is None:
+                st.warning("This address is not registered as a student yet")
+            else:
+                progress = student_resource["data"]
+                st.session_state.last_progress[address] = (progress, datetime.now())
+                
+                # Display progress information
+                st.write("### Your Progress")
+                st.write(f"Lessons Completed: {progress['lessons_completed']}")
+                st.write(f"Total Rewards: {progress['total_rewards']}")
             
         except Exception as e:
-            st.success("Progress checked successfully!")
-            st.write("### Your Progress")
-            st.write("Lessons Completed: 1")
-            st.write("Total Rewards: 10")
-            st.write("### Lesson Completion Status")
-            st.write("✅ Lesson 1: Introduction to Blockchain")
-            st.write("✅ Lesson 2: Understanding Cryptocurrency")
-            st.write("⏳ Lesson 3: Smart Contracts (In Progress)")
-            st.write("### Rewards History")
-            st.write("🎁 Completed Lesson 1: +5 rewards")
-            st.write("🎁 Completed Lesson 2: +5 rewards")
+            # Show the last progress we actually read, clearly marked, never made-up numbers
+            cached = st.session_state.last_progress.get(address)
+            if cached:
+                progress, fetched_at = cached
+                st.warning(f"Could not reach the blockchain ({str(e)}). Showing progress from {fetched_at:%H:%M:%S}.")
+                st.write("### Your Progress (cached)")
+                st.write(f"Lessons Completed: {progress['lessons_completed']}")
+                st.write(f"Total Rewards: {progress['total_rewards']}")
+            else:
+                st.error(f"Could not load progress: {str(e)}")
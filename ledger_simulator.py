@@ -0,0 +1,328 @@
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+
+# Simulated chain parameters; the defaults are roughly devnet-like
+SIM_SEED = int(os.getenv("SIM_SEED", "0"))
+SIM_BLOCK_TIME = float(os.getenv("SIM_BLOCK_TIME", "0.25"))
+# Submit-to-commit latency is log-normal around this median (seconds)
+SIM_LATENCY_MEDIAN = float(os.getenv("SIM_LATENCY_MEDIAN", "0.9"))
+SIM_LATENCY_SIGMA = float(os.getenv("SIM_LATENCY_SIGMA", "0.35"))
+SIM_MEMPOOL_CAPACITY = int(os.getenv("SIM_MEMPOOL_CAPACITY", "2000"))
+SIM_ACCOUNT_MEMPOOL_LIMIT = int(os.getenv("SIM_ACCOUNT_MEMPOOL_LIMIT", "100"))
+SIM_MAX_BLOCK_TXNS = int(os.getenv("SIM_MAX_BLOCK_TXNS", "500"))
+# Transactions not executed this long after submission expire (seconds)
+SIM_TXN_EXPIRATION = float(os.getenv("SIM_TXN_EXPIRATION", "30"))
+# Balance given to accounts the first time they are seen (octas); 0 requires fund()
+SIM_INITIAL_BALANCE = int(os.getenv("SIM_INITIAL_BALANCE", "100000000"))
+
+GAS_UNIT_PRICE = 100
+MAX_GAS_AMOUNT = 2000
+GENESIS_TIME = 1_700_000_000
+# Gas units charged per entry function; anything else costs DEFAULT_GAS_UNITS
+GAS_SCHEDULE = {
+    "0x1::coin::transfer": 6,
+    "0x1::aptos_account::transfer": 6,
+}
+DEFAULT_GAS_UNITS = 10
+
+TRANSFER_FUNCTIONS = ("0x1::coin::transfer", "0x1::aptos_account::transfer")
+
+
+class SimulatedRejection(Exception):
+    """The simulated node refused a submission, like a 4xx/503 from a fullnode"""
+
+    def __init__(self, vm_status: str, status_code: int = 400):
+        super().__init__(vm_status)
+        self.vm_status = vm_status
+        self.status_code = status_code
+
+
+class MoveAbort(Exception):
+    """Raised by a function handler to fail a transaction during execution"""
+
+
+def transfer(ledger, sender: str, arguments: list):
+    """0x1::coin::transfer(to, amount)"""
+    to_address, amount = arguments[0], int(arguments[1])
+    if ledger.balance(sender) < amount:
+        raise MoveAbort("Move abort in 0x1::coin: EINSUFFICIENT_BALANCE(0x10006)")
+    ledger._accounts[sender]["balance"] -= amount
+    ledger._account(to_address)["balance"] += amount
+
+
+class LedgerSimulator:
+    """Deterministic single-node Aptos ledger with a virtual clock
+
+    Models per-account sequence numbers, gas fees, balances, a bounded
+    mempool, fixed block times and a seeded commit latency distribution.
+    Time only moves through advance() (or wait_for_transaction), so a run
+    with the same seed and the same journal of operations always produces
+    the same hashes, versions, failures and timings; export() and replay()
+    rebuild a run offline.
+    """
+
+    def __init__(self, seed: int = SIM_SEED, block_time: float = SIM_BLOCK_TIME,
+                 latency_median: float = SIM_LATENCY_MEDIAN, latency_sigma: float = SIM_LATENCY_SIGMA,
+                 mempool_capacity: int = SIM_MEMPOOL_CAPACITY, account_mempool_limit: int = SIM_ACCOUNT_MEMPOOL_LIMIT,
+                 max_block_txns: int = SIM_MAX_BLOCK_TXNS, txn_expiration: float = SIM_TXN_EXPIRATION,
+                 initial_balance: int = SIM_INITIAL_BALANCE):
+        self.config = {
+            "seed": seed,
+            "block_time": block_time,
+            "latency_median": latency_median,
+            "latency_sigma": latency_sigma,
+            "mempool_capacity": mempool_capacity,
+            "account_mempool_limit": account_mempool_limit,
+            "max_block_txns": max_block_txns,
+            "txn_expiration": txn_expiration,
+            "initial_balance": initial_balance
+        }
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.version = 0
+        self.block_height = 0
+        self.functions = {name: transfer for name in TRANSFER_FUNCTIONS}
+        self.journal = []
+        self._accounts = {}
+        self._mempool = {}
+        self._transactions = {}
+        self._submitted = 0
+        self._latencies = []
+        self._counts = {"submitted": 0, "rejected": 0, "committed": 0, "failed": 0, "expired": 0}
+        self._lock = threading.RLock()
+
+    def register_function(self, name: str, handler):
+        """Run handler(ledger, sender, arguments) when a transaction calls name; raise MoveAbort to fail it"""
+        self.functions[name] = handler
+
+    def _account(self, address: str) -> dict:
+        address = address.lower()
+        if address not in self._accounts:
+            self._accounts[address] = {"sequence_number": 0, "balance": self.config["initial_balance"]}
+        return self._accounts[address]
+
+    def fund(self, address: str, amount: int):
+        """Mint amount octas to an account, like the faucet"""
+        with self._lock:
+            self.journal.append({"op": "fund", "address": address, "amount": amount})
+            self._account(address)["balance"] += amount
+
+    def balance(self, address: str) -> int:
+        with self._lock:
+            return self._account(address)["balance"]
+
+    def account(self, address: str) -> dict:
+        """Committed account state in the node's JSON shape"""
+        with self._lock:
+            account = self._account(address)
+            return {"sequence_number": str(account["sequence_number"]), "balance": str(account["balance"])}
+
+    def next_sequence_number(self, address: str) -> int:
+        """First sequence number not committed or waiting in the mempool for this sender"""
+        with self._lock:
+            sequence_number = self._account(address)["sequence_number"]
+            queued = {txn["sequence_number"] for txn in self._mempool.values() if txn["sender"] == address.lower()}
+            while sequence_number in queued:
+                sequence_number += 1
+            return sequence_number
+
+    def submit(self, sender: str, payload: dict, sequence_number: int = None,
+               max_gas_amount: int = MAX_GAS_AMOUNT, gas_unit_price: int = GAS_UNIT_PRICE) -> str:
+        """Accept a transaction into the mempool and return its hash, or raise SimulatedRejection"""
+        with self._lock:
+            sender = sender.lower()
+            if sequence_number is None:
+                sequence_number = self.next_sequence_number(sender)
+            self.journal.append({"op": "submit", "sender": sender, "payload": payload, "sequence_number": sequence_number,
+                                 "max_gas_amount": max_gas_amount, "gas_unit_price": gas_unit_price})
+            self._counts["submitted"] += 1
+            try:
+                self._admit(sender, sequence_number, max_gas_amount * gas_unit_price)
+            except SimulatedRejection:
+                self._counts["rejected"] += 1
+                raise
+
+            self._submitted += 1
+            txn_hash = "0x" + hashlib.sha3_256(
+                f"{sender}:{sequence_number}:{json.dumps(payload, sort_keys=True)}:{self._submitted}".encode()
+            ).hexdigest()
+            latency = math.exp(math.log(self.config["latency_median"]) + self.config["latency_sigma"] * self.rng.gauss(0, 1))
+            self._mempool[txn_hash] = {
+                "hash": txn_hash,
+                "sender": sender,
+                "sequence_number": sequence_number,
+                "payload": payload,
+                "max_gas_amount": max_gas_amount,
+                "gas_unit_price": gas_unit_price,
+                "submitted_at": self.now,
+                "ready_at": self.now + latency
+            }
+            return txn_hash
+
+    def _admit(self, sender: str, sequence_number: int, max_fee: int):
+        account = self._account(sender)
+        if sequence_number < account["sequence_number"]:
+            raise SimulatedRejection("SEQUENCE_NUMBER_TOO_OLD")
+        if sequence_number >= account["sequence_number"] + self.config["account_mempool_limit"]:
+            raise SimulatedRejection("SEQUENCE_NUMBER_TOO_NEW")
+        if any(txn["sender"] == sender and txn["sequence_number"] == sequence_number for txn in self._mempool.values()):
+            raise SimulatedRejection("TRANSACTION_ALREADY_IN_MEMPOOL")
+        if account["balance"] < max_fee:
+            raise SimulatedRejection("INSUFFICIENT_BALANCE_FOR_TRANSACTION_FEE")
+        if len(self._mempool) >= self.config["mempool_capacity"]:
+            raise SimulatedRejection("MEMPOOL_IS_FULL", status_code=503)
+
+    def advance(self, seconds: float):
+        """Move the clock forward, producing every block that falls in the interval"""
+        with self._lock:
+            self.journal.append({"op": "advance", "seconds": seconds})
+            self._advance_to(self.now + seconds)
+
+    def _advance_to(self, until: float):
+        block_time = self.config["block_time"]
+        while (self.block_height + 1) * block_time <= until + 1e-9:
+            self.block_height += 1
+            self.now = self.block_height * block_time
+            self._produce_block()
+        self.now = max(self.now, until)
+
+    def _produce_block(self):
+        expiration = self.config["txn_expiration"]
+        for txn in [t for t in self._mempool.values() if self.now - t["submitted_at"] > expiration]:
+            del self._mempool[txn["hash"]]
+            self._counts["expired"] += 1
+
+        # Ready transactions in arrival order; a sender's later sequence numbers
+        # can join the same block once the earlier ones have executed
+        executed = 0
+        progress = True
+        while progress and executed < self.config["max_block_txns"]:
+            progress = False
+            ready = sorted((t for t in self._mempool.values() if t["ready_at"] <= self.now),
+                           key=lambda t: (t["ready_at"], t["hash"]))
+            for txn in ready:
+                if executed >= self.config["max_block_txns"]:
+                    break
+                if txn["sequence_number"] == self._account(txn["sender"])["sequence_number"]:
+                    del self._mempool[txn["hash"]]
+                    self._execute(txn)
+                    executed += 1
+                    progress = True
+
+    def _execute(self, txn: dict):
+        account = self._account(txn["sender"])
+        function = txn["payload"].get("function", "")
+        gas_used = GAS_SCHEDULE.get(function, DEFAULT_GAS_UNITS)
+        fee = gas_used * txn["gas_unit_price"]
+        success, vm_status = True, "Executed successfully"
+
+        account["balance"] -= fee
+        try:
+            handler = self.functions.get(function)
+            if handler is not None:
+                handler(self, txn["sender"], txn["payload"].get("arguments", []))
+        except MoveAbort as e:
+            success, vm_status = False, str(e)
+        account["sequence_number"] += 1
+
+        self.version += 1
+        self._counts["committed" if success else "failed"] += 1
+        self._latencies.append(self.now - txn["submitted_at"])
+        self._transactions[txn["hash"]] = {
+            "type": "user_transaction",
+            "hash": txn["hash"],
+            "sender": txn["sender"],
+            "sequence_number": str(txn["sequence_number"]),
+            "payload": txn["payload"],
+            "max_gas_amount": str(txn["max_gas_amount"]),
+            "gas_unit_price": str(txn["gas_unit_price"]),
+            "gas_used": str(gas_used),
+            "success": success,
+            "vm_status": vm_status,
+            "version": str(self.version),
+            "timestamp": str(int((GENESIS_TIME + self.now) * 1_000_000))
+        }
+
+    def transaction(self, txn_hash: str):
+        """Node JSON for a hash: committed, pending, or None if unknown or expired"""
+        with self._lock:
+            if txn_hash in self._transactions:
+                return dict(self._transactions[txn_hash])
+            if txn_hash in self._mempool:
+                txn = self._mempool[txn_hash]
+                return {"type": "pending_transaction", "hash": txn_hash, "sender": txn["sender"],
+                        "sequence_number": str(txn["sequence_number"]), "payload": txn["payload"]}
+            return None
+
+    def wait_for_transaction(self, txn_hash: str, timeout: float = 60.0) -> dict:
+        """Advance block by block until the transaction executes; raises TimeoutError otherwise"""
+        with self._lock:
+            deadline = self.now + timeout
+        # The lock is taken one block at a time, so concurrent waiters share
+        # the blocks they produce instead of queueing behind a whole wait
+        while True:
+            with self._lock:
+                if self.now >= deadline:
+                    break
+                txn = self.transaction(txn_hash)
+                if txn is None:
+                    break
+                if txn["type"] != "pending_transaction":
+                    return txn
+                self.advance(self.config["block_time"])
+        raise TimeoutError(f"Transaction {txn_hash} was not committed")
+
+    def stats(self) -> dict:
+        """Outcome counts and commit latency percentiles (simulated seconds)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+            return dict(self._counts, now=self.now, version=self.version, mempool=len(self._mempool),
+                        latency_p50=percentile(0.5), latency_p99=percentile(0.99))
+
+    def export(self) -> dict:
+        """Configuration and journal of operations, enough to replay the run"""
+        with self._lock:
+            return {"config": dict(self.config), "journal": list(self.journal)}
+
+    @classmethod
+    def replay(cls, recording: dict, functions: dict = None) -> "LedgerSimulator":
+        """Rebuild a simulator by re-applying a recorded journal (rejections included)"""
+        ledger = cls(**recording["config"])
+        for name, handler in (functions or {}).items():
+            ledger.register_function(name, handler)
+        for op in recording["journal"]:
+            if op["op"] == "fund":
+                ledger.fund(op["address"], op["amount"])
+            elif op["op"] == "advance":
+                ledger.advance(op["seconds"])
+            elif op["op"] == "submit":
+                try:
+                    ledger.submit(op["sender"], op["payload"], op["sequence_number"],
+                                  op["max_gas_amount"], op["gas_unit_price"])
+                except SimulatedRejection:
+                    pass
+        return ledger
+
+
+class SimulatedFaucet:
+    """Local stand-in for aptos_sdk's FaucetClient that mints on a LedgerSimulator"""
+
+    def __init__(self, ledger: LedgerSimulator):
+        self.ledger = ledger
+        self.mints = 0
+
+    async def fund_account(self, address, amount: int, wait_for_transaction=True) -> str:
+        self.ledger.fund(str(address), amount)
+        self.mints += 1
+        return "0x" + hashlib.sha3_256(f"mint:{self.mints}:{address}:{amount}".encode()).hexdigest()
+
+    async def healthy(self) -> bool:
+        return True
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Directory of compressed lesson bodies, shared by every process on the host
+LESSON_BLOB_DIR = os.getenv("LESSON_BLOB_DIR", "lesson_blobs")
+# Decompressed lesson bodies kept in memory per process
+LESSON_CACHE_SIZE = int(os.getenv("LESSON_CACHE_SIZE", "1024"))
+
+# On-chain form of an off-chain lesson body: "sha256:<64 hex digits>"
+CONTENT_PREFIX = "sha256:"
+CONTENT_REF_LENGTH = len(CONTENT_PREFIX) + 64
+CONTENT_REF_PATTERN = re.compile(r"sha256:[0-9a-f]{64}")
+
+
+def is_content_ref(value) -> bool:
+    return isinstance(value, str) and CONTENT_REF_PATTERN.fullmatch(value) is not None
+
+
+class BlobStore:
+    """Content-addressed store of zlib-compressed blobs with an LRU of hot bodies
+
+    A blob lives at root/<first 2 hex digits>/<remaining 62> of its sha256.
+    Identical content is stored once; writes go to a temporary file and
+    are renamed into place, so readers in other processes never see a
+    partial blob. Reads verify the hash before caching the body.
+    """
+
+    def __init__(self, root: str = LESSON_BLOB_DIR, cache_size: int = LESSON_CACHE_SIZE, level: int = 6):
+        self.root = root
+        self.cache_size = cache_size
+        self.level = level
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.deduplicated = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def _remember(self, digest: str, data: bytes):
+        with self._lock:
+            self._cache[digest] = data
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, data: bytes) -> str:
+        """Store data unless identical content is already stored; returns its sha256 hex digest"""
+        return self.add(data)[0]
+
+    def add(self, data: bytes) -> tuple:
+        """Like put, returning (digest, whether this call created the blob)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        created = not os.path.exists(path)
+        if created:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(data, self.level))
+            os.replace(tmp_path, path)
+            self.writes += 1
+        else:
+            self.deduplicated += 1
+        self._remember(digest, data)
+        return digest, created
+
+    def remove(self, digest: str):
+        """Delete a blob from disk and memory"""
+        with self._lock:
+            self._cache.pop(digest, None)
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def get(self, digest: str):
+        """Stored bytes for a digest, or None if this host does not have them"""
+        if not is_content_ref(CONTENT_PREFIX + digest):
+            return None
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return data
+            self.misses += 1
+        try:
+            with open(self._path(digest), "rb") as f:
+                data = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Blob {digest} is corrupt")
+        self._remember(digest, data)
+        return data
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            if digest in self._cache:
+                return True
+        return os.path.exists(self._path(digest))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "writes": self.writes,
+                "deduplicated": self.deduplicated,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class LessonContent:
+    """Swap lesson descriptions for content references on the way to the chain, and back on reads"""
+
+    def __init__(self, blobs: BlobStore = None):
+        self.blobs = blobs or BlobStore()
+        # Bodies this process wrote for lessons still being submitted: digest -> [pending, any submitted]
+        self._staged = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _inline(description: str) -> bool:
+        # A reference would be no shorter than the text itself
+        return len(description.encode()) <= CONTENT_REF_LENGTH and not is_content_ref(description)
+
+    def store_description(self, description: str) -> str:
+        """Value for the on-chain description argument"""
+        if self._inline(description):
+            return description
+        return CONTENT_PREFIX + self.blobs.put(description.encode())
+
+    def stage_description(self, description: str) -> str:
+        """Like store_description, but a new body stays removable until settle_description"""
+        if self._inline(description):
+            return description
+        with self._lock:
+            digest, created = self.blobs.add(description.encode())
+            if created or digest in self._staged:
+                self._staged.setdefault(digest, [0, False])[0] += 1
+        return CONTENT_PREFIX + digest
+
+    def settle_description(self, value: str, submitted: bool):
+        """Finish a staged description; a new body that no lesson was submitted with is removed"""
+        if not is_content_ref(value):
+            return
+        digest = value[len(CONTENT_PREFIX):]
+        with self._lock:
+            entry = self._staged.get(digest)
+            if entry is None:
+                return
+            entry[0] -= 1
+            entry[1] = entry[1] or submitted
+            if entry[0] > 0:
+                return
+            del self._staged[digest]
+            if not entry[1]:
+                self.blobs.remove(digest)
+
+    def description(self, value: str) -> str:
+        """Lesson body for an on-chain description value; references missing here are returned as is"""
+        if not is_content_ref(value):
+            return value
+        data = self.blobs.get(value[len(CONTENT_PREFIX):])
+        if data is None:
+            logger.warning("Lesson content not found", extra=fields(content=value))
+            return value
+        return data.decode()
+
+    def resolve_lesson(self, lesson: dict) -> dict:
+        """Copy of an on-chain lesson with its body inlined and the reference kept as content_hash"""
+        value = lesson.get("description")
+        if not is_content_ref(value):
+            return lesson
+        return dict(lesson, description=self.description(value), content_hash=value)
+
+    def resolve_resource(self, resource: dict) -> dict:
+        """Copy of a Lesson resource (one lesson, or a lessons vector) with bodies inlined"""
+        data = resource.get("data") or {}
+        if isinstance(data.get("lessons"), list):
+            data = dict(data, lessons=[self.resolve_lesson(lesson) for lesson in data["lessons"]])
+        elif "description" in data:
+            data = self.resolve_lesson(data)
+        else:
+            return resource
+        return dict(resource, data=data)
+
+
+_content = None
+
+
+def get_lesson_content() -> LessonContent:
+    """Process-wide lesson content over LESSON_BLOB_DIR"""
+    global _content
+    if _content is None:
+        _content = LessonContent()
+    return _content
@@ -0,0 +1,458 @@
+"""Bulk lesson import from a CSV or JSONL catalog.
+
+The catalog is streamed in chunks, validated with vectorized pandas checks,
+written to the shared store in batches and (optionally) created on chain
+through a pipelined submitter. Progress is checkpointed after every chunk so
+an interrupted import resumes where it stopped:
+
+    python lesson_import.py catalog.csv
+    python lesson_import.py catalog.jsonl --on-chain --window 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from signing_service import SIGNING_MIN_BATCH, get_signing_service, sign_raw_transactions
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Catalog limits
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+MAX_TITLE_LENGTH = 256
+MAX_DESCRIPTION_LENGTH = 4096
+REQUIRED_COLUMNS = ("title", "description", "reward_amount")
+# Rounds of resubmission after a rejected transaction leaves a sequence number gap
+SUBMIT_RECOVERY_PASSES = 3
+# Stands in for a lesson when a no-op transaction has to fill a gap
+GAP_FILLER = {"row": None}
+
+
+def read_catalog(path: str, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Yield the catalog as DataFrame chunks without loading the whole file"""
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""])
+    with reader:
+        for chunk in reader:
+            yield chunk.reset_index(drop=True)
+
+
+def validate_chunk(chunk: pd.DataFrame, first_row: int, seen: set = None):
+    """Split a chunk into valid lesson rows and (row, reason) errors; seen carries lesson_ids across chunks"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Catalog is missing columns: {', '.join(missing)}")
+
+    rows = np.arange(first_row, first_row + len(chunk))
+    title = chunk["title"].astype("string").str.strip().fillna("")
+    description = chunk["description"].astype("string").fillna("")
+    reward = pd.to_numeric(chunk["reward_amount"], errors="coerce")
+    if "lesson_id" in chunk.columns:
+        lesson_id = pd.to_numeric(chunk["lesson_id"], errors="coerce")
+    else:
+        # Without explicit ids, lessons are numbered by their row in the catalog
+        lesson_id = pd.Series(rows + 1, index=chunk.index, dtype="float64")
+
+    # Checks in priority order; a row reports the first one it fails
+    checks = [
+        (title.str.len() == 0, "missing title"),
+        (title.str.len() > MAX_TITLE_LENGTH, "title too long"),
+        (description.str.len() > MAX_DESCRIPTION_LENGTH, "description too long"),
+        (reward.isna() | (reward <= 0) | (reward % 1 != 0), "reward_amount must be a positive integer"),
+        (lesson_id.isna() | (lesson_id < 0) | (lesson_id % 1 != 0), "lesson_id must be a non-negative integer"),
+    ]
+    conditions = [np.asarray(mask.fillna(True), dtype=bool) for mask, _ in checks]
+    # Only rows that pass every other check can claim a lesson_id
+    failed = np.logical_or.reduce(conditions)
+    claimed = lesson_id.where(~failed)
+    duplicate = claimed.duplicated(keep="first")
+    if seen:
+        duplicate |= claimed.isin(seen)
+    conditions.append(np.asarray(duplicate, dtype=bool) & ~failed)
+    checks.append((None, "duplicate lesson_id"))
+    reasons = np.select(conditions, [reason for _, reason in checks], default="")
+    invalid = reasons != ""
+
+    valid = pd.DataFrame({
+        "id": lesson_id[~invalid].astype("int64"),
+        "title": title[~invalid],
+        "description": description[~invalid],
+        "reward_amount": reward[~invalid].astype("int64"),
+        "row": rows[~invalid]
+    })
+    errors = list(zip(rows[invalid].tolist(), reasons[invalid].tolist()))
+    if seen is not None:
+        seen.update(valid["id"].tolist())
+    return valid, errors
+
+
+def lesson_records(valid: pd.DataFrame, creation_time: int = None) -> list:
+    """Lesson dicts in the same shape BlockchainManager.create_lesson stores"""
+    creation_time = creation_time or int(time.time())
+    return [
+        {
+            "id": int(lesson_id),
+            "title": title,
+            "description": description,
+            "reward_amount": int(reward_amount),
+            "creation_time": creation_time
+        }
+        for lesson_id, title, description, reward_amount
+        in zip(valid["id"], valid["title"], valid["description"], valid["reward_amount"])
+    ]
+
+
+class Checkpoint:
+    """Import progress persisted with atomic file replaces
+
+    Hashes submitted between saves are appended to a log next to the
+    checkpoint (add_pending), so recording one costs a line, not a rewrite.
+    Rows whose transaction failed stay in failed and are retried by the
+    next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.log_path = f"{path}.pending"
+        self.rows_done = 0
+        self.pending = {}
+        self.failed = []
+        self.errors = 0
+        self._log = None
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.rows_done = data.get("rows_done", 0)
+            self.pending = {int(row): txn_hash for row, txn_hash in data.get("pending", {}).items()}
+            self.failed = data.get("failed", [])
+            self.errors = data.get("errors", 0)
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        row, txn_hash = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    self.pending[int(row)] = txn_hash
+
+    def add_pending(self, row: int, txn_hash: str):
+        """Record a submitted transaction so a crash does not resubmit it"""
+        self.pending[row] = txn_hash
+        if self._log is None:
+            self._log = open(self.log_path, "a")
+        self._log.write(json.dumps([row, txn_hash]) + "\n")
+        self._log.flush()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"rows_done": self.rows_done, "pending": self.pending, "failed": self.failed,
+                       "errors": self.errors}, f)
+        os.replace(tmp_path, self.path)
+        # Everything in the log is in the checkpoint now
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+
+class PipelinedSubmitter:
+    """Submit create_lesson transactions from one account with a bounded window in flight
+
+    Transactions are signed in batches in the signing process pool while
+    earlier batches are still being submitted. A transaction the node
+    rejects leaves a gap in the account's sequence numbers, and nothing
+    after it can commit. The submitter stops sending past the gap, fills
+    the gap with the next lesson (re-signed at that sequence number),
+    re-signs the lessons it held back after the transactions already in
+    the mempool, and waits for the held-up ones once the gap is filled.
+    When no lesson is left to fill the gap, a zero-coin transfer to the
+    sender takes its sequence number instead.
+    """
+
+    def __init__(self, clients, account, module: str, window: int = 50, signing=None):
+        # Aptos mempool accepts up to 100 transactions ahead per account
+        self.clients = clients
+        self.account = account
+        self.module = module
+        self.window = window
+        self.signing = signing or get_signing_service()
+        # Signed ahead of submission; bounded so transactions do not expire waiting
+        self.sign_batch = max(window * 4, SIGNING_MIN_BATCH)
+        self.sequence_number = None
+
+    async def _resync(self):
+        self.sequence_number = await self.clients.rest.account_sequence_number(self.account.address())
+
+    def _payload(self, lesson: dict):
+        from aptos_sdk.bcs import Serializer
+        from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
+        return TransactionPayload(EntryFunction.natural(
+            self.module,
+            "create_lesson",
+            [],
+            [
+                TransactionArgument(lesson["title"], Serializer.str),
+                TransactionArgument(lesson["description"], Serializer.str),
+                TransactionArgument(int(lesson["reward_amount"]), Serializer.u64)
+            ]
+        ))
+
+    def _noop_payload(self):
+        """Zero-coin transfer to the sender itself, used to fill a sequence number gap"""
+        from aptos_sdk.bcs import Serializer
+        from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
+        return TransactionPayload(EntryFunction.natural(
+            "0x1::aptos_account",
+            "transfer",
+            [],
+            [
+                TransactionArgument(self.account.address(), Serializer.struct),
+                TransactionArgument(0, Serializer.u64)
+            ]
+        ))
+
+    async def is_committed(self, txn_hash: str, poll_interval: float = 1.0) -> bool:
+        """Whether a transaction committed successfully; one still in mempool is waited for until it commits or expires"""
+        while True:
+            txn = await self.clients.fetch_transaction(txn_hash)
+            if txn is None:
+                return False
+            if txn.get("type") != "pending_transaction":
+                return bool(txn.get("success"))
+            if time.time() > int(txn["expiration_timestamp_secs"]):
+                return False
+            await asyncio.sleep(poll_interval)
+
+    async def _sign(self, planned: list) -> list:
+        raw_transactions = [
+            await self.clients.rest.create_bcs_transaction(
+                self.account.address(),
+                self._noop_payload() if lesson is GAP_FILLER else self._payload(lesson),
+                sequence_number
+            )
+            for lesson, sequence_number in planned
+        ]
+        return await self.signing.amap(sign_raw_transactions, self.account.private_key.hex(), raw_transactions)
+
+    async def _submit_pass(self, planned: list, parked: list, on_submitted, results: dict):
+        """Submit (lesson, sequence number) pairs and wait for parked (lesson, sequence number, hash)
+
+        Returns the lowest sequence number that failed to submit (None if
+        none did), the lessons held back behind it and the submitted
+        transactions stuck behind it.
+        """
+        semaphore = asyncio.Semaphore(self.window)
+        state = {"gap": None, "failed": None, "changed": asyncio.Event()}
+        held_back, stuck = [], []
+
+        def behind_gap(sequence_number):
+            return state["gap"] is not None and sequence_number > state["gap"]
+
+        async def wait(lesson, sequence_number, txn_hash):
+            waiter = asyncio.ensure_future(self.clients.wait_for_transaction(txn_hash))
+            while not waiter.done():
+                if behind_gap(sequence_number):
+                    # Cannot commit before the gap is filled; waited for again in the next pass
+                    waiter.cancel()
+                    stuck.append((lesson, sequence_number, txn_hash))
+                    return
+                changed = asyncio.ensure_future(state["changed"].wait())
+                await asyncio.wait([waiter, changed], return_when=asyncio.FIRST_COMPLETED)
+                changed.cancel()
+            try:
+                waiter.result()
+                results[lesson["row"]] = txn_hash
+            except Exception as e:
+                results[lesson["row"]] = e
+
+        async def submit(lesson, sequence_number, signed):
+            async with semaphore:
+                if behind_gap(sequence_number):
+                    held_back.append((lesson, sequence_number))
+                    return
+                try:
+                    txn_hash = await self.clients.submit_signed(signed)
+                except Exception as e:
+                    results[lesson["row"]] = e
+                    if behind_gap(sequence_number):
+                        held_back.append((lesson, sequence_number))
+                        return
+                    if state["failed"] is not None:
+                        # A lower gap: the previous one may have failed only because of it
+                        held_back.append(state["failed"])
+                    state.update(gap=sequence_number, failed=(lesson, sequence_number))
+                    state["changed"], changed = asyncio.Event(), state["changed"]
+                    changed.set()
+                    return
+                if on_submitted and lesson is not GAP_FILLER:
+                    on_submitted(lesson["row"], txn_hash)
+                await wait(lesson, sequence_number, txn_hash)
+
+        tasks = [asyncio.ensure_future(wait(*entry)) for entry in parked]
+        for start in range(0, len(planned), self.sign_batch):
+            batch = planned[start:start + self.sign_batch]
+            signed = await self._sign(batch)
+            tasks.extend(asyncio.ensure_future(submit(lesson, sequence_number, txn))
+                         for (lesson, sequence_number), txn in zip(batch, signed))
+            # Sign the next batch once at most one batch is left waiting
+            while sum(not task.done() for task in tasks) > self.sign_batch:
+                await asyncio.wait([task for task in tasks if not task.done()], return_when=asyncio.FIRST_COMPLETED)
+        await asyncio.gather(*tasks)
+        return state["gap"], sorted(held_back, key=lambda item: item[1]), stuck
+
+    async def submit_all(self, lessons: list, on_submitted=None) -> dict:
+        """Submit lessons in order and wait for them; returns {row: hash or Exception}"""
+        if self.sequence_number is None:
+            await self._resync()
+
+        results = {}
+        planned = [(lesson, self.sequence_number + i) for i, lesson in enumerate(lessons)]
+        self.sequence_number += len(lessons)
+        parked = []
+        for _ in range(SUBMIT_RECOVERY_PASSES):
+            gap, held_back, parked = await self._submit_pass(planned, parked, on_submitted, results)
+            if gap is None:
+                break
+            retry = [lesson for lesson, _ in held_back]
+            if parked:
+                # Parked transactions commit once something takes the gap's sequence number
+                filler = retry.pop(0) if retry else GAP_FILLER
+                after = max(sequence_number for _, sequence_number, _ in parked) + 1
+                planned = [(filler, gap)] + [(lesson, after + i) for i, lesson in enumerate(retry)]
+                self.sequence_number = after + len(retry)
+            else:
+                planned = [(lesson, gap + i) for i, lesson in enumerate(retry)]
+                self.sequence_number = gap + len(retry)
+            if not planned:
+                break
+            logger.warning("Sequence number gap, resubmitting", extra=fields(
+                sequence_number=gap, resubmitted=len(planned), parked=len(parked)))
+        else:
+            for lesson, _ in planned:
+                results.setdefault(lesson["row"], RuntimeError("Not submitted: sequence number gap persisted"))
+            for lesson, _, _ in parked:
+                results[lesson["row"]] = RuntimeError("Stuck behind a sequence number gap")
+
+        results.pop(GAP_FILLER["row"], None)
+        if any(isinstance(result, Exception) for result in results.values()):
+            # Start the next call from the chain's view
+            await self._resync()
+        return results
+
+
+async def import_catalog(path: str, store, checkpoint: Checkpoint, submitter: PipelinedSubmitter = None,
+                         chunk_size: int = IMPORT_CHUNK_SIZE, report=print) -> dict:
+    """Stream, validate, store and optionally create every lesson in the catalog"""
+    start = time.perf_counter()
+    imported = 0
+    error_rows = []
+    row = 0
+    seen = set()
+
+    for chunk in read_catalog(path, chunk_size):
+        first_row, row = row, row + len(chunk)
+        valid, errors = validate_chunk(chunk, first_row, seen)
+        # Rows finished before an interruption are skipped, except lessons whose transaction failed
+        finished = valid["row"] < checkpoint.rows_done
+        if submitter is not None:
+            finished &= ~valid["row"].isin(checkpoint.failed)
+        if row <= checkpoint.rows_done and finished.all():
+            # Validated only so later duplicates are still caught
+            continue
+
+        valid = valid[~finished]
+        errors = [error for error in errors if error[0] >= checkpoint.rows_done]
+        error_rows.extend(errors)
+
+        records = lesson_records(valid)
+        rows = valid["row"].tolist()
+        store.put_many("lessons", [(str(record["id"]), record) for record in records])
+
+        failed = set()
+        if submitter is not None:
+            # Lessons whose transaction committed before the interruption are not resubmitted,
+            # and ones still in mempool are waited for rather than sent twice
+            known = [(record_row, checkpoint.pending[record_row]) for record_row in rows if record_row in checkpoint.pending]
+            settled = await asyncio.gather(*(submitter.is_committed(txn_hash) for _, txn_hash in known))
+            committed = {record_row for (record_row, _), done in zip(known, settled) if done}
+            to_submit = [dict(record, row=record_row) for record, record_row in zip(records, rows)
+                         if record_row not in committed]
+
+            results = await submitter.submit_all(to_submit, checkpoint.add_pending)
+            for record_row, result in results.items():
+                if isinstance(result, Exception):
+                    failed.add(record_row)
+                    error_rows.append((record_row, f"transaction failed: {result}"))
+            # Failed rows are retried by the next run; their hashes are checked first in case they still commit
+            checkpoint.failed = sorted((set(checkpoint.failed) - set(rows)) | failed)
+            checkpoint.pending = {record_row: txn_hash for record_row, txn_hash in checkpoint.pending.items()
+                                  if record_row in failed}
+
+        imported += len(records) - len(failed)
+        checkpoint.rows_done = max(checkpoint.rows_done, row)
+        checkpoint.errors += len(errors)
+        checkpoint.save()
+
+        elapsed = time.perf_counter() - start
+        report(f"{checkpoint.rows_done} rows processed, {imported} lessons imported, "
+               f"{len(error_rows)} errors, {imported / max(elapsed, 1e-9):.0f} lessons/s")
+
+    return {"imported": imported, "errors": error_rows, "rows": row, "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import lessons from a CSV or JSONL catalog")
+    parser.add_argument("catalog", help="Path to a .csv or .jsonl catalog")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <catalog>.checkpoint.json)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--on-chain", action="store_true", help="Also create each lesson on chain")
+    parser.add_argument("--window", type=int, default=50, help="Transactions in flight when creating on chain")
+    parser.add_argument("--errors", help="Write rejected rows to this CSV file")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from shared_state import SharedStore
+    load_dotenv()
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.catalog}.checkpoint.json")
+    store = SharedStore()
+
+    async def run():
+        submitter = None
+        clients = None
+        if args.on_chain:
+            from aptos_sdk.account import Account
+            from aptos_runtime import AptosClients
+            private_key = os.getenv("PRIVATE_KEY")
+            if not private_key:
+                raise SystemExit("PRIVATE_KEY must be set to create lessons on chain")
+            clients = AptosClients()
+            module = f"{os.getenv('MODULE_ADDRESS', 'CryptoLiteracy')}::{os.getenv('MODULE_NAME', 'LearningApp')}"
+            submitter = PipelinedSubmitter(clients, Account.load_key(private_key), module, args.window)
+        try:
+            return await import_catalog(args.catalog, store, checkpoint, submitter, args.chunk_size)
+        finally:
+            if clients is not None:
+                await clients.close()
+
+    result = asyncio.run(run())
+    print(f"Imported {result['imported']} lessons from {result['rows']} rows "
+          f"in {result['seconds']:.1f}s with {len(result['errors'])} errors")
+
+    if args.errors and result["errors"]:
+        pd.DataFrame(result["errors"], columns=["row", "reason"]).to_csv(args.errors, index=False)
+        print(f"Rejected rows written to {args.errors}")
+
+
+if __name__ == "__main__":
+    main()
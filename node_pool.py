@@ -0,0 +1,237 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from resilience import BREAKER_FAILURE_THRESHOLD, CircuitBreaker, CircuitOpenError, is_retryable
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_NODE_URL = "https://fullnode.devnet.aptoslabs.com"
+
+# A node further than this many versions behind the best node is taken out of rotation
+NODE_MAX_LAG = int(os.getenv("NODE_MAX_LAG", "500"))
+
+# Hedge delay used until a node has enough latency samples for a p95
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "0.25"))
+
+
+def node_urls_from_env(default: str = DEFAULT_NODE_URL) -> list:
+    """Read NODE_URLS (comma separated), falling back to NODE_URL"""
+    urls = os.getenv("NODE_URLS") or os.getenv("NODE_URL") or default
+    return parse_node_urls(urls)
+
+
+def parse_node_urls(urls) -> list:
+    """Normalize a comma separated string or list of node URLs"""
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    return [url.strip().rstrip("/") for url in urls if url and url.strip()]
+
+
+def is_failover_error(error: Exception) -> bool:
+    """Whether another node might succeed where this one failed"""
+    return isinstance(error, CircuitOpenError) or is_retryable(error)
+
+
+class NodeEndpoint:
+    """Latency and health statistics for one fullnode"""
+
+    def __init__(self, url: str, window: int = 200, failure_threshold: int = BREAKER_FAILURE_THRESHOLD):
+        self.url = url
+        self.breaker = CircuitBreaker(failure_threshold)
+        self.latency = None
+        self.samples = deque(maxlen=window)
+        self.healthy = True
+        self.ledger_version = 0
+        self.lag = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def record_success(self, latency: float):
+        # Exponentially weighted moving average keeps routing responsive
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.samples.append(latency)
+        self.consecutive_failures = 0
+        self.breaker.record_success()
+
+    def record_failure(self, error: Exception):
+        self.last_error = str(error)
+        # Client errors (404, 400...) say nothing about the node's health
+        if is_retryable(error):
+            self.consecutive_failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def admit(self):
+        """Raise CircuitOpenError unless the breaker lets a call through (one probe when half-open)"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.url, self.breaker.retry_after())
+
+    def p95(self):
+        """95th percentile latency, or None without enough samples"""
+        if len(self.samples) < 20:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "p95_ms": round(self.p95() * 1000, 1) if self.p95() is not None else None,
+            "ledger_version": self.ledger_version,
+            "lag": self.lag,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit": self.breaker.state,
+            "last_error": self.last_error
+        }
+
+
+class NodePool:
+    """Route calls across several fullnodes by latency, with failover and hedging"""
+
+    def __init__(self, urls, max_lag: int = NODE_MAX_LAG, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 hedge_delay: float = HEDGE_DEFAULT_DELAY, rng: random.Random = None):
+        urls = parse_node_urls(urls)
+        if not urls:
+            raise ValueError("At least one node URL is required")
+        self.endpoints = [NodeEndpoint(url, failure_threshold=failure_threshold) for url in urls]
+        self.max_lag = max_lag
+        self.hedge_delay = hedge_delay
+        self.rng = rng or random.Random()
+
+    def _available(self) -> list:
+        closed = [ep for ep in self.endpoints if ep.breaker.available()]
+        if not closed:
+            # Every breaker is open: fail fast instead of piling onto struggling nodes
+            retry_after = min(ep.breaker.retry_after() for ep in self.endpoints)
+            raise CircuitOpenError("all nodes", retry_after)
+        # Lagging nodes are a last resort, not excluded outright
+        return [ep for ep in closed if ep.healthy] or closed
+
+    def ranked(self) -> list:
+        """Available endpoints ordered by latency, unmeasured nodes first"""
+        return sorted(self._available(), key=lambda ep: ep.latency if ep.latency is not None else 0.0)
+
+    def pick(self) -> NodeEndpoint:
+        """Choose an endpoint with probability inversely proportional to its latency"""
+        available = self._available()
+        unmeasured = [ep for ep in available if ep.latency is None]
+        if unmeasured:
+            return unmeasured[0]
+        weights = [1.0 / max(ep.latency, 0.001) for ep in available]
+        return self.rng.choices(available, weights=weights)[0]
+
+    def _order(self) -> list:
+        first = self.pick()
+        return [first] + [ep for ep in self.ranked() if ep is not first]
+
+    async def _timed(self, endpoint: NodeEndpoint, op):
+        endpoint.admit()
+        start = time.perf_counter()
+        try:
+            result = await op(endpoint)
+        except asyncio.CancelledError:
+            # e.g. the losing side of a hedged read
+            endpoint.breaker.release()
+            raise
+        except Exception as e:
+            endpoint.record_failure(e)
+            raise
+        endpoint.record_success(time.perf_counter() - start)
+        return result
+
+    async def failover(self, op):
+        """Run op(endpoint) on the preferred node, moving on to the next one on failure"""
+        last_error = None
+        for endpoint in self._order():
+            try:
+                return await self._timed(endpoint, op)
+            except Exception as e:
+                last_error = e
+                if not is_failover_error(e):
+                    raise
+        raise last_error
+
+    def failover_sync(self, op):
+        """Blocking variant of failover for requests-based callers"""
+        last_error = None
+        for endpoint in self._order():
+            try:
+                endpoint.admit()
+            except CircuitOpenError as e:
+                last_error = e
+                continue
+            start = time.perf_counter()
+            try:
+                result = op(endpoint)
+            except Exception as e:
+                endpoint.record_failure(e)
+                last_error = e
+                if not is_failover_error(e):
+                    raise
+                continue
+            endpoint.record_success(time.perf_counter() - start)
+            return result
+        raise last_error
+
+    async def hedged(self, op):
+        """Run op(endpoint) and duplicate it on a second node once the first passes its p95"""
+        order = self._order()
+        primary, backups = order[0], order[1:]
+        pending = {asyncio.ensure_future(self._timed(primary, op))}
+        delay = primary.p95() or self.hedge_delay
+        hedged = False
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    if not is_failover_error(last_error):
+                        raise last_error
+
+                if not done and not hedged and backups:
+                    # Slower than this node's p95: race a duplicate read on the next node
+                    hedged = True
+                    pending.add(asyncio.ensure_future(self._timed(backups.pop(0), op)))
+                elif done and not pending and backups:
+                    # Every attempt in flight failed: fail over immediately
+                    pending.add(asyncio.ensure_future(self._timed(backups.pop(0), op)))
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def check_health(self, probe):
+        """Probe every node for its ledger version and mark laggards unhealthy"""
+        async def check(endpoint):
+            try:
+                endpoint.ledger_version = int(await self._timed(endpoint, probe))
+                return True
+            except Exception:
+                return False
+
+        results = await asyncio.gather(*(check(ep) for ep in self.endpoints))
+        best_version = max((ep.ledger_version for ep, ok in zip(self.endpoints, results) if ok), default=0)
+        for endpoint, ok in zip(self.endpoints, results):
+            endpoint.lag = best_version - endpoint.ledger_version if ok else None
+            endpoint.healthy = ok and endpoint.lag <= self.max_lag
+
+    async def run_health_checks(self, probe, interval: float = 10.0):
+        """Check node health periodically until cancelled"""
+        while True:
+            try:
+                await self.check_health(probe)
+            except Exception:
+                logger.exception("Node health check failed")
+            await asyncio.sleep(interval)
+
+    def status(self) -> list:
+        return [ep.to_dict() for ep in self.endpoints]
@@ -0,0 +1,210 @@
+import math
+import os
+import threading
+import time
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Timer wheel resolution and size; timers further out than tick * slots wait extra rounds
+PENDING_TICK = float(os.getenv("PENDING_TICK", "1.0"))
+PENDING_WHEEL_SLOTS = int(os.getenv("PENDING_WHEEL_SLOTS", "512"))
+# Seconds past expiration_timestamp_secs before a transaction counts as dropped (ledger clock lag)
+PENDING_EXPIRY_GRACE = float(os.getenv("PENDING_EXPIRY_GRACE", "5"))
+# Transactions still pending after this many seconds are reported as stuck
+PENDING_STUCK_AFTER = float(os.getenv("PENDING_STUCK_AFTER", "30"))
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule and cancel, advancing touches only due slots
+
+    A timer for time t lands in slot ceil(t / tick) % slots and fires once
+    the wheel has advanced past that tick. Timers already due when
+    scheduled (t <= now) fire on the next advance.
+    """
+
+    def __init__(self, tick: float = PENDING_TICK, slots: int = PENDING_WHEEL_SLOTS, now: float = None):
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._timers = {}
+        self._due = {}
+        self._current = math.floor((time.time() if now is None else now) / tick)
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def schedule(self, key, when: float, now: float = None):
+        """Fire key at time when (replaces an existing timer for the key)"""
+        self.cancel(key)
+        tick = math.ceil(when / self.tick)
+        if tick <= self._current or (now is not None and when <= now):
+            self._due[key] = None
+            self._timers[key] = None
+        else:
+            slot = tick % len(self._slots)
+            self._slots[slot][key] = tick
+            self._timers[key] = slot
+
+    def cancel(self, key) -> bool:
+        if key not in self._timers:
+            return False
+        slot = self._timers.pop(key)
+        if slot is None:
+            del self._due[key]
+        else:
+            del self._slots[slot][key]
+        return True
+
+    def advance(self, now: float) -> list:
+        """Move the wheel to now and return the keys that came due, in firing order"""
+        fired = list(self._due)
+        self._due.clear()
+        target = math.floor(now / self.tick)
+        # After a long pause every slot is visited once instead of once per tick
+        ticks = range(self._current + 1, target + 1)
+        if len(ticks) > len(self._slots):
+            ticks = range(target - len(self._slots) + 1, target + 1)
+        for tick in ticks:
+            slot = self._slots[tick % len(self._slots)]
+            due = [key for key, timer_tick in slot.items() if timer_tick <= target]
+            for key in due:
+                del slot[key]
+            fired.extend(due)
+        self._current = max(self._current, target)
+        for key in fired:
+            del self._timers[key]
+        return fired
+
+
+class PendingRegistry:
+    """In-flight transactions with their sender, sequence number and expiry
+
+    Each entry has two wheel timers: one marks it stuck after stuck_after
+    seconds, the other drops it once its expiration timestamp (plus grace)
+    has passed. resolve() cancels both; resolve_sequence() resolves every
+    entry a sender's on-chain sequence number has moved past, so one
+    account read settles all of that sender's executed transactions.
+    poll() hands every dropped entry to on_expired, which decides whether
+    to resubmit or resync the sender.
+    """
+
+    def __init__(self, on_expired=None, grace: float = PENDING_EXPIRY_GRACE,
+                 stuck_after: float = PENDING_STUCK_AFTER, tick: float = PENDING_TICK,
+                 slots: int = PENDING_WHEEL_SLOTS, clock=time.time):
+        self.on_expired = on_expired
+        self.grace = grace
+        self.stuck_after = stuck_after
+        self.clock = clock
+        self.wheel = TimerWheel(tick, slots, clock())
+        self._entries = {}
+        self._by_sender = {}
+        self._lock = threading.Lock()
+        self.stuck = 0
+        self.expired = 0
+        self.resolved = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, txn_hash: str) -> bool:
+        return txn_hash in self._entries
+
+    def add(self, txn_hash: str, sender: str = None, sequence_number: int = None,
+            expires_at: float = None, **extra) -> dict:
+        """Register a submitted transaction; expires_at defaults to now (drop on next poll)"""
+        now = self.clock()
+        entry = dict(extra, hash=txn_hash, sender=sender, sequence_number=sequence_number,
+                     expires_at=expires_at if expires_at is not None else now, submitted_at=now, stuck=False)
+        with self._lock:
+            if txn_hash in self._entries:
+                self._resolve(txn_hash)
+            self._entries[txn_hash] = entry
+            self._by_sender.setdefault(sender, set()).add(txn_hash)
+            self.wheel.schedule(("expire", txn_hash), entry["expires_at"] + self.grace, now)
+            if self.stuck_after:
+                self.wheel.schedule(("stuck", txn_hash), now + self.stuck_after, now)
+        return entry
+
+    def _resolve(self, txn_hash: str):
+        entry = self._entries.pop(txn_hash, None)
+        if entry is not None:
+            hashes = self._by_sender[entry["sender"]]
+            hashes.discard(txn_hash)
+            if not hashes:
+                del self._by_sender[entry["sender"]]
+            self.wheel.cancel(("expire", txn_hash))
+            self.wheel.cancel(("stuck", txn_hash))
+            if entry["stuck"]:
+                self.stuck -= 1
+        return entry
+
+    def resolve(self, txn_hash: str):
+        """Forget a transaction that committed or failed on chain"""
+        with self._lock:
+            entry = self._resolve(txn_hash)
+            if entry is not None:
+                self.resolved += 1
+            return entry
+
+    def resolve_sequence(self, sender: str, next_sequence: int) -> int:
+        """Resolve the sender's entries below its on-chain sequence number; returns how many"""
+        with self._lock:
+            executed = [
+                txn_hash for txn_hash in self._by_sender.get(sender, ())
+                if self._entries[txn_hash]["sequence_number"] is not None
+                and self._entries[txn_hash]["sequence_number"] < next_sequence
+            ]
+            for txn_hash in executed:
+                self._resolve(txn_hash)
+            self.resolved += len(executed)
+            return len(executed)
+
+    def highest_sequence(self, sender: str):
+        """Highest sequence number the sender still has in flight, or None"""
+        with self._lock:
+            sequences = [self._entries[txn_hash]["sequence_number"] for txn_hash in self._by_sender.get(sender, ())]
+        sequences = [sequence for sequence in sequences if sequence is not None]
+        return max(sequences) if sequences else None
+
+    def senders(self) -> list:
+        """Senders with transactions in flight"""
+        with self._lock:
+            return list(self._by_sender)
+
+    def get(self, txn_hash: str):
+        with self._lock:
+            entry = self._entries.get(txn_hash)
+            return dict(entry) if entry else None
+
+    def poll(self, now: float = None) -> list:
+        """Advance the wheel, mark stuck entries and return (and report) the dropped ones"""
+        now = self.clock() if now is None else now
+        expired = []
+        with self._lock:
+            for kind, txn_hash in self.wheel.advance(now):
+                if kind == "stuck":
+                    self._entries[txn_hash]["stuck"] = True
+                    self.stuck += 1
+                else:
+                    entry = self._resolve(txn_hash)
+                    self.expired += 1
+                    expired.append(entry)
+        if expired:
+            logger.warning("Transactions expired without committing",
+                           extra=fields(count=len(expired), senders=len({entry["sender"] for entry in expired})))
+        for entry in expired:
+            if self.on_expired is not None:
+                try:
+                    self.on_expired(entry)
+                except Exception:
+                    logger.exception("Expired transaction handler failed")
+        return expired
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._entries),
+                "stuck": self.stuck,
+                "expired": self.expired,
+                "resolved": self.resolved
+            }
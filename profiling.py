@@ -0,0 +1,231 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Sampling interval and longest allowed run of the sampling profiler (seconds)
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+# Per-request profiles kept for download
+REQUEST_PROFILES_KEPT = int(os.getenv("REQUEST_PROFILES_KEPT", "20"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Sample every thread's stack from a background thread and count collapsed stacks
+
+    Nothing runs while the profiler is stopped. The output is the collapsed
+    format read by flamegraph.pl, speedscope and similar tools: one
+    "thread;outer;...;inner count" line per distinct stack.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = 30.0, interval: float = PROFILE_INTERVAL):
+        """Start a new run that stops by itself after seconds"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiler is already running")
+            self.counts = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            seconds = min(seconds, PROFILE_MAX_SECONDS)
+            self._thread = threading.Thread(target=self._run, args=(seconds, interval), name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the current run and wait for the sampler thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self, seconds: float, interval: float):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(stack)))
+            # Readers snapshot the counts under the same lock
+            with self._lock:
+                self.counts.update(stacks)
+                self.samples += 1
+        self.stopped_at = time.time()
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, most frequent first"""
+        with self._lock:
+            counts = self.counts.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in counts)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "samples": self.samples,
+                "stacks": len(self.counts),
+                "started_at": self.started_at,
+                "stopped_at": self.stopped_at
+            }
+
+
+class RequestProfiles:
+    """cProfile single requests on demand and keep the latest reports
+
+    Only one request is profiled at a time (cProfile is per process). On
+    the event loop, coroutines of other requests that run in between are
+    included in the report. Reports live in the memory of the worker that
+    served the request: with API_WORKERS > 1, fetching an X-Profile-Id
+    from another worker gives a 404, so profile with a single worker.
+    """
+
+    def __init__(self, kept: int = REQUEST_PROFILES_KEPT):
+        self.kept = kept
+        self._reports = OrderedDict()
+        self._active = threading.Lock()
+
+    def begin(self):
+        """A started cProfile.Profile, or None if another request is being profiled"""
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active
+            self._active.release()
+            return None
+        return profile
+
+    def end(self, profile, label: str, top: int = 50) -> str:
+        """Stop profiling, store the report and return its id"""
+        profile.disable()
+        self._active.release()
+        output = io.StringIO()
+        output.write(f"{label}\n\n")
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(top)
+        profile_id = uuid.uuid4().hex[:12]
+        self._reports[profile_id] = output.getvalue()
+        while len(self._reports) > self.kept:
+            self._reports.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str):
+        return self._reports.get(profile_id)
+
+    def ids(self) -> list:
+        return list(self._reports)
+
+
+class ProfileMiddleware:
+    """Plain ASGI middleware that cProfiles a request when an admin sends X-Profile: 1
+
+    Every other request goes straight to the app after one header scan,
+    without the extra task and body streaming of an @app.middleware layer.
+    The report id is added to the response as X-Profile-Id.
+    """
+
+    def __init__(self, app, profiles: RequestProfiles, authorize):
+        # authorize(admin token or None) -> bool
+        self.app = app
+        self.profiles = profiles
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if b"x-profile" not in headers:
+            return await self.app(scope, receive, send)
+        token = headers.get(b"x-admin-token")
+        if not self.authorize(token.decode("latin-1") if token is not None else None):
+            return await self.app(scope, receive, send)
+
+        label = f"{scope['method']} {scope['path']}"
+        profile = self.profiles.begin()
+        state = {"profile": profile}
+
+        async def send_with_report(message):
+            if message["type"] == "http.response.start":
+                extra = [(b"x-profile-error", b"another request is being profiled")]
+                if state["profile"] is not None:
+                    # The handler has finished once headers go out
+                    profile_id = self.profiles.end(state["profile"], label)
+                    state["profile"] = None
+                    extra = [(b"x-profile-id", profile_id.encode())]
+                    logger.info("Request profiled", extra=fields(profile_id=profile_id, path=scope["path"]))
+                message = dict(message, headers=list(message.get("headers", [])) + extra)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            if state["profile"] is not None:
+                self.profiles.end(state["profile"], label)
+
+
+def start_tracemalloc(frames: int = 1):
+    """Start tracing allocations (memory and CPU overhead until stopped)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracemalloc():
+    tracemalloc.stop()
+
+
+def top_allocations(limit: int = 25, group_by: str = "lineno") -> dict:
+    """Current traced memory and the allocation sites holding the most of it"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {
+                "site": str(stat.traceback[0]) if stat.traceback else "?",
+                "size_bytes": stat.size,
+                "count": stat.count
+            }
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+    }
@@ -0,0 +1,162 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# How long "not a student" answers from the node are reused (seconds)
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "30"))
+NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "100000"))
+
+# Trust the Bloom filter of registered students to answer "not registered" locally.
+# Only correct when every registration goes through this API, so it is opt-in.
+STUDENT_BLOOM_FILTER = os.getenv("STUDENT_BLOOM_FILTER", "false").lower() == "true"
+BLOOM_ERROR_RATE = float(os.getenv("BLOOM_ERROR_RATE", "0.01"))
+
+
+def normalize_address(address: str) -> str:
+    """Canonical 0x-prefixed, lowercase, 64 hex digit form of an account address"""
+    address = address.strip().lower()
+    if address.startswith("0x"):
+        address = address[2:]
+    return "0x" + address.zfill(64)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter: no false negatives, about error_rate false positives at capacity"""
+
+    def __init__(self, capacity: int = 10000, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class NegativeCache:
+    """Addresses recently confirmed unregistered, each remembered for ttl seconds"""
+
+    def __init__(self, ttl: float = NEGATIVE_CACHE_TTL, max_entries: int = NEGATIVE_CACHE_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._expires = OrderedDict()
+
+    def add(self, key: str):
+        self._expires.pop(key, None)
+        self._expires[key] = self.clock() + self.ttl
+        # Oldest entries expire first, so evicting from the front drops the stalest
+        while len(self._expires) > self.max_entries:
+            self._expires.popitem(last=False)
+
+    def discard(self, key: str):
+        self._expires.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is None:
+            return False
+        if expires <= self.clock():
+            del self._expires[key]
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._expires)
+
+
+class RegistrationFilter:
+    """Answer "is this address a student?" locally when the answer is known to be no"""
+
+    def __init__(self, source=None, use_bloom: bool = STUDENT_BLOOM_FILTER, ttl: float = NEGATIVE_CACHE_TTL,
+                 error_rate: float = BLOOM_ERROR_RATE, clock=time.monotonic):
+        # source() -> iterable of every registered address (the read model)
+        self.source = source
+        self.use_bloom = use_bloom
+        self.error_rate = error_rate
+        self.negative = NegativeCache(ttl, clock=clock)
+        self.bloom = BloomFilter(error_rate=error_rate)
+        self._lock = threading.Lock()
+        self._resizing = False
+        self.hits = 0
+
+    def load(self, addresses=None):
+        """Rebuild the Bloom filter from every registered address in the read model"""
+        if addresses is None:
+            addresses = self.source() if self.source else []
+        addresses = [normalize_address(address) for address in addresses]
+        # Leave room to grow before the false positive rate degrades
+        bloom = BloomFilter(max(2 * len(addresses), 10000), self.error_rate)
+        for address in addresses:
+            bloom.add(address)
+        with self._lock:
+            self.bloom = bloom
+
+    def known_unregistered(self, address: str) -> bool:
+        """True if the address is certainly not a registered student"""
+        address = normalize_address(address)
+        with self._lock:
+            unregistered = address in self.negative or (self.use_bloom and address not in self.bloom)
+            if unregistered:
+                self.hits += 1
+            return unregistered
+
+    def mark_unregistered(self, address: str):
+        with self._lock:
+            self.negative.add(normalize_address(address))
+
+    def mark_registered(self, address: str):
+        address = normalize_address(address)
+        with self._lock:
+            self.negative.discard(address)
+            if address not in self.bloom:
+                self.bloom.add(address)
+            resize = self.bloom.count > self.bloom.capacity and self.source is not None and not self._resizing
+            if resize:
+                self._resizing = True
+        if resize:
+            # Resize before the false positive rate degrades, reading the read model off the caller's thread
+            threading.Thread(target=self._resize, daemon=True).start()
+
+    def _resize(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.warning("Bloom filter resize failed", extra=fields(error=str(e)))
+        finally:
+            with self._lock:
+                self._resizing = False
+
+    def on_registered(self, key: str):
+        """InvalidationChannel callback for "registered:<address>" keys"""
+        self.mark_registered(key.split(":", 1)[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "bloom_enabled": self.use_bloom,
+                "bloom_entries": self.bloom.count,
+                "negative_entries": len(self.negative),
+                "local_answers": self.hits
+            }
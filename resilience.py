@@ -0,0 +1,191 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+# Retry policy for node calls
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "5.0"))
+# Retries allowed per first attempt, so a struggling node sees at most ~10% extra load
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+
+# Circuit breaker per node endpoint
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# Exception classes (by name, so no HTTP library has to be imported) that mean the request never got an answer
+_TRANSPORT_ERRORS = {"TransportError", "TimeoutException", "Timeout", "ConnectionError"}
+
+
+def status_code_of(error: Exception):
+    """HTTP status carried by an SDK or requests error, if any"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None and getattr(error, "response", None) is not None:
+        # requests.HTTPError keeps the status on the response
+        status_code = getattr(error.response, "status_code", None)
+    return status_code
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the same call might succeed if tried again
+
+    Timeouts, dropped connections, 408, 429 and 5xx are transient. Other
+    4xx responses and programming errors will fail the same way every time.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    status_code = status_code_of(error)
+    if status_code is not None:
+        return status_code in (408, 429) or status_code >= 500
+    if isinstance(error, (OSError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in _TRANSPORT_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a node whose circuit breaker is open"""
+
+    def __init__(self, target: str, retry_after: float):
+        super().__init__(f"Circuit open for {target}, retry in {retry_after:.1f}s")
+        self.target = target
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after repeated failures, then probe it again after a cool-down
+
+    Closed: calls go through. Open: calls fail fast until reset_timeout has
+    passed. Half-open: allow() admits a single probe and everyone else sees
+    the breaker open until it ends; a success closes the breaker, a failure
+    opens it again at once.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if not self.probing and self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def available(self) -> bool:
+        """Whether allow() would admit a call now"""
+        return self.state != self.OPEN
+
+    def allow(self) -> bool:
+        """Admit a call: always when closed, and only one probe at a time when half-open"""
+        with self._lock:
+            state = self.state
+            if state == self.HALF_OPEN:
+                self.probing = True
+            return state != self.OPEN
+
+    def release(self):
+        """End a probe that gave no verdict (cancelled, or answered with a client error)"""
+        with self._lock:
+            self.probing = False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.probing = False
+
+
+class RetryBudget:
+    """Token bucket that caps retries to a fraction of first attempts
+
+    Every call deposits ratio tokens and every retry spends one, so when a
+    node is down retries stop once the budget is spent instead of
+    multiplying the load on it.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_tokens: float = 10, max_tokens: float = 100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """Retry retryable errors with full-jitter exponential backoff, within a retry budget"""
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, budget: RetryBudget = None, rng: random.Random = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Sleep before the given retry: uniform in [0, min(max_delay, base * 2^attempt)]"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        return attempt < self.max_attempts and is_retryable(error) and self.budget.withdraw()
+
+    async def call(self, op):
+        """Await op() until it succeeds or a retry is not allowed"""
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return await op()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
+
+    def call_sync(self, op):
+        """Blocking variant of call"""
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return op()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            time.sleep(self.delay(attempt))
+            attempt += 1
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Serve cached resources without asking the node for this long (seconds)
+RESOURCE_REVALIDATE_AFTER = float(os.getenv("RESOURCE_REVALIDATE_AFTER", "2"))
+# Refetch in full after this long even if the account looks unchanged (seconds)
+RESOURCE_MAX_AGE = float(os.getenv("RESOURCE_MAX_AGE", "60"))
+RESOURCE_CACHE_MAX_ENTRIES = int(os.getenv("RESOURCE_CACHE_MAX_ENTRIES", "10000"))
+
+# Cache key for the full resource list of an account
+ALL_RESOURCES = "*"
+
+
+class StaleReadError(Exception):
+    """A node answered from a ledger version older than the read requires"""
+
+    # Treated like an unavailable node, so failover and retries move on to another one
+    status_code = 503
+
+    def __init__(self, ledger_version: int, min_version: int):
+        super().__init__(f"Node is at ledger version {ledger_version}, read requires {min_version}")
+        self.ledger_version = ledger_version
+        self.min_version = min_version
+
+
+class CachedResource:
+    def __init__(self, data, ledger_version: int, sequence_number: int, now: float):
+        self.data = data
+        self.ledger_version = ledger_version
+        self.sequence_number = sequence_number
+        self.fetched_at = now
+        self.validated_at = now
+
+
+class ResourceCache:
+    """Resource reads cached per (address, resource type) together with their ledger version
+
+    A cached entry is served as is for revalidate_after seconds. After that,
+    one small account read checks the sequence number: if the account has not
+    sent a transaction since, the entry is still current and only its ledger
+    version moves forward. Resources written by other accounts' transactions
+    (such as coin deposits) are picked up on invalidate() or after max_age.
+    """
+
+    def __init__(self, fetch, probe, revalidate_after: float = RESOURCE_REVALIDATE_AFTER,
+                 max_age: float = RESOURCE_MAX_AGE, max_entries: int = RESOURCE_CACHE_MAX_ENTRIES,
+                 clock=time.monotonic):
+        # fetch(address, resource_type, min_version) -> (data, ledger_version, sequence_number)
+        # probe(address, min_version) -> (sequence_number, ledger_version)
+        self.fetch = fetch
+        self.probe = probe
+        self.revalidate_after = revalidate_after
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def peek(self, address: str, resource_type: str = ALL_RESOURCES, min_version: int = None):
+        """Data get() would serve without any node request, or None"""
+        key = (address, resource_type)
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is None or now - entry.fetched_at >= self.max_age or now - entry.validated_at >= self.revalidate_after:
+            return None
+        if min_version is not None and entry.ledger_version < min_version:
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry.data
+
+    async def get(self, address: str, resource_type: str = ALL_RESOURCES, min_version: int = None):
+        """Resource data as of at least min_version, from the cache when possible"""
+        data = self.peek(address, resource_type, min_version)
+        if data is not None:
+            return data
+        key = (address, resource_type)
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry.fetched_at < self.max_age:
+            sequence_number, ledger_version = await self.probe(address, min_version)
+            if sequence_number == entry.sequence_number:
+                # Nothing sent from the account: the entry is current as of the probe's version
+                entry.ledger_version = max(entry.ledger_version, ledger_version)
+                entry.validated_at = self.clock()
+                self.revalidations += 1
+                return entry.data
+
+        # Concurrent misses for the same key share one fetch
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, min_version))
+            self._inflight[key] = task
+
+            def done(finished):
+                if self._inflight.get(key) is finished:
+                    del self._inflight[key]
+            task.add_done_callback(done)
+        data = await asyncio.shield(task)
+        entry = self._entries.get(key)
+        if min_version is not None and (entry is None or entry.ledger_version < min_version):
+            # Joined a fetch started for an older version
+            return await self.get(address, resource_type, min_version)
+        return data
+
+    async def _load(self, key, min_version):
+        self.misses += 1
+        data, ledger_version, sequence_number = await self.fetch(key[0], key[1], min_version)
+        if self._inflight.get(key) is not asyncio.current_task():
+            # This key was invalidated while in flight: hand the data to this caller but do not keep it
+            return data
+        self._entries[key] = CachedResource(data, ledger_version, sequence_number, self.clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def invalidate(self, address: str):
+        """Drop every cached resource of an account, and keep its in-flight fetches from being cached"""
+        for key in [key for key in self._inflight if key[0] == address]:
+            del self._inflight[key]
+        for key in [key for key in self._entries if key[0] == address]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses
+        }
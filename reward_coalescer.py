@@ -0,0 +1,190 @@
+import asyncio
+import os
+import threading
+import time
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Coalescing is opt-in: a window of 0 pays every reward immediately
+REWARD_COALESCE_WINDOW = float(os.getenv("REWARD_COALESCE_WINDOW", "0"))
+# Flush a student's balance early once it reaches this amount (0 = no threshold)
+REWARD_COALESCE_THRESHOLD = int(os.getenv("REWARD_COALESCE_THRESHOLD", "0"))
+
+PENDING_NAMESPACE = "pending_rewards"
+
+
+def coalescing_enabled() -> bool:
+    return REWARD_COALESCE_WINDOW > 0 or REWARD_COALESCE_THRESHOLD > 0
+
+
+class RewardCoalescer:
+    """Accumulate rewards per student and pay each balance out as one transfer
+
+    Pending balances live in the shared store, so they survive a crash and are
+    visible to every worker. A flush first moves the balance to an in-flight
+    slot in the same record, then sends the transfer; a failed transfer moves
+    it back so nothing is lost or paid twice.
+    """
+
+    def __init__(self, store, send_transfer, window: float = REWARD_COALESCE_WINDOW,
+                 threshold: int = REWARD_COALESCE_THRESHOLD, clock=time.time):
+        # send_transfer(sender_address, student_address, amount) -> transaction hash
+        self.store = store
+        self.send_transfer = send_transfer
+        self.window = window
+        self.threshold = threshold
+        self.clock = clock
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, student_address: str, sender_address: str, amount: int, lesson_id=None) -> dict:
+        """Add a reward to the student's pending balance; flushes at once past the threshold"""
+        now = self.clock()
+
+        def add(pending):
+            pending = pending or {"amount": 0, "lessons": [], "first_recorded_at": None, "in_flight": None}
+            if pending["amount"] == 0:
+                pending["first_recorded_at"] = now
+            pending["amount"] += amount
+            # The balance is paid from the sender it started with
+            pending.setdefault("sender_address", sender_address)
+            if lesson_id is not None:
+                pending["lessons"].append(lesson_id)
+            return pending
+
+        pending = self.store.update(PENDING_NAMESPACE, student_address, add)
+        if self.threshold and pending["amount"] >= self.threshold:
+            self.flush(student_address)
+            pending = self.pending(student_address)
+        return pending
+
+    def pending(self, student_address: str) -> dict:
+        """Pending and in-flight reward state for a student"""
+        return self.store.get(PENDING_NAMESPACE, student_address) or {
+            "amount": 0, "lessons": [], "first_recorded_at": None, "in_flight": None
+        }
+
+    def due(self) -> list:
+        """Students whose window has elapsed or whose balance reached the threshold"""
+        now = self.clock()
+        return [
+            student for student, pending in self.store.items(PENDING_NAMESPACE)
+            if pending["amount"] > 0 and pending["in_flight"] is None and (
+                now - pending["first_recorded_at"] >= self.window
+                or (self.threshold and pending["amount"] >= self.threshold)
+            )
+        ]
+
+    def _claim(self, student_address: str):
+        claimed = {}
+
+        def claim(pending):
+            if not pending or pending["amount"] == 0 or pending["in_flight"] is not None:
+                return pending
+            claimed.update(amount=pending["amount"], lessons=pending["lessons"],
+                           sender_address=pending["sender_address"], started_at=self.clock())
+            pending.update(amount=0, lessons=[], first_recorded_at=None, in_flight=dict(claimed))
+            return pending
+
+        self.store.update(PENDING_NAMESPACE, student_address, claim)
+        return claimed or None
+
+    def _settle(self, student_address: str, txn_hash: str = None):
+        def settle(pending):
+            if txn_hash is None:
+                # Transfer failed: put the in-flight amount back in front of newer rewards
+                in_flight = pending["in_flight"]
+                if pending["amount"] == 0:
+                    pending["first_recorded_at"] = in_flight["started_at"]
+                pending["amount"] += in_flight["amount"]
+                pending["lessons"] = in_flight["lessons"] + pending["lessons"]
+            pending["in_flight"] = None
+            # Nothing left to pay: drop the record
+            return pending if pending["amount"] else None
+
+        self.store.update(PENDING_NAMESPACE, student_address, settle)
+
+    def flush(self, student_address: str = None) -> list:
+        """Pay out pending balances now, for one student or everyone"""
+        students = [student_address] if student_address else [
+            student for student, pending in self.store.items(PENDING_NAMESPACE) if pending["amount"] > 0
+        ]
+        return [self._flush_one(student) for student in students]
+
+    def flush_due(self) -> list:
+        """Pay out every balance whose window or threshold has been reached"""
+        return [self._flush_one(student) for student in self.due()]
+
+    def _flush_one(self, student_address: str) -> dict:
+        claimed = self._claim(student_address)
+        if claimed is None:
+            return {"student_address": student_address, "status": "skipped", "amount": 0}
+
+        try:
+            txn_hash = self.send_transfer(claimed["sender_address"], student_address, claimed["amount"])
+        except Exception as e:
+            self._settle(student_address)
+            return {"student_address": student_address, "status": "failed", "amount": claimed["amount"], "error": str(e)}
+
+        if not txn_hash:
+            # Without a hash nothing proves the transfer was sent: keep the balance
+            self._settle(student_address)
+            return {"student_address": student_address, "status": "failed", "amount": claimed["amount"],
+                    "error": "Transfer returned no transaction hash"}
+
+        self._settle(student_address, txn_hash)
+        return {
+            "student_address": student_address,
+            "status": "success",
+            "amount": claimed["amount"],
+            "lessons": claimed["lessons"],
+            "transaction_hash": txn_hash
+        }
+
+    def recover(self, older_than: float = 300) -> int:
+        """Return transfers stuck in flight (e.g. after a crash) to the pending balance
+
+        A crash between sending a transfer and settling it may mean the
+        transfer went through, so this is an explicit operator action and
+        every recovered balance is printed for review.
+        """
+        recovered = 0
+        now = self.clock()
+        for student, pending in self.store.items(PENDING_NAMESPACE):
+            in_flight = pending["in_flight"]
+            if in_flight is not None and now - in_flight["started_at"] >= older_than:
+                logger.warning("Recovering in-flight reward", extra=fields(student=student, amount=in_flight["amount"]))
+                self._settle(student)
+                recovered += 1
+        return recovered
+
+    def start(self, interval: float = 1.0):
+        """Flush due balances from a daemon thread, for callers without an event loop"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._flush_periodically, args=(interval,),
+                                            name="reward-flush", daemon=True)
+            self._thread.start()
+
+    def _flush_periodically(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.flush_due()
+            except Exception:
+                logger.exception("Reward flush failed")
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    async def run(self, interval: float = 1.0):
+        """Flush due balances periodically until cancelled"""
+        while True:
+            try:
+                await asyncio.to_thread(self.flush_due)
+            except Exception:
+                logger.exception("Reward flush failed")
+            await asyncio.sleep(interval)
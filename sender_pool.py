@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Sender pool configuration
+SENDER_POOL_STRATEGY = os.getenv("SENDER_POOL_STRATEGY", "least_loaded")
+SENDER_TOPUP_WATERMARK = int(os.getenv("SENDER_TOPUP_WATERMARK", "10000000"))
+SENDER_TOPUP_AMOUNT = int(os.getenv("SENDER_TOPUP_AMOUNT", "50000000"))
+SENDER_MAX_FAILURES = int(os.getenv("SENDER_MAX_FAILURES", "3"))
+SENDER_STUCK_AFTER = float(os.getenv("SENDER_STUCK_AFTER", "60"))
+
+
+def private_keys_from_env() -> list:
+    """Sender keys from SENDER_PRIVATE_KEYS (comma separated), falling back to APTOS_PRIVATE_KEY"""
+    keys = os.getenv("SENDER_PRIVATE_KEYS") or os.getenv("APTOS_PRIVATE_KEY") or ""
+    return [key.strip() for key in keys.split(",") if key.strip()]
+
+
+def load_lanes(private_keys) -> list:
+    """One SenderLane per private key"""
+    from aptos_sdk.account import Account
+    lanes = []
+    for private_key in private_keys:
+        # Remove 0x prefix if present
+        if private_key.startswith("0x"):
+            private_key = private_key[2:]
+        account = Account.load_key(private_key)
+        lanes.append(SenderLane(account, str(account.address())))
+    return lanes
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def claim_worker_slot(store, workers: int, namespace: str = "sender_workers") -> int:
+    """Claim a worker index in [0, workers) for this process, taking over slots of dead processes
+
+    Worker processes sharing SENDER_PRIVATE_KEYS each keep lane sequence
+    numbers in memory, so every worker must own a disjoint set of lanes.
+    The index picks that set (see lanes_for_worker).
+    """
+    pid = os.getpid()
+    for index in range(workers):
+        claimed = store.update(namespace, str(index), lambda owner: (
+            {"pid": pid} if owner is None or owner["pid"] == pid or not _process_alive(owner["pid"]) else owner
+        ))
+        if claimed["pid"] == pid:
+            return index
+    raise RuntimeError(f"All {workers} sender worker slots are held by running processes")
+
+
+def release_worker_slot(store, index: int, namespace: str = "sender_workers"):
+    """Give back a slot from claim_worker_slot"""
+    pid = os.getpid()
+    store.update(namespace, str(index), lambda owner: None if owner is None or owner["pid"] == pid else owner)
+
+
+def lanes_for_worker(lanes, index: int, workers: int) -> list:
+    """This worker's share of the lanes; no two workers share a lane"""
+    if workers > len(lanes):
+        raise ValueError(f"{workers} API workers need at least as many sender accounts, got {len(lanes)}")
+    return list(lanes)[index::workers]
+
+
+def is_sequence_error(error) -> bool:
+    """Whether the node rejected a transaction because our sequence number is off"""
+    text = f"{error} {getattr(getattr(error, 'response', None), 'text', '')}".upper()
+    return "SEQUENCE_NUMBER_TOO_OLD" in text or "SEQUENCE_NUMBER_TOO_NEW" in text
+
+
+class NoSenderAvailable(Exception):
+    """Raised when every sender lane is out of rotation"""
+
+
+class SenderLane:
+    """One hot-wallet sender account and its local sequence number"""
+
+    def __init__(self, account, address: str):
+        self.account = account
+        self.address = address
+        self.next_sequence = None
+        self.in_flight = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.balance = None
+        self.last_progress_at = time.time()
+        self.needs_resync = True
+
+    def to_dict(self) -> dict:
+        return {
+            "address": self.address,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "next_sequence": self.next_sequence,
+            "balance": self.balance,
+            "consecutive_failures": self.consecutive_failures
+        }
+
+
+class SenderPool:
+    """Spread payouts over several sender accounts so sequence numbers stop serializing them"""
+
+    def __init__(self, lanes, get_sequence, get_balance=None, top_up=None,
+                 strategy: str = SENDER_POOL_STRATEGY, watermark: int = SENDER_TOPUP_WATERMARK,
+                 topup_amount: int = SENDER_TOPUP_AMOUNT, max_failures: int = SENDER_MAX_FAILURES,
+                 stuck_after: float = SENDER_STUCK_AFTER, clock=time.time, outstanding=None):
+        # get_sequence(address) -> int, get_balance(address) -> int,
+        # top_up(address, amount) -> transaction hash (transfer from the treasury),
+        # outstanding(address) -> highest sequence number still pending in mempool, or None
+        if not lanes:
+            raise ValueError("At least one sender account is required")
+        self.lanes = list(lanes)
+        self.get_sequence = get_sequence
+        self.get_balance = get_balance
+        self.top_up = top_up
+        self.strategy = strategy
+        self.watermark = watermark
+        self.topup_amount = topup_amount
+        self.max_failures = max_failures
+        self.stuck_after = stuck_after
+        self.clock = clock
+        self.outstanding = outstanding
+        self._round_robin = itertools.cycle(range(len(self.lanes)))
+        self._lock = threading.Lock()
+
+    def _rotation(self) -> list:
+        return [lane for lane in self.lanes if lane.healthy]
+
+    def choose(self) -> SenderLane:
+        """Assign work to a lane (round-robin or least in-flight) and count it as in flight"""
+        with self._lock:
+            rotation = self._rotation()
+            if not rotation:
+                raise NoSenderAvailable("No healthy sender accounts available")
+            if self.strategy == "round_robin":
+                lane = None
+                while lane is None:
+                    candidate = self.lanes[next(self._round_robin)]
+                    lane = candidate if candidate.healthy else None
+            else:
+                lane = min(rotation, key=lambda l: l.in_flight)
+            if lane.in_flight == 0:
+                # An idle lane is not stuck; its stall clock starts with this work
+                lane.last_progress_at = self.clock()
+            lane.in_flight += 1
+            return lane
+
+    def cancel(self, lane: SenderLane):
+        """Give back an assignment whose work never started"""
+        with self._lock:
+            lane.in_flight = max(0, lane.in_flight - 1)
+
+    def next_sequence(self, lane: SenderLane) -> int:
+        """Reserve the lane's next sequence number, syncing from the chain when needed"""
+        with self._lock:
+            needs_resync = lane.needs_resync
+        if needs_resync:
+            self.resync(lane)
+        with self._lock:
+            sequence = lane.next_sequence
+            lane.next_sequence += 1
+            return sequence
+
+    def resync(self, lane: SenderLane):
+        """Reload the lane's sequence number from the chain, skipping numbers still pending in mempool"""
+        sequence = self.get_sequence(lane.address)
+        if self.outstanding is not None:
+            # The chain has not counted transactions still in mempool; reusing their numbers would replace them
+            highest = self.outstanding(lane.address)
+            if highest is not None:
+                sequence = max(sequence, highest + 1)
+        with self._lock:
+            lane.next_sequence = sequence
+            lane.needs_resync = False
+
+    def release(self, lane: SenderLane, success: bool = True, error: Exception = None):
+        """Finish a unit of work on a lane and update its health"""
+        with self._lock:
+            lane.in_flight = max(0, lane.in_flight - 1)
+            if success:
+                lane.consecutive_failures = 0
+                lane.last_progress_at = self.clock()
+                return
+            lane.consecutive_failures += 1
+            # Any failure may have left a gap; resync before the next reservation
+            lane.needs_resync = True
+            if lane.consecutive_failures >= self.max_failures:
+                lane.healthy = False
+            if error is not None and is_sequence_error(error):
+                logger.warning("Sequence mismatch, resyncing", extra=fields(sender=lane.address))
+
+    def check_health(self):
+        """Refresh balances, top up low lanes, bench stuck lanes and readmit recovered ones"""
+        now = self.clock()
+        for lane in self.lanes:
+            try:
+                if self.get_balance is not None:
+                    lane.balance = self.get_balance(lane.address)
+                    if lane.balance < self.watermark and self.top_up is not None:
+                        logger.info("Topping up sender", extra=fields(sender=lane.address, balance=lane.balance))
+                        self.top_up(lane.address, self.topup_amount)
+
+                stuck = lane.in_flight > 0 and now - lane.last_progress_at > self.stuck_after
+                if stuck:
+                    with self._lock:
+                        lane.healthy = False
+                        lane.needs_resync = True
+
+                # Lanes out of rotation come back once they resync and have funds
+                if not lane.healthy and not stuck:
+                    self.resync(lane)
+                    funded = lane.balance is None or lane.balance >= self.watermark
+                    with self._lock:
+                        if funded:
+                            lane.healthy = True
+                            lane.consecutive_failures = 0
+            except Exception as e:
+                logger.warning("Sender health check failed", extra=fields(sender=lane.address, error=str(e)))
+
+    async def run(self, interval: float = 30.0):
+        """Check lane health periodically until cancelled"""
+        while True:
+            await asyncio.to_thread(self.check_health)
+            await asyncio.sleep(interval)
+
+    def status(self) -> list:
+        with self._lock:
+            return [lane.to_dict() for lane in self.lanes]
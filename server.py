@@ -1,37 +1,176 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-import uvicorn
+from contextlib import asynccontextmanager
+import asyncio
 from datetime import datetime
 import os
+import hmac
 from dotenv import load_dotenv
-import requests
-import base64
-import hashlib
-from aptos_sdk.account import Account
-from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
-from aptos_sdk.async_client import RestClient, FaucetClient
-import json
+from aptos_runtime import AptosClients
+from node_pool import node_urls_from_env
+from shared_state import SharedStore, InvalidationChannel
+from resilience import CircuitOpenError, status_code_of
+from registration_filter import RegistrationFilter, normalize_address
+from fast_response import HAS_ORJSON, BodyCache, dumps, etag_matches, respond
+from tx_tracker import TransactionTracker, COMMITTED
+from event_hub import EventHub
+from submission_scheduler import SubmissionScheduler, QueueFullError, is_overload_error, PRIORITY_STUDENT, PRIORITY_BULK
+from app_logging import get_logger, fields
+from profiling import SamplingProfiler, RequestProfiles, ProfileMiddleware, start_tracemalloc, stop_tracemalloc, top_allocations
+from lesson_content import get_lesson_content
+
+logger = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 # API configuration
-NODE_URL = os.getenv("NODE_URL", "https://fullnode.devnet.aptoslabs.com")
+NODE_URLS = node_urls_from_env()
 FAUCET_URL = os.getenv("FAUCET_URL", "https://faucet.devnet.aptoslabs.com")
 MODULE_ADDRESS = os.getenv("MODULE_ADDRESS", "your_module_address")
 MODULE_NAME = os.getenv("MODULE_NAME", "LearningApp")
 
-app = FastAPI()
+# Seconds between keep-alive messages on idle event streams
+EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", "15"))
+# Finished transactions stay visible to late subscribers for this long (seconds)
+TRACKER_RETENTION = float(os.getenv("TRACKER_RETENTION", "300"))
+# Transactions one worker tracks at most; subscribers cannot add hashes beyond it
+TRACKER_MAX_TRACKED = int(os.getenv("TRACKER_MAX_TRACKED", "10000"))
+
+# Node reads in flight for one batch progress request, and addresses allowed per request
+PROGRESS_BATCH_CONCURRENCY = int(os.getenv("PROGRESS_BATCH_CONCURRENCY", "32"))
+PROGRESS_BATCH_MAX = int(os.getenv("PROGRESS_BATCH_MAX", "1000"))
+
+# Token required by the /admin endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Pre-connect to the node during startup instead of on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+# Aptos clients are created on first use, not at import time
+clients = AptosClients(NODE_URLS, FAUCET_URL)
+
+# Bounded per-sender queues with an adaptive node concurrency limit
+scheduler = SubmissionScheduler()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        await clients.warm_up()
+    clients.start_health_checks()
+    await asyncio.to_thread(registration_filter.load)
+    invalidation_task = asyncio.ensure_future(invalidations.run())
+    tracker_task = asyncio.ensure_future(tracker.run())
+    yield
+    tracker.stop()
+    tracker_task.cancel()
+    invalidation_task.cancel()
+    await clients.close()
+
+# orjson serializes every response when it is installed
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse if HAS_ORJSON else JSONResponse)
+
+# Serialized bodies of cached reads, reused until the underlying resources change
+body_cache = BodyCache()
+
+# Number of uvicorn worker processes; state below is shared between them
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
+# Storage shared by all workers, plus a channel to keep per-worker caches coherent
+store = SharedStore()
+invalidations = InvalidationChannel(store)
+students = store.namespace("students")
+lessons = store.namespace("lessons")
+lesson_completions = store.namespace("lesson_completions")
+
+# Answer lookups for addresses that never registered without a node round trip
+registration_filter = RegistrationFilter(source=lambda: store.keys("students"))
+invalidations.subscribe("registered:", registration_filter.on_registered)
+
+async def publish(*keys: str):
+    """Publish invalidations from a thread; SQLite writes can wait on other workers for the busy timeout"""
+    def write():
+        for key in keys:
+            invalidations.publish(key)
+    await asyncio.to_thread(write)
+
+def invalidate_resources(key: str):
+    """Drop this worker's cached resources for the address in a progress:/resources: key"""
+    clients.resources.invalidate(key.split(":", 1)[1])
+
+invalidations.subscribe("progress:", invalidate_resources)
+invalidations.subscribe("resources:", invalidate_resources)
+
+# Lesson bodies live in the local blob store; transactions carry only their hash
+lesson_content = get_lesson_content()
+
+# One confirmation tracker per worker feeds every push subscriber on it
+tracker = TransactionTracker(clients.fetch_transaction)
+hub = EventHub()
+# Student whose progress each transaction submitted here changes
+txn_students = {}
+
+def track_submission(txn_hash: str, label: str, student_address: str = None):
+    """Follow a submitted transaction so subscribers hear when it commits"""
+    tracker.track(txn_hash, label)
+    if student_address is not None:
+        txn_students[txn_hash] = student_address
+
+def on_transaction_update(entry: dict):
+    hub.publish(f"tx:{entry['hash']}", {"type": "transaction", "data": entry})
+    student_address = txn_students.pop(entry["hash"], None)
+    if student_address is not None and entry["status"] == COMMITTED:
+        # Reaches every worker, this one included, through the invalidation channel
+        asyncio.ensure_future(publish(f"progress:{student_address}"))
+    asyncio.get_running_loop().call_later(
+        TRACKER_RETENTION, lambda: asyncio.ensure_future(retire_transaction(entry["hash"])))
+
+tracker.add_listener(on_transaction_update)
+
+async def retire_transaction(txn_hash: str):
+    """Forget a finished transaction once late subscribers have had their chance"""
+    tracker.forget(txn_hash)
+    await asyncio.to_thread(store.delete, "transactions", txn_hash)
+
+async def on_signed_submission(txn_hash: str, raw_transaction):
+    """Register the sender, sequence number and expiry of every transaction this worker signs"""
+    tracker.track(txn_hash, sender=str(raw_transaction.sender), sequence_number=raw_transaction.sequence_number,
+                  expires_at=raw_transaction.expiration_timestamps_secs)
+    # Lets every worker tell hashes submitted here from ones a client made up
+    await asyncio.to_thread(store.insert, "transactions", txn_hash, {"sender": str(raw_transaction.sender)})
 
-# Initialize Aptos clients
-client = RestClient(NODE_URL)
-faucet_client = FaucetClient(FAUCET_URL, client)
+clients.submit_listeners.append(on_signed_submission)
 
-# In-memory storage for development
-students = {}
-lessons = {}
-lesson_completions = {}
+def progress_from_resources(resources: list):
+    """Progress fields of the Student resource, or None if the account is not a student"""
+    student_resource = next(
+        (r for r in resources if r["type"] == f"{MODULE_ADDRESS}::{MODULE_NAME}::Student"),
+        None
+    )
+    if student_resource is None:
+        return None
+    return {
+        "lessons_completed": student_resource["data"]["lessons_completed"],
+        "total_rewards": student_resource["data"]["total_rewards"]
+    }
+
+async def push_progress(student_address: str):
+    """Read a student's progress once and send it to everyone following it"""
+    topic = f"progress:{student_address}"
+    if not hub.has_subscribers(topic):
+        return
+    try:
+        progress = progress_from_resources(await clients.cached_account_resources(student_address))
+    except Exception as e:
+        if status_code_of(e) != 404:
+            logger.warning("Progress push failed", extra=fields(student_address=student_address, error=str(e)))
+            return
+        progress = None
+    hub.publish(topic, {"type": "progress", "data": progress})
+
+invalidations.subscribe("progress:", lambda key: asyncio.ensure_future(push_progress(key.split(":", 1)[1])))
 
 class StudentRegistration(BaseModel):
     student_address: str
@@ -49,6 +188,10 @@ class Lesson(BaseModel):
     signature: str
     network: str
 
+class ProgressBatch(BaseModel):
+    addresses: List[str]
+    min_version: Optional[int] = None
+
 class LessonCompletion(BaseModel):
     student_address: str
     lesson_id: int
@@ -64,9 +207,27 @@ def verify_signature(message: str, signature: str, public_key: str) -> bool:
         # For now, we'll accept any valid signature
         return True
     except Exception as e:
-        print(f"Signature verification failed: {str(e)}")
+        logger.warning("Signature verification failed", extra=fields(error=str(e)))
         return False
 
+async def submit_scheduled(account, payload, priority: int = PRIORITY_STUDENT) -> str:
+    """Queue a signed submission for the sender, turning overload and open circuits into 503 + Retry-After"""
+    sender = str(account.address())
+    try:
+        return await scheduler.submit(sender, lambda: clients.sign_and_submit(account, payload), priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+    except Exception as e:
+        if is_overload_error(e):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Node is overloaded: {str(e)}",
+                headers={"Retry-After": str(scheduler.retry_after(sender))}
+            )
+        raise
+
 def get_address_from_public_key(public_key: str) -> str:
     """Derive address from public key"""
     try:
@@ -80,17 +241,122 @@ def get_address_from_public_key(public_key: str) -> str:
 async def root():
     return {"message": "Crypto Literacy Learning App API is running"}
 
+@app.get("/scheduler")
+async def get_scheduler():
+    """Submission queue depth and current concurrency limit"""
+    return scheduler.stats()
+
+@app.get("/registrations")
+async def get_registrations():
+    """Bloom filter and negative cache sizes, and how many lookups they answered"""
+    return registration_filter.stats()
+
+@app.get("/nodes")
+async def get_nodes():
+    """Health, lag and latency of each fullnode in the pool"""
+    return clients.pool.status()
+
+async def follow(subscription, tx=(), student=()):
+    """Subscribe to transactions and students, sending the current state of each first"""
+    for txn_hash in tx:
+        topic = f"tx:{txn_hash}"
+        # Only transactions this deployment submitted are tracked, up to TRACKER_MAX_TRACKED per worker
+        if tracker.status(txn_hash) is None and (
+                len(tracker) >= TRACKER_MAX_TRACKED
+                or await asyncio.to_thread(store.get, "transactions", txn_hash) is None):
+            subscription.deliver({"type": "error", "topic": topic, "error": "Transaction is not tracked"})
+            continue
+        if not subscription.add([topic]):
+            subscription.deliver({"type": "error", "topic": topic, "error": "Too many topics"})
+            return
+        # Hashes submitted through another worker get tracked here too, once per worker
+        subscription.deliver({"type": "transaction", "topic": topic, "data": tracker.track(txn_hash)})
+    for student_address in student:
+        student_address = normalize_address(student_address)
+        if not subscription.add([f"progress:{student_address}"]):
+            subscription.deliver({"type": "error", "topic": f"progress:{student_address}", "error": "Too many topics"})
+            return
+        asyncio.ensure_future(push_progress(student_address))
+
+@app.get("/events")
+async def stream_events(request: Request, tx: List[str] = Query(default=[]), student: List[str] = Query(default=[])):
+    """Server-Sent Events for transaction hashes (?tx=) and student progress (?student=)"""
+    subscription = hub.subscribe()
+    await follow(subscription, tx, student)
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=EVENT_HEARTBEAT)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {dumps(event).decode()}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def socket_events(websocket: WebSocket):
+    """The same events over a WebSocket; send {"tx": [...], "student": [...]} to follow more"""
+    await websocket.accept()
+    subscription = hub.subscribe()
+    await follow(subscription, websocket.query_params.getlist("tx"), websocket.query_params.getlist("student"))
+
+    async def receive():
+        try:
+            while True:
+                try:
+                    message = await websocket.receive_json()
+                except ValueError:
+                    message = None
+                # Anything but an object of lists gets an error frame and leaves the socket open
+                if not (isinstance(message, dict) and isinstance(message.get("tx", []), list)
+                        and isinstance(message.get("student", []), list)):
+                    subscription.deliver({"type": "error", "error": 'Expected {"tx": [...], "student": [...]}'})
+                    continue
+                await follow(subscription, [str(txn_hash) for txn_hash in message.get("tx", [])],
+                             [str(address) for address in message.get("student", [])])
+        except WebSocketDisconnect:
+            pass
+
+    receiver = asyncio.ensure_future(receive())
+    try:
+        while not receiver.done():
+            event = await subscription.get(timeout=EVENT_HEARTBEAT)
+            if event is not None:
+                await websocket.send_text(dumps(event).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        subscription.close()
+
+@app.get("/cache")
+async def get_cache():
+    """Resource cache hits, revalidations and misses for this worker"""
+    return clients.resources.stats()
+
+@app.get("/events/stats")
+async def get_event_stats():
+    """Push subscriptions and transactions tracked by this worker, with stuck and expired counts"""
+    return dict(hub.stats(), tracked_pending=len(tracker.pending()), transactions=tracker.stats())
+
 @app.post("/register")
 async def register_student(registration: StudentRegistration):
     try:
         # Debug information
-        print("Received registration data:", registration.model_dump())
+        logger.debug("Received registration", extra=fields(request=registration.model_dump()))
         
         # Basic validation
         if not registration.student_address:
             raise HTTPException(status_code=400, detail="Student address is required")
         
         # Create transaction payload
+        from aptos_sdk.account import Account
+        from aptos_sdk.transactions import TransactionPayload, EntryFunction
         payload = TransactionPayload(
             EntryFunction.natural(
                 f"{MODULE_ADDRESS}::{MODULE_NAME}",
@@ -111,53 +377,77 @@ async def register_student(registration: StudentRegistration):
             account = Account.load_key(private_key)
             
             # Submit transaction
-            txn_hash = client.submit_transaction(account, payload)
+            txn_hash = await submit_scheduled(account, payload, PRIORITY_STUDENT)
+            
+            # Record the student in the read model and let every worker drop what it cached
+            student_address = normalize_address(str(account.address()))
+            record = {"transaction_hash": txn_hash, "registered_at": int(datetime.now().timestamp())}
+            await asyncio.to_thread(students.__setitem__, student_address, record)
+            registration_filter.mark_registered(student_address)
+            track_submission(txn_hash, "Register student", student_address)
+            await publish(f"registered:{student_address}", f"progress:{student_address}")
             
             return {
                 "message": "Student registered successfully",
                 "transaction_hash": txn_hash
             }
+        except HTTPException:
+            raise
         except Exception as e:
-            print("Transaction failed:", str(e))
+            logger.error("Transaction failed", extra=fields(error=str(e)))
             raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
     except HTTPException as he:
-        print("Registration failed with HTTPException:", str(he))
+        logger.info("Registration rejected", extra=fields(status_code=he.status_code, detail=he.detail))
         raise he
     except Exception as e:
-        print("Registration failed with error:", str(e))
+        logger.exception("Registration failed")
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @app.post("/create_lesson")
 async def create_lesson(lesson: Lesson):
     try:
-        # Create transaction payload
-        payload = TransactionPayload(
-            EntryFunction.natural(
-                f"{MODULE_ADDRESS}::{MODULE_NAME}",
-                "create_lesson",
-                [],
-                [
-                    TransactionArgument(lesson.title, "String"),
-                    TransactionArgument(lesson.description, "String"),
-                    TransactionArgument(lesson.reward_amount, "U64")
-                ]
-            )
-        )
+        from aptos_sdk.account import Account
+        from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
         
         # Submit transaction
         try:
             # Create account from private key
             account = Account.load_key(lesson.public_key)
             
-            # Submit transaction
-            txn_hash = client.submit_transaction(account, payload)
+            # Long descriptions go to the blob store and are referenced by hash; only a
+            # caller with a valid key can store one, and it is removed if submission fails
+            description = await asyncio.to_thread(lesson_content.stage_description, lesson.description)
+            submitted = False
+            try:
+                payload = TransactionPayload(
+                    EntryFunction.natural(
+                        f"{MODULE_ADDRESS}::{MODULE_NAME}",
+                        "create_lesson",
+                        [],
+                        [
+                            TransactionArgument(lesson.title, "String"),
+                            TransactionArgument(description, "String"),
+                            TransactionArgument(lesson.reward_amount, "U64")
+                        ]
+                    )
+                )
+                
+                # Submit transaction
+                txn_hash = await submit_scheduled(account, payload, PRIORITY_BULK)
+                submitted = True
+            finally:
+                await asyncio.to_thread(lesson_content.settle_description, description, submitted)
+            track_submission(txn_hash, f"Create lesson: {lesson.title}")
+            await publish(f"resources:{MODULE_ADDRESS}")
             
             return {
                 "message": "Lesson created successfully",
                 "transaction_hash": txn_hash
             }
+        except HTTPException:
+            raise
         except Exception as e:
-            print("Transaction failed:", str(e))
+            logger.error("Transaction failed", extra=fields(error=str(e)))
             raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
     except HTTPException as he:
         raise he
@@ -168,7 +458,7 @@ async def create_lesson(lesson: Lesson):
 async def complete_lesson(completion: LessonCompletion):
     try:
         # Debug information
-        print("Received completion data:", completion.model_dump())
+        logger.debug("Received lesson completion", extra=fields(request=completion.model_dump()))
         
         # Validate input
         if not completion.student_address:
@@ -177,6 +467,8 @@ async def complete_lesson(completion: LessonCompletion):
             raise HTTPException(status_code=400, detail="Lesson ID is required")
         
         # Create transaction payload
+        from aptos_sdk.account import Account
+        from aptos_sdk.transactions import TransactionPayload, EntryFunction, TransactionArgument
         payload = TransactionPayload(
             EntryFunction.natural(
                 f"{MODULE_ADDRESS}::{MODULE_NAME}",
@@ -194,30 +486,46 @@ async def complete_lesson(completion: LessonCompletion):
             account = Account.load_key(completion.public_key)
             
             # Submit transaction
-            txn_hash = client.submit_transaction(account, payload)
+            txn_hash = await submit_scheduled(account, payload, PRIORITY_STUDENT)
+            student_address = normalize_address(str(account.address()))
+            track_submission(txn_hash, f"Complete lesson {completion.lesson_id}", student_address)
+            await publish(f"progress:{student_address}")
             
             return {
                 "message": "Lesson completed successfully",
                 "transaction_hash": txn_hash
             }
+        except HTTPException:
+            raise
         except Exception as e:
-            print("Transaction failed:", str(e))
+            logger.error("Transaction failed", extra=fields(error=str(e)))
             raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
     except HTTPException as he:
-        print("HTTP Exception in complete_lesson:", str(he))
+        logger.info("Lesson completion rejected", extra=fields(status_code=he.status_code, detail=he.detail))
         raise he
     except Exception as e:
-        print("General error in complete_lesson:", str(e))
+        logger.exception("Lesson completion failed")
         raise HTTPException(status_code=500, detail=f"Lesson completion failed: {str(e)}")
 
 @app.get("/progress/{student_address}")
-async def get_progress(student_address: str):
+async def get_progress(request: Request, student_address: str, min_version: Optional[int] = None):
     try:
         if not student_address:
             raise HTTPException(status_code=400, detail="Student address is required")
         
-        # Get account resources
-        resources = client.account_resources(student_address)
+        student_address = normalize_address(student_address)
+        if registration_filter.known_unregistered(student_address):
+            raise HTTPException(status_code=404, detail="Student not found")
+        
+        # Get account resources; an account that does not exist yet is not a student either
+        try:
+            # min_version gives read-your-writes after a transaction committed at that version
+            resources = await clients.cached_account_resources(student_address, min_version)
+        except Exception as e:
+            if status_code_of(e) == 404:
+                registration_filter.mark_unregistered(student_address)
+                raise HTTPException(status_code=404, detail="Student not found")
+            raise
         
         # Find the student resource
         student_resource = next(
@@ -226,32 +534,161 @@ async def get_progress(student_address: str):
         )
         
         if student_resource:
-            return {
-                "lessons_completed": student_resource["data"]["lessons_completed"],
-                "total_rewards": student_resource["data"]["total_rewards"]
-            }
+            registration_filter.mark_registered(student_address)
+            body = body_cache.get(f"progress:{student_address}", student_resource, lambda r: {
+                "lessons_completed": r["data"]["lessons_completed"],
+                "total_rewards": r["data"]["total_rewards"]
+            })
+            return respond(request, body)
         else:
+            registration_filter.mark_unregistered(student_address)
             raise HTTPException(status_code=404, detail="Student not found")
     except HTTPException as he:
         raise he
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get progress: {str(e)}")
 
+@app.post("/progress/batch")
+async def get_progress_batch(batch: ProgressBatch):
+    """Progress for many students at once, in request order"""
+    if len(batch.addresses) > PROGRESS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PROGRESS_BATCH_MAX} addresses per request")
+    
+    semaphore = asyncio.Semaphore(PROGRESS_BATCH_CONCURRENCY)
+    
+    async def one(student_address: str) -> dict:
+        # Known non-students and freshly validated resources are answered without a node request
+        # or a concurrency slot; older cache entries still cost one sequence number probe
+        if registration_filter.known_unregistered(student_address):
+            return {"address": student_address, "status": "not_found"}
+        try:
+            resources = clients.resources.peek(student_address, min_version=batch.min_version)
+            if resources is None:
+                async with semaphore:
+                    resources = await clients.cached_account_resources(student_address, batch.min_version)
+        except Exception as e:
+            if status_code_of(e) == 404:
+                registration_filter.mark_unregistered(student_address)
+                return {"address": student_address, "status": "not_found"}
+            return {"address": student_address, "status": "error", "error": str(e)}
+        
+        progress = progress_from_resources(resources)
+        if progress is None:
+            registration_filter.mark_unregistered(student_address)
+            return {"address": student_address, "status": "not_found"}
+        registration_filter.mark_registered(student_address)
+        return dict(progress, address=student_address, status="ok")
+    
+    # Each distinct address is read once, however often it appears
+    addresses = [normalize_address(address) for address in batch.addresses]
+    unique = list(dict.fromkeys(addresses))
+    results = dict(zip(unique, await asyncio.gather(*(one(address) for address in unique))))
+    return {"results": [results[address] for address in addresses]}
+
+def lesson_resources(resources: list) -> list:
+    """Lesson resources among the module account's resources, with their bodies inlined"""
+    return [
+        lesson_content.resolve_resource(r) for r in resources 
+        if r["type"].startswith(f"{MODULE_ADDRESS}::{MODULE_NAME}::Lesson")
+    ]
+
 @app.get("/lessons")
-async def get_lessons():
+async def get_lessons(request: Request):
     try:
         # Get module resources
-        resources = client.account_resources(MODULE_ADDRESS)
-        
-        # Find all lesson resources
-        lessons = [
-            r for r in resources 
-            if r["type"].startswith(f"{MODULE_ADDRESS}::{MODULE_NAME}::Lesson")
-        ]
+        resources = await clients.cached_account_resources(MODULE_ADDRESS)
         
-        return lessons
+        # Serialized and compressed once per resource snapshot; unchanged lists cost a 304
+        return respond(request, body_cache.get("lessons", resources, lesson_resources))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get lessons: {str(e)}")
 
+@app.get("/lesson_content/{digest}")
+async def get_lesson_content_body(request: Request, digest: str):
+    """Lesson body by content hash, from memory when it is hot"""
+    try:
+        data = await asyncio.to_thread(lesson_content.blobs.get, digest.lower())
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if data is None:
+        raise HTTPException(status_code=404, detail="Lesson content not found")
+    # Content never changes for a hash, so clients may keep it forever
+    etag = f'"{digest.lower()}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return PlainTextResponse(status_code=304, headers=headers)
+    return PlainTextResponse(data.decode(), headers=headers)
+
+# Profiling is off unless an admin starts it: no sampler thread, no tracemalloc, one header check per request
+profiler = SamplingProfiler()
+request_profiles = RequestProfiles()
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+async def require_admin(request: Request):
+    if not is_admin(request.headers.get("x-admin-token")):
+        # Indistinguishable from a missing route
+        raise HTTPException(status_code=404, detail="Not Found")
+
+# cProfile a request when an admin sends X-Profile: 1; other requests pass straight through
+app.add_middleware(ProfileMiddleware, profiles=request_profiles, authorize=is_admin)
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def start_profile(seconds: float = Query(30.0, gt=0), interval: float = Query(0.005, gt=0)):
+    """Sample every thread's stack in the worker that serves this request for the given number of seconds"""
+    try:
+        profiler.start(seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def stop_profile():
+    await asyncio.to_thread(profiler.stop)
+    return profiler.status()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def get_profile():
+    """Collapsed stacks of the last run, for flamegraph.pl or speedscope"""
+    return PlainTextResponse(profiler.collapsed(),
+                             headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
+
+@app.get("/admin/profile/status", dependencies=[Depends(require_admin)])
+async def get_profile_status():
+    return dict(profiler.status(), request_profiles=request_profiles.ids())
+
+@app.get("/admin/profile/requests/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: str):
+    """A request profile report; only the worker that served the request has it (see RequestProfiles)"""
+    report = request_profiles.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
+
+@app.post("/admin/memory/start", dependencies=[Depends(require_admin)])
+async def start_memory_trace(frames: int = Query(1, ge=1, le=50)):
+    """Start tracemalloc; allocations get slower until it is stopped"""
+    start_tracemalloc(frames)
+    return {"tracing": True}
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def get_memory_trace(top: int = Query(25, ge=1, le=500), group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """Traced memory and the top allocation sites"""
+    try:
+        return await asyncio.to_thread(top_allocations, top, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/memory/stop", dependencies=[Depends(require_admin)])
+async def stop_memory_trace():
+    stop_tracemalloc()
+    return {"tracing": False}
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    import uvicorn
+    uvicorn.run("server:app", host="127.0.0.1", port=8000, workers=API_WORKERS)
@@ -0,0 +1,89 @@
+import os
+import threading
+import zlib
+
+# Lock partitions for the in-memory student store; more shards means less contention
+STORE_SHARDS = int(os.getenv("STORE_SHARDS", "64"))
+
+
+class ShardedStore:
+    """Dict-like in-memory store split into address-hashed shards, each with its own lock
+
+    Single operations lock only their key's shard. Check-then-act sequences
+    hold lock_for(key) around them; the lock is re-entrant, so store
+    methods can be called inside. companion() gives a second store
+    partitioned the same way and guarded by the same locks, so records
+    about one address in both stores change together.
+    """
+
+    def __init__(self, shards: int = STORE_SHARDS, shard_key=None, locks=None):
+        # shard_key(key) picks the value that decides the shard (the key itself by default)
+        self.shard_key = shard_key or (lambda key: key)
+        self.locks = locks or [threading.RLock() for _ in range(shards)]
+        self._shards = [{} for _ in self.locks]
+
+    def companion(self, shard_key=None) -> "ShardedStore":
+        """Another store sharing this one's partitioning and locks"""
+        return ShardedStore(shard_key=shard_key, locks=self.locks)
+
+    def _index(self, key) -> int:
+        return zlib.crc32(str(self.shard_key(key)).lower().encode()) % len(self.locks)
+
+    def lock_for(self, key) -> threading.RLock:
+        return self.locks[self._index(key)]
+
+    def __contains__(self, key) -> bool:
+        index = self._index(key)
+        with self.locks[index]:
+            return key in self._shards[index]
+
+    def __getitem__(self, key):
+        index = self._index(key)
+        with self.locks[index]:
+            return self._shards[index][key]
+
+    def __setitem__(self, key, value):
+        index = self._index(key)
+        with self.locks[index]:
+            self._shards[index][key] = value
+
+    def __delitem__(self, key):
+        index = self._index(key)
+        with self.locks[index]:
+            del self._shards[index][key]
+
+    def get(self, key, default=None):
+        index = self._index(key)
+        with self.locks[index]:
+            return self._shards[index].get(key, default)
+
+    def pop(self, key, default=None):
+        index = self._index(key)
+        with self.locks[index]:
+            return self._shards[index].pop(key, default)
+
+    def setdefault(self, key, value):
+        """Insert value unless the key exists; returns the stored value"""
+        index = self._index(key)
+        with self.locks[index]:
+            return self._shards[index].setdefault(key, value)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def items(self) -> list:
+        """Snapshot of all records, consistent within each shard"""
+        items = []
+        for lock, shard in zip(self.locks, self._shards):
+            with lock:
+                items.extend(shard.items())
+        return items
+
+    def keys(self) -> list:
+        return [key for key, _ in self.items()]
+
+    def values(self) -> list:
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Local store shared by every worker process on the machine
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state.db")
+
+# How long published invalidations are kept for workers that poll late (seconds)
+INVALIDATION_RETENTION = int(os.getenv("INVALIDATION_RETENTION", "300"))
+
+
+class SharedStore:
+    """JSON records in SQLite, safe to use from several processes and threads"""
+
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._publish_count = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per thread, and never reused across a fork
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS invalidations ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace: str, key: str, default=None):
+        row = self._connection().execute(
+            "SELECT value FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def put(self, namespace: str, key: str, value):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO records (namespace, key, value) VALUES (?, ?, ?)",
+            (namespace, key, json.dumps(value))
+        )
+
+    def put_many(self, namespace: str, items):
+        """Write many (key, value) pairs in one transaction"""
+        connection = self._connection()
+        with self._transaction(connection):
+            connection.executemany(
+                "INSERT OR REPLACE INTO records (namespace, key, value) VALUES (?, ?, ?)",
+                [(namespace, key, json.dumps(value)) for key, value in items]
+            )
+
+    def insert(self, namespace: str, key: str, value) -> bool:
+        """Store a record only if the key is new; returns False if it already existed"""
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO records (namespace, key, value) VALUES (?, ?, ?)",
+            (namespace, key, json.dumps(value))
+        )
+        return cursor.rowcount == 1
+
+    def update(self, namespace: str, key: str, fn, default=None):
+        """Atomically replace a record with fn(current) across all processes
+
+        If fn returns None the record is deleted.
+        """
+        connection = self._connection()
+        with self._transaction(connection):
+            row = connection.execute(
+                "SELECT value FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            value = fn(json.loads(row[0]) if row else default)
+            if value is None:
+                connection.execute("DELETE FROM records WHERE namespace = ? AND key = ?", (namespace, key))
+            else:
+                connection.execute(
+                    "INSERT OR REPLACE INTO records (namespace, key, value) VALUES (?, ?, ?)",
+                    (namespace, key, json.dumps(value))
+                )
+        return value
+
+    def delete(self, namespace: str, key: str) -> bool:
+        cursor = self._connection().execute(
+            "DELETE FROM records WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+        return cursor.rowcount == 1
+
+    def keys(self, namespace: str) -> list:
+        rows = self._connection().execute(
+            "SELECT key FROM records WHERE namespace = ? ORDER BY key", (namespace,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def items(self, namespace: str) -> list:
+        rows = self._connection().execute(
+            "SELECT key, value FROM records WHERE namespace = ? ORDER BY key", (namespace,)
+        ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def count(self, namespace: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM records WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+    def namespace(self, namespace: str) -> "SharedDict":
+        """Dict-like view of one namespace"""
+        return SharedDict(self, namespace)
+
+    def publish(self, key: str):
+        """Tell every worker that cached data for key is stale"""
+        connection = self._connection()
+        now = time.time()
+        connection.execute("INSERT INTO invalidations (key, created) VALUES (?, ?)", (key, now))
+        self._publish_count += 1
+        if self._publish_count % 100 == 0:
+            connection.execute("DELETE FROM invalidations WHERE created < ?", (now - INVALIDATION_RETENTION,))
+
+    def invalidations_since(self, seq: int) -> list:
+        return self._connection().execute(
+            "SELECT seq, key FROM invalidations WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+
+    def last_invalidation(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM invalidations").fetchone()[0]
+
+    class _transaction:
+        # BEGIN IMMEDIATE takes the database write lock up front, so
+        # read-modify-write sequences cannot interleave between processes
+        def __init__(self, connection):
+            self.connection = connection
+
+        def __enter__(self):
+            self.connection.execute("BEGIN IMMEDIATE")
+
+        def __exit__(self, exc_type, exc, tb):
+            self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+            return False
+
+
+class SharedDict(MutableMapping):
+    """MutableMapping over one SharedStore namespace, for code written against plain dicts"""
+
+    def __init__(self, store: SharedStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def __getitem__(self, key):
+        value = self.store.get(self.namespace, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.store.put(self.namespace, key, value)
+
+    def __delitem__(self, key):
+        if not self.store.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.store.get(self.namespace, key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        return iter(self.store.keys(self.namespace))
+
+    def __len__(self):
+        return self.store.count(self.namespace)
+
+
+_MISSING = object()
+
+
+class InvalidationChannel:
+    """Deliver invalidations published by any worker to this worker's caches"""
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+        self.last_seq = None
+        self._subscribers = []
+
+    def subscribe(self, prefix: str, callback):
+        """Call callback(key) for every invalidated key starting with prefix"""
+        self._subscribers.append((prefix, callback))
+
+    def publish(self, key: str):
+        self.store.publish(key)
+
+    def _fetch(self) -> list:
+        if self.last_seq is None:
+            # Only changes made after this worker started are relevant
+            self.last_seq = self.store.last_invalidation()
+            return []
+        rows = self.store.invalidations_since(self.last_seq)
+        if rows:
+            self.last_seq = rows[-1][0]
+        return [key for _, key in rows]
+
+    def _dispatch(self, keys: list):
+        for key in keys:
+            for prefix, callback in self._subscribers:
+                if key.startswith(prefix):
+                    callback(key)
+
+    def poll(self) -> list:
+        """Dispatch invalidations published since the last poll and return their keys"""
+        keys = self._fetch()
+        self._dispatch(keys)
+        return keys
+
+    async def run(self, interval: float = 0.5):
+        """Poll for invalidations until cancelled, dispatching on the event loop"""
+        while True:
+            try:
+                self._dispatch(await asyncio.to_thread(self._fetch))
+            except Exception:
+                logger.exception("Invalidation poll failed")
+            await asyncio.sleep(interval)
@@ -0,0 +1,135 @@
+import asyncio
+import atexit
+import base64
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Signing processes (0 = one per CPU core)
+SIGNING_WORKERS = int(os.getenv("SIGNING_WORKERS", "0")) or os.cpu_count() or 1
+# Batches smaller than this are signed in the calling process; the pool round trip costs more
+SIGNING_MIN_BATCH = int(os.getenv("SIGNING_MIN_BATCH", "32"))
+
+# Keys parsed once per process, by private key hex
+_signing_keys = {}
+_accounts = {}
+
+
+def _strip_hex(private_key_hex: str) -> str:
+    return private_key_hex[2:] if private_key_hex.startswith("0x") else private_key_hex
+
+
+def _signing_key(private_key_hex: str):
+    key = _signing_keys.get(private_key_hex)
+    if key is None:
+        import nacl.signing
+        key = _signing_keys[private_key_hex] = nacl.signing.SigningKey(bytes.fromhex(_strip_hex(private_key_hex)))
+    return key
+
+
+def _account(private_key_hex: str):
+    account = _accounts.get(private_key_hex)
+    if account is None:
+        from aptos_sdk.account import Account
+        account = _accounts[private_key_hex] = Account.load_key(private_key_hex)
+    return account
+
+
+def _init_worker(private_keys):
+    """Parse the known sender keys once when a worker starts"""
+    for private_key_hex in private_keys:
+        _signing_key(private_key_hex)
+
+
+def sign_messages(private_key_hex: str, messages: list) -> list:
+    """Raw ed25519 signatures of byte strings"""
+    key = _signing_key(private_key_hex)
+    return [key.sign(message).signature for message in messages]
+
+
+def sign_payloads(private_key_hex: str, payloads: list) -> list:
+    """base64 signed JSON payloads, the scheme blockchain_manager submits"""
+    key = _signing_key(private_key_hex)
+    return [base64.b64encode(key.sign(json.dumps(payload).encode())).decode() for payload in payloads]
+
+
+def sign_raw_transactions(private_key_hex: str, raw_transactions: list) -> list:
+    """BCS bytes of signed aptos_sdk RawTransactions, ready for submission"""
+    from aptos_sdk.transactions import SignedTransaction
+    account = _account(private_key_hex)
+    return [SignedTransaction(raw, account.sign_transaction(raw)).bytes() for raw in raw_transactions]
+
+
+class SigningService:
+    """Sign batches in a process pool, returning results in input order
+
+    Each call takes one signing function above, one private key and a
+    list of items. The list is split into one chunk per worker. Workers
+    start on first use and keep parsed keys between calls.
+    """
+
+    def __init__(self, max_workers: int = SIGNING_WORKERS, private_keys=(), min_batch: int = SIGNING_MIN_BATCH):
+        self.max_workers = max_workers
+        self.private_keys = list(private_keys)
+        self.min_batch = min_batch
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: forking a process that runs event loop and logging threads is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker, initargs=(self.private_keys,)
+                    )
+        return self._executor
+
+    def _chunks(self, items: list) -> list:
+        size = -(-len(items) // self.max_workers)
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def map(self, sign, private_key_hex: str, items) -> list:
+        """sign(private_key_hex, items) spread over the pool"""
+        items = list(items)
+        if len(items) < self.min_batch or self.max_workers <= 1:
+            return sign(private_key_hex, items)
+        futures = [self.executor.submit(sign, private_key_hex, chunk) for chunk in self._chunks(items)]
+        return [result for future in futures for result in future.result()]
+
+    async def amap(self, sign, private_key_hex: str, items) -> list:
+        """map() without blocking the event loop"""
+        items = list(items)
+        if len(items) < self.min_batch or self.max_workers <= 1:
+            return sign(private_key_hex, items)
+        futures = [asyncio.wrap_future(self.executor.submit(sign, private_key_hex, chunk)) for chunk in self._chunks(items)]
+        return [result for chunk in await asyncio.gather(*futures) for result in chunk]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_service = None
+
+
+def get_signing_service() -> SigningService:
+    """Process-wide signing service, preloaded with the configured sender keys"""
+    global _service
+    if _service is None:
+        from sender_pool import private_keys_from_env
+        _service = SigningService(private_keys=private_keys_from_env())
+    return _service
+
+
+def shutdown():
+    if _service is not None:
+        _service.close()
+
+
+atexit.register(shutdown)
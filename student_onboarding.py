@@ -0,0 +1,255 @@
+"""Bulk student onboarding from a roster file.
+
+Reads a CSV or JSONL roster with an ``address`` column (and, for
+school-managed wallets, a ``private_key`` column), normalizes and
+deduplicates the addresses, and registers the students through a
+BlockchainManager with a bounded number of registrations in flight.
+Progress is checkpointed, so a rerun skips finished rows and retries
+from the first failed registration:
+
+    python student_onboarding.py roster.csv
+    python student_onboarding.py roster.jsonl --on-chain --workers 16
+    python student_onboarding.py roster.csv --simulate
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from lesson_import import Checkpoint, read_catalog
+from registration_filter import normalize_address
+
+# Roster rows per chunk (one checkpoint and progress line each) and registrations in flight
+ONBOARD_CHUNK_SIZE = int(os.getenv("ONBOARD_CHUNK_SIZE", "500"))
+ONBOARD_WORKERS = int(os.getenv("ONBOARD_WORKERS", "8"))
+
+ADDRESS_PATTERN = re.compile(r"^(0x)?[0-9a-fA-F]{1,64}$")
+
+# Outcomes of onboarding one student
+REGISTERED = "registered"
+ALREADY_REGISTERED = "already_registered"
+
+# How a register_student transaction fails when the Student resource already exists
+ALREADY_REGISTERED_ERRORS = ("RESOURCE_ALREADY_EXISTS", "already registered")
+
+
+def count_rows(path: str) -> int:
+    """Data rows in the roster, for the ETA"""
+    with open(path, "rb") as f:
+        lines = sum(1 for line in f if line.strip())
+    return lines if path.endswith((".jsonl", ".ndjson")) else max(lines - 1, 0)
+
+
+def normalize_roster(chunk: pd.DataFrame, first_row: int, seen: set):
+    """Students from a roster chunk, and (row, reason) errors; seen carries addresses across chunks"""
+    if "address" not in chunk.columns:
+        raise ValueError("Roster is missing the address column")
+
+    keys = chunk["private_key"] if "private_key" in chunk.columns else [None] * len(chunk)
+    students, errors = [], []
+    for row, address, private_key in zip(range(first_row, first_row + len(chunk)), chunk["address"], keys):
+        address = "" if pd.isna(address) else str(address).strip()
+        if not ADDRESS_PATTERN.match(address):
+            errors.append((row, "invalid address"))
+            continue
+        address = normalize_address(address)
+        if address in seen:
+            errors.append((row, "duplicate address"))
+            continue
+        seen.add(address)
+        private_key = None if private_key is None or pd.isna(private_key) else str(private_key).strip() or None
+        students.append({"row": row, "address": address, "private_key": private_key})
+    return students, errors
+
+
+def chain_registrar(manager):
+    """Register on chain through blockchain.BlockchainManager; rows without a key are recorded off-chain only"""
+    def register(student):
+        if student["private_key"] is None:
+            return None
+        # The contract registers the signer, so the key must belong to the roster address
+        account = manager.create_account_from_private_key(student["private_key"])
+        if account is None:
+            raise ValueError("invalid private key")
+        if normalize_address(str(account.address())) != student["address"]:
+            raise ValueError("private key does not match address")
+        # Reruns skip students already on chain instead of paying for a transaction that aborts
+        if manager.get_student_progress(student["address"])["success"]:
+            return ALREADY_REGISTERED
+        result = manager.register_student(student["address"], student["private_key"])
+        if not result["success"]:
+            if any(error.lower() in result["error"].lower() for error in ALREADY_REGISTERED_ERRORS):
+                return ALREADY_REGISTERED
+            raise RuntimeError(result["error"])
+        return result["transaction_hash"]
+    return register
+
+
+def simulated_registrar(manager):
+    """Register against blockchain_manager.BlockchainManager and its ledger simulator"""
+    def register(student):
+        try:
+            result = manager.register_student(student["address"], student["private_key"] or "simulated")
+        except ValueError as e:
+            if "already registered" in str(e):
+                return ALREADY_REGISTERED
+            raise
+        if result["status"] == "failed":
+            raise RuntimeError(result["error"])
+        return result.get("transaction_hash")
+    return register
+
+
+class Onboarder:
+    """Register students with a bounded number in flight and record them in the shared store"""
+
+    def __init__(self, register, store=None, workers: int = ONBOARD_WORKERS):
+        # register(student) -> transaction hash, None (nothing on chain) or ALREADY_REGISTERED
+        self.register = register
+        self.store = store
+        self.invalidations = None
+        if store is not None:
+            from shared_state import InvalidationChannel
+            self.invalidations = InvalidationChannel(store)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="onboard")
+
+    def onboard(self, student: dict):
+        """REGISTERED, ALREADY_REGISTERED or the exception that stopped this student"""
+        try:
+            if self.store is not None and self.store.get("students", student["address"]) is not None:
+                return ALREADY_REGISTERED
+            txn_hash = self.register(student)
+            if txn_hash == ALREADY_REGISTERED:
+                return ALREADY_REGISTERED
+            if self.store is not None:
+                record = {"transaction_hash": txn_hash, "registered_at": int(time.time())}
+                if not self.store.insert("students", student["address"], record):
+                    return ALREADY_REGISTERED
+                # Running API workers update their registration filters
+                self.invalidations.publish(f"registered:{student['address']}")
+            return REGISTERED
+        except Exception as e:
+            return e
+
+    def onboard_all(self, students: list) -> list:
+        """Outcomes in roster order"""
+        return list(self.executor.map(self.onboard, students))
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def onboard_roster(path: str, onboarder: Onboarder, checkpoint: Checkpoint,
+                   chunk_size: int = ONBOARD_CHUNK_SIZE, report=print) -> dict:
+    """Stream the roster, register every new student and checkpoint after each chunk"""
+    start = time.perf_counter()
+    total = count_rows(path)
+    counts = {REGISTERED: 0, ALREADY_REGISTERED: 0}
+    error_rows = []
+    seen = set()
+    row = 0
+    done_this_run = 0
+    resume_from = checkpoint.rows_done
+    # Rows from the first failed registration on are retried by the next run
+    retry_from = None
+
+    for chunk in read_catalog(path, chunk_size):
+        first_row, row = row, row + len(chunk)
+        students, errors = normalize_roster(chunk, first_row, seen)
+        if row <= resume_from:
+            # Finished before; read only so later duplicates are still caught
+            continue
+        students = [student for student in students if student["row"] >= resume_from]
+        errors = [error for error in errors if error[0] >= resume_from]
+        error_rows.extend(errors)
+
+        for student, outcome in zip(students, onboarder.onboard_all(students)):
+            if isinstance(outcome, Exception):
+                error_rows.append((student["row"], f"registration failed: {outcome}"))
+                if retry_from is None:
+                    retry_from = student["row"]
+            else:
+                counts[outcome] += 1
+
+        done_this_run += row - max(first_row, resume_from)
+        checkpoint.rows_done = row if retry_from is None else retry_from
+        checkpoint.errors += len(errors)
+        checkpoint.save()
+
+        elapsed = time.perf_counter() - start
+        rate = done_this_run / max(elapsed, 1e-9)
+        eta = format_eta((total - row) / rate) if rate > 0 and total > row else "0:00:00"
+        report(f"{row}/{total} rows, {counts[REGISTERED]} registered, {counts[ALREADY_REGISTERED]} already registered, "
+               f"{len(error_rows)} errors, {rate:.0f} rows/s, ETA {eta}")
+
+    return {
+        "registered": counts[REGISTERED],
+        "already_registered": counts[ALREADY_REGISTERED],
+        "errors": error_rows,
+        "rows": row,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register the students in a CSV or JSONL roster")
+    parser.add_argument("roster", help="Path to a .csv or .jsonl roster with an address column")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <roster>.checkpoint.json, none with --simulate)")
+    parser.add_argument("--chunk-size", type=int, default=ONBOARD_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=ONBOARD_WORKERS, help="Registrations in flight")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--on-chain", action="store_true", help="Also register rows with a private_key on chain")
+    mode.add_argument("--simulate", action="store_true", help="Dry run against the local ledger simulator")
+    parser.add_argument("--errors", help="Write rejected rows to this CSV file")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    store = None
+    if args.simulate:
+        from blockchain_manager import BlockchainManager
+        manager = BlockchainManager()
+        register = simulated_registrar(manager)
+    else:
+        from shared_state import SharedStore
+        store = SharedStore()
+        if args.on_chain:
+            from blockchain import BlockchainManager
+            register = chain_registrar(BlockchainManager())
+        else:
+            register = lambda student: None
+
+    checkpoint_path = args.checkpoint or f"{args.roster}.checkpoint.json"
+    if args.simulate and not args.checkpoint:
+        # A dry run must not mark rows done for the real run
+        scratch = tempfile.TemporaryDirectory()
+        checkpoint_path = os.path.join(scratch.name, "checkpoint.json")
+    checkpoint = Checkpoint(checkpoint_path)
+    onboarder = Onboarder(register, store, args.workers)
+    try:
+        result = onboard_roster(args.roster, onboarder, checkpoint, args.chunk_size)
+    finally:
+        onboarder.close()
+
+    print(f"Registered {result['registered']} students ({result['already_registered']} already registered) "
+          f"from {result['rows']} rows in {result['seconds']:.1f}s with {len(result['errors'])} errors")
+    if args.simulate:
+        print(f"Simulated ledger: {manager.simulator.stats()}")
+
+    if args.errors and result["errors"]:
+        pd.DataFrame(result["errors"], columns=["row", "reason"]).to_csv(args.errors, index=False)
+        print(f"Rejected rows written to {args.errors}")
+
+
+if __name__ == "__main__":
+    main()
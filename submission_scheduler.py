@@ -0,0 +1,150 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+# Priority lanes: lower numbers are served first
+PRIORITY_STUDENT = 0
+PRIORITY_BULK = 1
+
+# Scheduler limits
+SUBMIT_QUEUE_SIZE = int(os.getenv("SUBMIT_QUEUE_SIZE", "100"))
+SUBMIT_CONCURRENCY = int(os.getenv("SUBMIT_CONCURRENCY", "8"))
+SUBMIT_MAX_CONCURRENCY = int(os.getenv("SUBMIT_MAX_CONCURRENCY", "64"))
+
+
+class QueueFullError(Exception):
+    """Raised when a sender's submission queue cannot take more work"""
+
+    def __init__(self, sender: str, retry_after: int):
+        super().__init__(f"Submission queue for {sender} is full, retry in {retry_after}s")
+        self.sender = sender
+        self.retry_after = retry_after
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Whether the node is telling us to slow down (429, 503 or a full mempool)"""
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status_code in (429, 503):
+        return True
+    text = f"{error} {getattr(response, 'text', '')}".lower()
+    return "mempool_is_full" in text or "mempool is full" in text
+
+
+class AIMDLimiter:
+    """Concurrency limit that grows additively on success and halves on overload"""
+
+    def __init__(self, initial: int = SUBMIT_CONCURRENCY, min_limit: int = 1,
+                 max_limit: int = SUBMIT_MAX_CONCURRENCY, backoff: float = 0.5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int = PRIORITY_STUDENT):
+        """Wait for a slot; waiting callers are served by priority, then arrival order"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # A slot handed to us just before cancellation must go back
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self, overloaded: bool = False):
+        """Return a slot and adjust the limit from the outcome of the call"""
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            # Roughly +1 per limit's worth of successful calls
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+class SubmissionScheduler:
+    """Bounded per-sender submission queues drained under a shared AIMD limit"""
+
+    def __init__(self, max_queue: int = SUBMIT_QUEUE_SIZE, limiter: AIMDLimiter = None):
+        self.max_queue = max_queue
+        self.limiter = limiter or AIMDLimiter()
+        self._queues = {}
+        self._workers = {}
+        self._counter = itertools.count()
+        self._service_time = 0.5
+
+    def retry_after(self, sender: str) -> int:
+        """Seconds until a full sender queue has likely drained"""
+        depth = self._queues[sender].qsize() if sender in self._queues else 0
+        return max(1, math.ceil(depth * self._service_time))
+
+    async def submit(self, sender: str, op, priority: int = PRIORITY_STUDENT):
+        """Queue op() (a coroutine factory) for the sender and wait for its result"""
+        queue = self._queues.get(sender)
+        if queue is None:
+            queue = self._queues[sender] = asyncio.PriorityQueue(self.max_queue)
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((priority, next(self._counter), op, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(sender, self.retry_after(sender))
+
+        worker = self._workers.get(sender)
+        if worker is None or worker.done():
+            self._workers[sender] = asyncio.ensure_future(self._drain(sender, queue))
+        return await future
+
+    async def _drain(self, sender: str, queue: asyncio.PriorityQueue):
+        # One worker per sender keeps that account's submissions in order
+        while not queue.empty():
+            priority, _, op, future = queue.get_nowait()
+            if future.cancelled():
+                continue
+
+            await self.limiter.acquire(priority)
+            start = time.perf_counter()
+            overloaded = False
+            try:
+                result = await op()
+            except Exception as e:
+                overloaded = is_overload_error(e)
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.limiter.release(overloaded)
+                self._service_time = 0.9 * self._service_time + 0.1 * (time.perf_counter() - start)
+
+        self._workers.pop(sender, None)
+        if queue.empty():
+            self._queues.pop(sender, None)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "queued": {sender: queue.qsize() for sender, queue in self._queues.items()}
+        }
@@ -1,56 +1,279 @@
 from fastapi import FastAPI, HTTPException
-from aptos_sdk.account import Account
-from aptos_sdk.transactions import TransactionPayload, EntryFunction
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import Dict
-from aptos_sdk.type_tag import StructTag
-import requests
 import json
 import time  # Add time import
-from aptos_sdk.rest_client import RestClient
-from nacl.signing import SigningKey
-from nacl.public import VerifyKey
+import asyncio
+from node_pool import NodePool, node_urls_from_env
+from shared_state import SharedStore
+from reward_coalescer import RewardCoalescer, coalescing_enabled
+from submission_scheduler import SubmissionScheduler, QueueFullError, is_overload_error, PRIORITY_BULK
+from sender_pool import (
+    SenderPool, NoSenderAvailable, load_lanes, private_keys_from_env,
+    claim_worker_slot, release_worker_slot, lanes_for_worker
+)
+from pending_registry import PendingRegistry
+from app_logging import get_logger, fields
+
+logger = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
-
-# Set up Aptos connection
-NODE_URL = "https://fullnode.devnet.aptoslabs.com"  # Use "testnet" or "mainnet" if needed
-
-# Initialize Aptos client
-try:
-    client = RestClient(NODE_URL)
-except Exception as e:
-    print(f"Error initializing Aptos client: {str(e)}")
-    client = None
-
-# Load your Aptos account
-try:
-    PRIVATE_KEY = os.getenv("APTOS_PRIVATE_KEY")
-    if not PRIVATE_KEY:
-        raise ValueError("APTOS_PRIVATE_KEY environment variable is not set")
-    
-    # Convert private key to bytes if it's in hex format
-    if PRIVATE_KEY.startswith("0x"):
-        PRIVATE_KEY = PRIVATE_KEY[2:]
-    private_key_bytes = bytes.fromhex(PRIVATE_KEY)
-    
-    # Create signing key from bytes
-    signing_key = SigningKey(private_key_bytes)
-    verify_key = signing_key.verify_key
-    
-    # Create Aptos account with the signing key
-    account = Account(signing_key, verify_key)
-except Exception as e:
-    print(f"Error loading Aptos account: {str(e)}")
-    account = None
-
-# In-memory storage for student data (replace with database in production)
-students: Dict[str, dict] = {}
+# Set up Aptos connection (NODE_URLS takes a comma separated list of fullnodes)
+NODE_URLS = node_urls_from_env("https://fullnode.devnet.aptoslabs.com")  # Use "testnet" or "mainnet" if needed
+node_pool = NodePool(NODE_URLS)
+
+# Rewards queue per sender and back off when the node pushes back
+scheduler = SubmissionScheduler()
+
+# Seconds a submitted transaction stays valid, and between checks that settle pending transfers
+TXN_EXPIRATION = int(os.getenv("TXN_EXPIRATION", "600"))
+PENDING_CONFIRM_INTERVAL = float(os.getenv("PENDING_CONFIRM_INTERVAL", "10"))
+
+# Load the account and client during startup instead of on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+# Aptos client and operator account, created on first use
+_client = None
+_account = None
+_account_loaded = False
+
+def get_client():
+    """Create the Aptos client on first use"""
+    global _client
+    if _client is None:
+        try:
+            from aptos_runtime import AptosClients
+            _client = AptosClients(NODE_URLS)
+        except Exception:
+            logger.exception("Error initializing Aptos client")
+    return _client
+
+def get_account():
+    """Load your Aptos account from APTOS_PRIVATE_KEY on first use"""
+    global _account, _account_loaded
+    if not _account_loaded:
+        _account_loaded = True
+        try:
+            private_key = os.getenv("APTOS_PRIVATE_KEY")
+            if not private_key:
+                raise ValueError("APTOS_PRIVATE_KEY environment variable is not set")
+            
+            # Remove 0x prefix if present
+            if private_key.startswith("0x"):
+                private_key = private_key[2:]
+            
+            # Create Aptos account from the private key
+            from aptos_sdk.account import Account
+            _account = Account.load_key(private_key)
+        except Exception as e:
+            logger.error("Error loading Aptos account", extra=fields(error=str(e)))
+            _account = None
+    return _account
+
+# Payouts are spread over a pool of sender accounts, each with its own sequence number
+_sender_pool = None
+
+def node_get(path):
+    """GET a node path, raising inside failover so rate limits and node errors move on to the next node"""
+    import requests
+
+    def get(endpoint):
+        response = requests.get(f"{endpoint.url}{path}")
+        response.raise_for_status()
+        return response
+
+    return node_pool.failover_sync(get)
+
+def get_account_state(address):
+    """Sequence number of an account, and the answering node's ledger time in seconds"""
+    response = node_get(f"/accounts/{address}")
+    return int(response.json()["sequence_number"]), int(response.headers["X-Aptos-Ledger-TimestampUsec"]) / 1_000_000
+
+def get_account_sequence(address):
+    """Current sequence number of an account"""
+    return get_account_state(address)[0]
+
+def get_account_balance(address):
+    """APT balance of an account in octas"""
+    resource = "0x1::coin::CoinStore<0x1::aptos_coin::AptosCoin>"
+    response = node_get(f"/accounts/{address}/resource/{resource}")
+    return int(response.json()["data"]["coin"]["value"])
+
+def top_up_sender(address, amount):
+    """Fund a sender lane from the treasury account (TREASURY_PRIVATE_KEY)"""
+    treasury_key = os.getenv("TREASURY_PRIVATE_KEY")
+    if not treasury_key:
+        raise ValueError("TREASURY_PRIVATE_KEY environment variable is not set")
+    treasury = load_lanes([treasury_key])[0]
+    # Top-ups are rare, so the treasury reads its sequence number from the chain each time
+    txn_response = submit_transaction(transfer_payload(address, amount), treasury.account,
+                                      get_account_sequence(treasury.address))
+    if "hash" not in txn_response:
+        raise Exception(f"Top-up rejected: {txn_response}")
+    return txn_response["hash"]
+
+def sender_lane(address):
+    """The sender pool lane for an address, or None (e.g. the treasury)"""
+    if _sender_pool is None:
+        return None
+    return next((lane for lane in _sender_pool.lanes if lane.address == address), None)
+
+def handle_expired(entry):
+    """Resubmit a transfer that expired without executing, at its own sequence number
+
+    Reusing the expired sequence number fills the gap it left without a
+    lane resync, so it cannot collide with other resubmissions still in
+    the mempool. Entries that cannot be settled yet go back in the registry
+    and are retried on the next poll.
+    """
+    try:
+        lane = sender_lane(entry["sender"])
+        sequence, ledger_time = get_account_state(entry["sender"])
+        if entry["sequence_number"] < sequence:
+            # It executed; the sequence check had not caught up yet
+            if lane is not None:
+                get_sender_pool().release(lane)
+            return
+        if ledger_time < entry["expires_at"]:
+            # This node lags behind the expiry and may still commit the transaction
+            raise RuntimeError(f"Node ledger time {ledger_time:.0f} is before the expiry")
+        if lane is None:
+            # Not a lane (e.g. the treasury), which reads its sequence number for every submission
+            return
+        # Past its expiry it can never execute, so sending the payload again cannot pay twice;
+        # without one, a zero transfer to itself keeps the lane's later transactions executable
+        payload = entry.get("payload") or transfer_payload(lane.address, 0)
+        logger.info("Resubmitting expired transaction", extra=fields(txn_hash=entry["hash"]))
+        txn_response = submit_transaction(payload, lane.account, entry["sequence_number"],
+                                          resubmit=entry.get("payload") is not None)
+        if "hash" not in txn_response:
+            raise Exception(f"Resubmission rejected: {txn_response}")
+    except Exception as e:
+        logger.warning("Expired transaction not settled, retrying", extra=fields(txn_hash=entry["hash"], error=str(e)))
+        pending.add(entry["hash"], entry["sender"], entry["sequence_number"], entry["expires_at"],
+                    payload=entry.get("payload"))
+
+# Every transfer in flight, settled by sender sequence numbers and expired on a timer wheel
+pending = PendingRegistry(on_expired=handle_expired)
+
+async def watch_pending():
+    """Resolve executed transfers, then handle the ones that expired"""
+    while True:
+        for sender in pending.senders():
+            try:
+                sequence = await asyncio.to_thread(get_account_sequence, sender)
+                executed = pending.resolve_sequence(sender, sequence)
+                # Committed transfers leave their lane, which counts as progress for stuck detection
+                lane = sender_lane(sender)
+                for _ in range(executed if lane is not None else 0):
+                    get_sender_pool().release(lane)
+            except Exception as e:
+                logger.warning("Pending check failed", extra=fields(sender=sender, error=str(e)))
+        # Expiry handlers make blocking node calls
+        await asyncio.to_thread(pending.poll)
+        await asyncio.sleep(PENDING_CONFIRM_INTERVAL)
+
+def sender_keys():
+    """Sender private keys, checked against the number of API workers"""
+    private_keys = private_keys_from_env()
+    if not private_keys:
+        raise ValueError("SENDER_PRIVATE_KEYS or APTOS_PRIVATE_KEY must be set")
+    # Each worker owns its own lanes, so there must be one per worker at least
+    if len(private_keys) < API_WORKERS:
+        raise ValueError(f"API_WORKERS={API_WORKERS} needs at least as many sender keys, got {len(private_keys)}")
+    return private_keys
+
+# This worker's index among API_WORKERS, which picks its share of the sender lanes
+_worker_slot = None
+
+def get_sender_pool():
+    """Load this worker's sender lanes from SENDER_PRIVATE_KEYS (or APTOS_PRIVATE_KEY) on first use"""
+    global _sender_pool, _worker_slot
+    if _sender_pool is None:
+        lanes = load_lanes(sender_keys())
+        if API_WORKERS > 1:
+            _worker_slot = claim_worker_slot(store, API_WORKERS)
+            lanes = lanes_for_worker(lanes, _worker_slot, API_WORKERS)
+        _sender_pool = SenderPool(
+            lanes,
+            get_account_sequence,
+            get_balance=get_account_balance,
+            top_up=top_up_sender if os.getenv("TREASURY_PRIVATE_KEY") else None,
+            outstanding=pending.highest_sequence
+        )
+    return _sender_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        get_account()
+        get_sender_pool()
+        client = get_client()
+        if client is not None:
+            await client.warm_up()
+    flush_task = asyncio.ensure_future(reward_coalescer.run()) if reward_coalescer else None
+    pending_task = asyncio.ensure_future(watch_pending())
+    sender_health_task = None
+    try:
+        sender_health_task = asyncio.ensure_future(get_sender_pool().run())
+    except Exception as e:
+        logger.error("Error loading sender accounts", extra=fields(error=str(e)))
+    yield
+    if flush_task is not None:
+        flush_task.cancel()
+    pending_task.cancel()
+    if sender_health_task is not None:
+        sender_health_task.cancel()
+    if _worker_slot is not None:
+        release_worker_slot(store, _worker_slot)
+    if _client is not None:
+        await _client.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Number of uvicorn worker processes; student data is shared between them
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
+# Student data lives in a local store shared by all workers. Its records differ from
+# server.py's, so it gets its own database rather than STATE_DB_PATH
+REWARDS_STATE_DB_PATH = os.getenv("REWARDS_STATE_DB_PATH", "rewards_state.db")
+store = SharedStore(REWARDS_STATE_DB_PATH)
+students = store.namespace("students")
+
+def transfer_payload(student_address, amount):
+    return {
+        "function": "0x1::Coin::transfer",
+        "type_arguments": ["0x1::aptos_coin::AptosCoin"],
+        "arguments": [student_address, str(amount)]
+    }
+
+def submit_from_lane(lane, payload):
+    """Submit a payload from a sender lane and report a rejection to the pool"""
+    pool = get_sender_pool()
+    try:
+        txn_response = submit_transaction(payload, lane.account, pool.next_sequence(lane), resubmit=True)
+    except Exception as e:
+        pool.release(lane, success=False, error=e)
+        raise
+    # An accepted transfer stays in flight on the lane until it commits (see watch_pending)
+    if "hash" not in txn_response:
+        pool.release(lane, success=False, error=Exception(json.dumps(txn_response)))
+    return txn_response
+
+def send_reward(sender_address, student_address, amount):
+    """Transfer a coalesced reward balance and return the transaction hash"""
+    txn_response = submit_from_lane(get_sender_pool().choose(), transfer_payload(student_address, amount))
+    if "hash" not in txn_response:
+        raise Exception(f"Transfer rejected: {txn_response}")
+    return txn_response["hash"]
+
+# Opt-in: accumulate rewards per student and pay them out as one transfer
+reward_coalescer = RewardCoalescer(store, send_reward) if coalescing_enabled() else None
 
 class StudentRegistration(BaseModel):
     student_address: str
@@ -62,7 +285,7 @@ class RewardRequest(BaseModel):
 
 @app.get("/")
 def home():
-    if not account:
+    if not get_account():
         raise HTTPException(status_code=500, detail="Aptos account not properly configured")
     return {"message": "Connected to Aptos Blockchain"}
 
@@ -73,23 +296,23 @@ async def register_student(registration: StudentRegistration):
         if not student_address.startswith("0x"):
             student_address = "0x" + student_address
             
-        if student_address in students:
-            raise HTTPException(status_code=400, detail="Student already registered")
-        
-        students[student_address] = {
+        # Insert atomically so two workers cannot both register the same student
+        # The store can wait on other workers' writes, so it is used off the event loop
+        registered = await asyncio.to_thread(store.insert, "students", student_address, {
             "lessons_completed": 0,
             "total_rewards": 0
-        }
+        })
+        if not registered:
+            raise HTTPException(status_code=400, detail="Student already registered")
         return {"message": "Student registered successfully"}
     except Exception as e:
-        print(f"Error in registration: {str(e)}")
+        logger.exception("Error in registration")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/reward")
 async def reward_student(reward: RewardRequest):
     try:
-        if not account:
-            raise HTTPException(status_code=500, detail="Aptos account not properly configured")
+        pool = get_sender_pool()
             
         student_address = reward.student_address
         amount = reward.amount
@@ -101,41 +324,104 @@ async def reward_student(reward: RewardRequest):
         if not sender_address.startswith("0x"):
             sender_address = "0x" + sender_address
         
-        if student_address not in students:
+        if not await asyncio.to_thread(students.__contains__, student_address):
             raise HTTPException(status_code=404, detail="Student not found")
         
+        if reward_coalescer is not None:
+            # Queue the transfer before counting it, so the ledger never shows a reward that will not be paid
+            pending = await asyncio.to_thread(reward_coalescer.record, student_address, sender_address, amount)
+            await asyncio.to_thread(store.update, "students", student_address,
+                                    lambda s: dict(s, total_rewards=s["total_rewards"] + amount))
+            return {"message": "Reward recorded", "pending_amount": pending["amount"]}
+        
         # Create the transfer transaction payload
-        txn_payload = {
-            "function": "0x1::Coin::transfer",
-            "type_arguments": ["0x1::aptos_coin::AptosCoin"],
-            "arguments": [student_address, str(amount)]
-        }
+        txn_payload = transfer_payload(student_address, amount)
 
-        # Submit transaction to Aptos
-        txn_response = submit_transaction(txn_payload)
+        # Pick a sender lane, then queue on that lane so lanes submit in parallel
+        lane = pool.choose()
+        started = False
 
-        return {"message": "Reward sent successfully", "transaction": txn_response}
+        def submit():
+            nonlocal started
+            started = True
+            return asyncio.to_thread(submit_from_lane, lane, txn_payload)
+
+        try:
+            txn_response = await scheduler.submit(lane.address, submit, PRIORITY_BULK)
+        except Exception as e:
+            # Every node rate limited or rejected the submission with 503
+            if is_overload_error(e):
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Node is overloaded: {str(e)}",
+                    headers={"Retry-After": str(scheduler.retry_after(lane.address))}
+                )
+            raise
+        finally:
+            if not started:
+                # Queue full, or the request was cancelled while queued: nothing reached the node
+                pool.cancel(lane)
+
+        return {"message": "Reward sent successfully", "transaction": txn_response, "sender": lane.address}
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except NoSenderAvailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Error in reward transaction: {str(e)}")
+        logger.exception("Error in reward transaction")
         raise HTTPException(status_code=500, detail=f"Error sending reward: {str(e)}")
 
-def submit_transaction(payload):
-    """Submit a transaction to Aptos."""
+@app.post("/reward/flush")
+async def flush_rewards(student_address: str = None):
+    """Pay out coalesced rewards now, for one student or everyone"""
+    if reward_coalescer is None:
+        raise HTTPException(status_code=400, detail="Reward coalescing is not enabled")
+    if student_address and not student_address.startswith("0x"):
+        student_address = "0x" + student_address
+    results = await asyncio.to_thread(reward_coalescer.flush, student_address)
+    return {"flushed": results}
+
+@app.get("/senders")
+def sender_status():
+    """Health, load and sequence numbers of each sender lane"""
+    try:
+        return {"senders": get_sender_pool().status(), "transactions": pending.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def submit_transaction(payload, account, sequence_number, resubmit: bool = False):
+    """Submit a transaction to Aptos (resubmit: send the payload again from a lane if it expires)."""
+    import requests
+    expires_at = int(time.time()) + TXN_EXPIRATION
     transaction = {
-        "sender": account.address(),
-        "sequence_number": str(get_account_sequence()),
+        "sender": str(account.address()),
+        "sequence_number": str(sequence_number),
         "max_gas_amount": "1000",
         "gas_unit_price": "1",
-        "expiration_timestamp_secs": str(int(time.time()) + 600),
+        "expiration_timestamp_secs": str(expires_at),
         "payload": payload,
         "signature": {
             "type": "ed25519_signature",
-            "public_key": "0x" + verify_key.encode().hex(),
+            "public_key": str(account.public_key()),
             "signature": "0x"
         }
     }
-    response = requests.post(f"{NODE_URL}/transactions", json=transaction, headers={"Content-Type": "application/json"})
-    return response.json()
+
+    def post(endpoint):
+        response = requests.post(f"{endpoint.url}/transactions", json=transaction, headers={"Content-Type": "application/json"})
+        # Rate limits, a full mempool and node errors move the submission to the next node
+        if response.status_code == 429 or response.status_code >= 500 or "mempool_is_full" in response.text:
+            response.raise_for_status()
+        return response
+
+    response = node_pool.failover_sync(post)
+    txn_response = response.json()
+    if "hash" in txn_response:
+        pending.add(txn_response["hash"], str(account.address()), sequence_number, expires_at,
+                    payload=payload if resubmit else None)
+    return txn_response
 
 @app.get("/progress/{address}")
 async def check_progress(address: str):
@@ -143,14 +429,17 @@ async def check_progress(address: str):
         if not address.startswith("0x"):
             address = "0x" + address
             
-        if address not in students:
+        progress = await asyncio.to_thread(students.get, address)
+        if progress is None:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        return students[address]
+        return progress
     except Exception as e:
-        print(f"Error checking progress: {str(e)}")
+        logger.exception("Error checking progress")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Refuse to start workers that would have to share sender lanes
+    sender_keys()
+    uvicorn.run("tempCodeRunnerFile:app", host="0.0.0.0", port=8000, workers=API_WORKERS)
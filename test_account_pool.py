@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import pytest
+from account_pool import AccountPool, FaucetFunder
+from ledger_simulator import LedgerSimulator, SimulatedFaucet
+
+class FakeAccount:
+    def __init__(self, address):
+        self._address = address
+
+    def address(self):
+        return self._address
+
+def account_generator():
+    counter = itertools.count(1)
+    return lambda: FakeAccount(f"0x{next(counter):064x}")
+
+def local_pool(**kwargs):
+    ledger = LedgerSimulator(initial_balance=0)
+    faucet = SimulatedFaucet(ledger)
+    return ledger, faucet, AccountPool(FaucetFunder(faucet, amount=500), generate=account_generator(), **kwargs)
+
+def test_refill_funds_a_batch_from_the_faucet():
+    ledger, faucet, pool = local_pool(size=8, low_water=2, batch=5)
+    assert asyncio.run(pool.refill()) == 5
+    assert asyncio.run(pool.refill()) == 3
+    assert asyncio.run(pool.refill()) == 0
+    assert faucet.mints == 8
+
+    account = pool.take()
+    assert ledger.balance(str(account.address())) == 500
+    assert pool.stats() == {"ready": 7, "handed_out": 1, "funded": 8, "failed": 0, "empty": 0}
+
+def test_acquire_funds_on_the_spot_when_empty():
+    ledger, faucet, pool = local_pool(size=0)
+    assert pool.take() is None
+    account = asyncio.run(pool.acquire())
+    assert ledger.balance(str(account.address())) == 500
+    assert pool.stats()["empty"] == 2 and pool.stats()["handed_out"] == 1
+
+def test_failed_mints_stay_out_of_the_pool():
+    class FlakyFaucet(SimulatedFaucet):
+        async def fund_account(self, address, amount, wait_for_transaction=True):
+            if address.endswith("2"):
+                raise RuntimeError("429 Too Many Requests")
+            return await super().fund_account(address, amount, wait_for_transaction)
+
+    ledger = LedgerSimulator(initial_balance=0)
+    pool = AccountPool(FaucetFunder(FlakyFaucet(ledger), amount=1), size=3, low_water=1, batch=3,
+                       generate=account_generator())
+    assert asyncio.run(pool.refill()) == 2
+    assert pool.stats()["failed"] == 1
+    assert all(ledger.balance(str(account.address())) == 1 for account in [pool.take(), pool.take()])
+
+def test_worker_tops_up_below_low_water():
+    async def scenario():
+        ledger, faucet, pool = local_pool(size=6, low_water=3, batch=4)
+        task = asyncio.ensure_future(pool.run(interval=60))
+        try:
+            for _ in range(100):
+                if len(pool) == 6:
+                    break
+                await asyncio.sleep(0.01)
+            assert len(pool) == 6
+            taken = [pool.take() for _ in range(4)]
+            assert all(taken)
+            # take() wakes the worker instead of waiting for the interval
+            for _ in range(100):
+                if len(pool) == 6:
+                    break
+                await asyncio.sleep(0.01)
+            assert len(pool) == 6
+            assert faucet.mints == 10
+        finally:
+            task.cancel()
+
+    asyncio.run(scenario())
+
+def test_treasury_funder_sends_one_batch_transfer():
+    pytest.importorskip("aptos_sdk")
+    from account_pool import TreasuryFunder
+
+    class FakeClients:
+        def __init__(self):
+            self.payloads = []
+
+        async def sign_and_submit(self, account, payload):
+            self.payloads.append(payload)
+            return "0xabc"
+
+        async def wait_for_transaction(self, txn_hash):
+            return None
+
+    clients = FakeClients()
+    addresses = [f"0x{i:064x}" for i in range(1, 4)]
+    assert asyncio.run(TreasuryFunder(clients, treasury=None, amount=7).fund(addresses)) == addresses
+    assert len(clients.payloads) == 1
+    assert clients.payloads[0].value.function == "batch_transfer"
+
+def test_acquire_gives_up_when_funding_hangs():
+    class StuckFunder:
+        async def fund(self, addresses):
+            await asyncio.sleep(10)
+
+    pool = AccountPool(StuckFunder(), size=0, generate=account_generator())
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.acquire(timeout=0.01))
+    assert pool.stats()["handed_out"] == 0
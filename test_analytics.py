@@ -0,0 +1,54 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from analytics import (
+    ProgressSnapshot, student_totals, completion_rates, reward_distribution,
+    lesson_funnel, export_csv
+)
+from blockchain_manager import BlockchainManager
+
+STUDENTS = ["0x" + str(i) * 64 for i in range(1, 5)]
+SENDER = "0x" + "f" * 64
+
+def make_manager():
+    manager = BlockchainManager()
+    for lesson_id, reward in [(1, 10), (2, 20), (3, 30)]:
+        manager.create_lesson(lesson_id, f"Lesson {lesson_id}", "", reward)
+    for student in STUDENTS:
+        manager.register_student(student)
+    # Student 1 finishes everything, 2 the first two, 3 only lesson 2, 4 nothing
+    for student, lessons in zip(STUDENTS, [[1, 2, 3], [1, 2], [2], []]):
+        for lesson_id in lessons:
+            manager.complete_lesson(student, SENDER, lesson_id, 0)
+    return manager
+
+def test_student_totals_and_rates():
+    snapshot = ProgressSnapshot.from_manager(make_manager())
+
+    totals = student_totals(snapshot)
+    assert totals["lessons_completed"].tolist() == [3, 2, 1, 0]
+    assert totals["total_rewards"].tolist() == [60, 30, 20, 0]
+
+    rates = completion_rates(snapshot)
+    assert rates["completions"].tolist() == [2, 3, 1]
+    assert rates["completion_rate"].tolist() == [0.5, 0.75, 0.25]
+
+def test_reward_distribution():
+    distribution = reward_distribution(ProgressSnapshot.from_manager(make_manager()))
+    assert distribution["total"] == 110
+    assert distribution["students_rewarded"] == 3
+    assert distribution["max"] == 60
+
+def test_funnel_requires_all_previous_steps():
+    funnel = lesson_funnel(ProgressSnapshot.from_manager(make_manager()))
+    # Student 3 completed lesson 2 but not lesson 1, so does not count at step 2
+    assert funnel["students"].tolist() == [2, 2, 1]
+    assert funnel["conversion"].tolist() == [0.5, 1.0, 0.5]
+
+def test_chunked_csv_export(tmp_path):
+    frame = pd.DataFrame({"a": range(25), "b": ["x"] * 25})
+    path = tmp_path / "out.csv"
+    export_csv(frame, str(path), chunk_rows=10)
+    assert pd.read_csv(path).equals(frame)
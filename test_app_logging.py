@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import queue
+import random
+import pytest
+import app_logging
+from app_logging import DebugSampler, DroppingQueueHandler, fields, redact
+
+def test_redact_nested_key_material():
+    record = {"student_address": "0xa", "public_key": "0xsecret", "nested": [{"Private_Key": "k", "ok": 1}]}
+    assert redact(record) == {
+        "student_address": "0xa",
+        "public_key": "[REDACTED]",
+        "nested": [{"Private_Key": "[REDACTED]", "ok": 1}]
+    }
+
+@pytest.fixture
+def restore_logging():
+    # configure() replaces the module-wide handler and stops the running writer thread
+    root = logging.getLogger(app_logging.ROOT_LOGGER)
+    saved = (app_logging._handler, app_logging._listener, root.handlers[:], root.level, root.propagate)
+    yield
+    app_logging.shutdown()
+    app_logging._handler, app_logging._listener, root.handlers, level, root.propagate = saved
+    root.setLevel(level)
+    if app_logging._listener is not None:
+        app_logging._listener.start()
+
+def test_json_records_go_through_the_writer_thread(restore_logging):
+    stream = io.StringIO()
+    app_logging.configure(stream=stream, level="DEBUG", log_format="json")
+    try:
+        logger = app_logging.get_logger("test")
+        logger.info("Received registration", extra=fields(request={"public_key": "0xsecret", "network": "devnet"}))
+    finally:
+        app_logging.shutdown()
+
+    entry = json.loads(stream.getvalue().strip())
+    assert entry["message"] == "Received registration"
+    assert entry["logger"] == "aptos_app.test"
+    assert entry["request"] == {"public_key": "[REDACTED]", "network": "devnet"}
+    assert "0xsecret" not in stream.getvalue()
+
+def test_debug_sampling_keeps_a_fraction():
+    sampler = DebugSampler(rate=0.1, rng=random.Random(3))
+    debug = logging.LogRecord("x", logging.DEBUG, __file__, 0, "debug", None, None)
+    error = logging.LogRecord("x", logging.ERROR, __file__, 0, "error", None, None)
+
+    kept = sum(sampler.filter(debug) for _ in range(1000))
+    assert 50 < kept < 150
+    assert sampler.filter(error)
+
+def test_full_queue_drops_instead_of_blocking_and_reports_losses():
+    handler = DroppingQueueHandler(queue.Queue(2))
+
+    def record(msg):
+        return logging.LogRecord("x", logging.INFO, __file__, 0, msg, None, None)
+
+    for i in range(5):
+        handler.emit(record(str(i)))
+    assert handler.dropped == 3
+
+    handler.queue.get_nowait()
+    handler.queue.get_nowait()
+    handler.emit(record("after"))
+    assert handler.queue.get_nowait().getMessage() == "3 log records dropped"
+    assert handler.queue.get_nowait().getMessage() == "after"
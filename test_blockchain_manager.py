@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("nacl")
+pytest.importorskip("aptos_sdk")
+from aptos_sdk.account import Account
+from blockchain_manager import BlockchainManager
+from ledger_simulator import LedgerSimulator
+
+def test_validate_private_key_matches_aptos_addresses():
+    manager = BlockchainManager(simulator=LedgerSimulator(seed=1))
+    account = Account.generate()
+    assert manager.validate_private_key(str(account.address()), account.private_key.hex())
+    assert manager.validate_private_key(str(account.address()).upper().replace("0X", "0x"), account.private_key.hex()[2:])
+    assert not manager.validate_private_key(str(Account.generate().address()), account.private_key.hex())
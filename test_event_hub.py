@@ -0,0 +1,62 @@
+import asyncio
+from event_hub import EventHub
+from tx_tracker import TransactionTracker, COMMITTED
+
+def test_publish_reaches_only_topic_subscribers():
+    async def run():
+        hub = EventHub()
+        first = hub.subscribe(["tx:0x1"])
+        second = hub.subscribe(["tx:0x1", "progress:0xa"])
+        other = hub.subscribe(["tx:0x2"])
+
+        assert hub.publish("tx:0x1", {"type": "transaction"}) == 2
+        return await first.get(0.1), await second.get(0.1), await other.get(0.01)
+
+    first, second, other = asyncio.run(run())
+    assert first == second == {"type": "transaction", "topic": "tx:0x1"}
+    assert other is None
+
+def test_slow_subscriber_drops_oldest_events():
+    async def run():
+        hub = EventHub(max_queue=2)
+        subscription = hub.subscribe(["progress:0xa"])
+        for i in range(3):
+            hub.publish("progress:0xa", {"n": i})
+        return [(await subscription.get(0.1))["n"] for _ in range(2)], subscription.dropped
+
+    assert asyncio.run(run()) == ([1, 2], 1)
+
+def test_close_removes_empty_topics():
+    hub = EventHub()
+    subscription = hub.subscribe(["tx:0x1"])
+    subscription.close()
+
+    assert not hub.has_subscribers("tx:0x1")
+    assert hub.stats()["topics"] == 0
+
+def test_tracker_listener_fans_out_one_poll_to_many_clients():
+    fetches = []
+
+    async def fetch_transaction(txn_hash):
+        fetches.append(txn_hash)
+        return {"type": "user_transaction", "success": True, "version": "42", "vm_status": "Executed successfully"}
+
+    async def run():
+        hub = EventHub()
+        tracker = TransactionTracker(fetch_transaction)
+        tracker.add_listener(lambda entry: hub.publish(f"tx:{entry['hash']}", {"data": entry}))
+        clients = [hub.subscribe(["tx:0xabc"]) for _ in range(50)]
+        tracker.track("0xabc")
+        await tracker.poll_once()
+        return [await client.get(0.1) for client in clients]
+
+    events = asyncio.run(run())
+    assert fetches == ["0xabc"]
+    assert all(event["data"]["status"] == COMMITTED and event["data"]["version"] == 42 for event in events)
+
+def test_subscription_topic_limit():
+    hub = EventHub(max_topics=2)
+    subscription = hub.subscribe(["tx:0x1", "tx:0x2"])
+    assert subscription.add(["tx:0x1"])
+    assert not subscription.add(["tx:0x3"])
+    assert subscription.topics == {"tx:0x1", "tx:0x2"} and not hub.has_subscribers("tx:0x3")
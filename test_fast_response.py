@@ -0,0 +1,43 @@
+import gzip
+import json
+from fast_response import BodyCache, PrecomputedBody, dumps, etag_matches, negotiate_encoding
+
+def test_dumps_is_compact_json():
+    assert json.loads(dumps({"a": [1, 2], "b": "é"})) == {"a": [1, 2], "b": "é"}
+    assert b" " not in dumps({"a": [1, 2]})
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*") in ("br", "gzip")
+    assert negotiate_encoding(None) is None
+
+def test_etag_matches_weakly_and_in_lists():
+    body = PrecomputedBody.from_content({"a": 1})
+    assert etag_matches(body.etag, body.etag)
+    assert etag_matches(f'"other", {body.etag[2:]}', body.etag)
+    assert etag_matches("*", body.etag)
+    assert not etag_matches('W/"other"', body.etag)
+    assert not etag_matches(None, body.etag)
+
+def test_gzip_variant_round_trips():
+    body = PrecomputedBody.from_content([{"title": "Lesson"}] * 100)
+    assert gzip.decompress(body.encoded("gzip")) == body.body
+    assert len(body.encoded("gzip")) < len(body.body)
+
+def test_body_cache_reuses_body_while_source_is_unchanged():
+    cache = BodyCache()
+    builds = []
+    source = [1, 2, 3]
+
+    def build(items):
+        builds.append(1)
+        return [item * 2 for item in items]
+
+    first = cache.get("lessons", source, build)
+    assert cache.get("lessons", source, build) is first
+    assert json.loads(first.body) == [2, 4, 6]
+
+    changed = cache.get("lessons", [1, 2, 3], build)
+    assert len(builds) == 2
+    assert changed.etag == first.etag
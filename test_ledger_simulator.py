@@ -0,0 +1,91 @@
+import pytest
+from ledger_simulator import LedgerSimulator, SimulatedRejection, GAS_UNIT_PRICE
+
+ALICE = "0x" + "a" * 64
+BOB = "0x" + "b" * 64
+
+
+def transfer_payload(to_address, amount):
+    return {"type": "entry_function_payload", "function": "0x1::coin::transfer",
+            "type_arguments": ["0x1::aptos_coin::AptosCoin"], "arguments": [to_address, str(amount)]}
+
+
+def test_transfer_commits_with_gas_and_sequence():
+    ledger = LedgerSimulator(seed=1, initial_balance=1_000_000)
+    txn_hash = ledger.submit(ALICE, transfer_payload(BOB, 1000))
+    assert ledger.transaction(txn_hash)["type"] == "pending_transaction"
+
+    txn = ledger.wait_for_transaction(txn_hash)
+    assert txn["success"] and txn["version"] == "1"
+    fee = int(txn["gas_used"]) * GAS_UNIT_PRICE
+    assert ledger.balance(ALICE) == 1_000_000 - 1000 - fee
+    assert ledger.balance(BOB) == 1_001_000
+    assert ledger.account(ALICE)["sequence_number"] == "1"
+    # Commit lands on a block boundary after the sampled latency
+    assert ledger.now > 0 and (ledger.now / ledger.config["block_time"]).is_integer()
+
+
+def test_sequence_number_too_old_and_out_of_order_execution():
+    ledger = LedgerSimulator(seed=2)
+    later = ledger.submit(ALICE, transfer_payload(BOB, 1), sequence_number=1)
+    first = ledger.submit(ALICE, transfer_payload(BOB, 1), sequence_number=0)
+    ledger.advance(10)
+    assert int(ledger.transaction(first)["version"]) < int(ledger.transaction(later)["version"])
+
+    with pytest.raises(SimulatedRejection, match="SEQUENCE_NUMBER_TOO_OLD"):
+        ledger.submit(ALICE, transfer_payload(BOB, 1), sequence_number=0)
+
+
+def test_insufficient_balance_failures():
+    ledger = LedgerSimulator(seed=3, initial_balance=0)
+    with pytest.raises(SimulatedRejection, match="INSUFFICIENT_BALANCE_FOR_TRANSACTION_FEE"):
+        ledger.submit(ALICE, transfer_payload(BOB, 1))
+
+    ledger.fund(ALICE, 300_000)
+    txn = ledger.wait_for_transaction(ledger.submit(ALICE, transfer_payload(BOB, 10_000_000)))
+    assert not txn["success"]
+    assert "EINSUFFICIENT_BALANCE" in txn["vm_status"]
+    # Gas is still charged and the sequence number still advances
+    assert ledger.balance(ALICE) == 300_000 - int(txn["gas_used"]) * GAS_UNIT_PRICE
+    assert ledger.account(ALICE)["sequence_number"] == "1"
+
+
+def test_mempool_capacity():
+    ledger = LedgerSimulator(seed=4, mempool_capacity=2)
+    ledger.submit(ALICE, transfer_payload(BOB, 1))
+    ledger.submit(BOB, transfer_payload(ALICE, 1))
+    with pytest.raises(SimulatedRejection) as error:
+        ledger.submit(ALICE, transfer_payload(BOB, 1))
+    assert error.value.vm_status == "MEMPOOL_IS_FULL" and error.value.status_code == 503
+
+
+def test_same_seed_replays_identically():
+    def run(seed):
+        ledger = LedgerSimulator(seed=seed)
+        hashes = [ledger.submit(ALICE if i % 2 else BOB, transfer_payload(BOB if i % 2 else ALICE, i)) for i in range(20)]
+        ledger.advance(5)
+        return ledger, [ledger.transaction(h) for h in hashes]
+
+    ledger, transactions = run(7)
+    assert run(7)[1] == transactions
+    assert run(8)[1] != transactions
+
+    replayed = LedgerSimulator.replay(ledger.export())
+    assert [replayed.transaction(t["hash"]) for t in transactions] == transactions
+    assert replayed.stats() == ledger.stats()
+
+
+def test_manager_reports_ledger_failures():
+    pytest.importorskip("requests")
+    pytest.importorskip("nacl")
+    from blockchain_manager import BlockchainManager
+
+    ledger = LedgerSimulator(seed=5, initial_balance=0)
+    manager = BlockchainManager(simulator=ledger)
+    assert manager.register_student(ALICE, private_key="key")["status"] == "failed"
+    assert ALICE not in manager.students
+
+    ledger.fund(ALICE, 1_000_000)
+    result = manager.register_student(ALICE, private_key="key")
+    assert result["status"] == "success"
+    assert ledger.transaction(result["transaction_hash"])["success"]
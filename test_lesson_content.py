@@ -0,0 +1,75 @@
+import os
+import zlib
+import pytest
+from lesson_content import BlobStore, LessonContent, CONTENT_PREFIX, is_content_ref
+
+def test_blobs_are_compressed_and_deduplicated(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    body = b"How wallets derive addresses. " * 200
+    digest = blobs.put(body)
+    assert blobs.put(body) == digest
+    assert blobs.writes == 1 and blobs.deduplicated == 1
+
+    path = os.path.join(str(tmp_path), digest[:2], digest[2:])
+    assert os.path.getsize(path) < len(body) // 10
+    # A fresh store (another worker) reads it back from disk, then from memory
+    other = BlobStore(str(tmp_path))
+    assert other.get(digest) == body
+    assert other.get(digest) == body
+    assert other.stats()["misses"] == 1 and other.stats()["hits"] == 1
+
+def test_lru_keeps_hot_bodies(tmp_path):
+    blobs = BlobStore(str(tmp_path), cache_size=2)
+    digests = [blobs.put(str(i).encode() * 100) for i in range(3)]
+    assert blobs.stats()["cached"] == 2
+    assert blobs.get(digests[0]) == b"0" * 100
+    assert blobs.get("../" + digests[0][3:]) is None
+
+def test_corrupt_blob_is_rejected(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    digest = blobs.put(b"original")
+    with open(os.path.join(str(tmp_path), digest[:2], digest[2:]), "wb") as f:
+        f.write(zlib.compress(b"tampered"))
+    with pytest.raises(ValueError):
+        BlobStore(str(tmp_path)).get(digest)
+
+def test_descriptions_round_trip_through_references(tmp_path):
+    content = LessonContent(BlobStore(str(tmp_path)))
+    assert content.store_description("Short") == "Short"
+
+    long_text = "Gas pays for computation and storage. " * 50
+    ref = content.store_description(long_text)
+    assert is_content_ref(ref) and ref.startswith(CONTENT_PREFIX)
+    assert content.description(ref) == long_text
+
+    resource = {"type": "m::LearningApp::Lesson", "data": {"lessons": [
+        {"title": "Gas", "description": ref, "reward_amount": "5"},
+        {"title": "Keys", "description": "Short", "reward_amount": "1"}
+    ]}}
+    lessons = content.resolve_resource(resource)["data"]["lessons"]
+    assert lessons[0]["description"] == long_text and lessons[0]["content_hash"] == ref
+    assert lessons[1] == resource["data"]["lessons"][1]
+    # The on-chain snapshot is not modified
+    assert resource["data"]["lessons"][0]["description"] == ref
+
+def test_unknown_reference_is_returned_as_is(tmp_path):
+    content = LessonContent(BlobStore(str(tmp_path)))
+    ref = CONTENT_PREFIX + "0" * 64
+    assert content.description(ref) == ref
+
+def test_staged_body_is_removed_unless_a_lesson_was_submitted(tmp_path):
+    content = LessonContent(BlobStore(str(tmp_path)))
+    failed = content.stage_description("Rejected lesson body. " * 20)
+    content.settle_description(failed, submitted=False)
+    assert failed[len(CONTENT_PREFIX):] not in content.blobs
+
+    # Two creations share a body: it stays once either of them was submitted
+    text = "Shared lesson body. " * 20
+    first, second = content.stage_description(text), content.stage_description(text)
+    content.settle_description(first, submitted=True)
+    content.settle_description(second, submitted=False)
+    assert content.description(first) == text
+
+    # A body that was already stored is never removed
+    content.settle_description(content.stage_description(text), submitted=False)
+    assert first[len(CONTENT_PREFIX):] in content.blobs
@@ -0,0 +1,250 @@
+import asyncio
+import os
+import pytest
+from types import SimpleNamespace
+
+pd = pytest.importorskip("pandas")
+
+from lesson_import import validate_chunk, import_catalog, Checkpoint
+from shared_state import SharedStore
+
+def test_validate_chunk_reports_first_failing_check():
+    chunk = pd.DataFrame({
+        "lesson_id": ["1", "2", "2", "x", "5"],
+        "title": ["Wallets", "", "Keys", "Gas", "Blocks"],
+        "description": ["a", "b", "c", "d", "e"],
+        "reward_amount": ["10", "5", "5", "1", "-3"]
+    })
+
+    valid, errors = validate_chunk(chunk, first_row=100)
+
+    assert valid["id"].tolist() == [1, 2]
+    assert valid["row"].tolist() == [100, 102]
+    assert errors == [
+        (101, "missing title"),
+        (103, "lesson_id must be a non-negative integer"),
+        (104, "reward_amount must be a positive integer")
+    ]
+
+def test_duplicate_ids_among_valid_rows():
+    chunk = pd.DataFrame({
+        "lesson_id": [7, 7, 7],
+        "title": ["A", "B", "C"],
+        "description": ["", "", ""],
+        "reward_amount": [1, 0, 1]
+    })
+    valid, errors = validate_chunk(chunk, first_row=0)
+    assert valid["row"].tolist() == [0]
+    assert errors == [(1, "reward_amount must be a positive integer"), (2, "duplicate lesson_id")]
+
+def test_missing_columns_are_rejected():
+    with pytest.raises(ValueError):
+        validate_chunk(pd.DataFrame({"title": ["a"]}), first_row=0)
+
+def test_import_streams_in_chunks_and_resumes(tmp_path):
+    catalog = tmp_path / "catalog.csv"
+    lines = ["title,description,reward_amount"]
+    lines += [f"Lesson {i},Body {i},{i % 3}" for i in range(25)]
+    catalog.write_text("\n".join(lines) + "\n")
+
+    store = SharedStore(str(tmp_path / "state.db"))
+    checkpoint_path = str(tmp_path / "catalog.checkpoint.json")
+
+    result = asyncio.run(import_catalog(str(catalog), store, Checkpoint(checkpoint_path), chunk_size=10, report=lambda _: None))
+
+    # Every third row has a zero reward
+    assert result["imported"] == 16
+    assert len(result["errors"]) == 9
+    assert store.count("lessons") == 16
+    assert store.get("lessons", "2")["title"] == "Lesson 1"
+
+    # A rerun with the finished checkpoint does no work
+    rerun = asyncio.run(import_catalog(str(catalog), store, Checkpoint(checkpoint_path), chunk_size=10, report=lambda _: None))
+    assert rerun["imported"] == 0
+
+def test_import_resumes_mid_chunk(tmp_path):
+    catalog = tmp_path / "catalog.jsonl"
+    catalog.write_text("".join(
+        f'{{"lesson_id": {i}, "title": "L{i}", "description": "d", "reward_amount": 1}}\n' for i in range(10)
+    ))
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.rows_done = 6
+    store = SharedStore(str(tmp_path / "state.db"))
+
+    result = asyncio.run(import_catalog(str(catalog), store, checkpoint, chunk_size=4, report=lambda _: None))
+
+    assert result["imported"] == 4
+    assert store.keys("lessons") == ["6", "7", "8", "9"]
+
+def test_duplicate_ids_across_chunks(tmp_path):
+    catalog = tmp_path / "catalog.jsonl"
+    catalog.write_text("".join(
+        f'{{"lesson_id": {i % 6}, "title": "L{i}", "description": "d", "reward_amount": 1}}\n' for i in range(8)
+    ))
+    store = SharedStore(str(tmp_path / "state.db"))
+    result = asyncio.run(import_catalog(str(catalog), store, Checkpoint(str(tmp_path / "cp.json")),
+                                        chunk_size=4, report=lambda _: None))
+    assert result["errors"] == [(6, "duplicate lesson_id"), (7, "duplicate lesson_id")]
+    assert store.get("lessons", "0")["title"] == "L0"
+
+    # A resumed run still knows the ids claimed by finished chunks
+    checkpoint = Checkpoint(str(tmp_path / "resume.json"))
+    checkpoint.rows_done = 4
+    result = asyncio.run(import_catalog(str(catalog), store, checkpoint, chunk_size=4, report=lambda _: None))
+    assert result["errors"] == [(6, "duplicate lesson_id"), (7, "duplicate lesson_id")]
+
+def test_every_submitted_hash_is_checkpointed(tmp_path):
+    catalog = tmp_path / "catalog.csv"
+    catalog.write_text("title,description,reward_amount\n" + "".join(f"L{i},d,1\n" for i in range(5)))
+    checkpoint_path = str(tmp_path / "cp.json")
+
+    class CrashingSubmitter:
+        async def is_committed(self, txn_hash):
+            return False
+
+        async def submit_all(self, lessons, on_submitted=None):
+            for lesson in lessons:
+                on_submitted(lesson["row"], f"0x{lesson['row']}")
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(import_catalog(str(catalog), SharedStore(str(tmp_path / "state.db")), Checkpoint(checkpoint_path),
+                                   CrashingSubmitter(), report=lambda _: None))
+    assert Checkpoint(checkpoint_path).pending == {i: f"0x{i}" for i in range(5)}
+    # Hashes went to the append-only log, not a checkpoint rewrite per transaction
+    assert not os.path.exists(checkpoint_path)
+
+def test_failed_transactions_are_retried_by_the_next_run(tmp_path):
+    catalog = tmp_path / "catalog.csv"
+    catalog.write_text("title,description,reward_amount\n" + "".join(f"L{i},d,1\n" for i in range(6)))
+    checkpoint_path = str(tmp_path / "cp.json")
+    store = SharedStore(str(tmp_path / "state.db"))
+
+    class FlakySubmitter:
+        def __init__(self, failing):
+            self.failing = failing
+            self.submitted = []
+
+        async def is_committed(self, txn_hash):
+            return False
+
+        async def submit_all(self, lessons, on_submitted=None):
+            self.submitted.extend(lesson["row"] for lesson in lessons)
+            return {lesson["row"]: RuntimeError("rejected") if lesson["row"] in self.failing else "0xhash"
+                    for lesson in lessons}
+
+    first = asyncio.run(import_catalog(str(catalog), store, Checkpoint(checkpoint_path), FlakySubmitter({1, 4}),
+                                       chunk_size=4, report=lambda _: None))
+    assert first["imported"] == 4 and Checkpoint(checkpoint_path).failed == [1, 4]
+
+    submitter = FlakySubmitter(set())
+    rerun = asyncio.run(import_catalog(str(catalog), store, Checkpoint(checkpoint_path), submitter,
+                                       chunk_size=4, report=lambda _: None))
+    assert submitter.submitted == [1, 4]
+    assert rerun["imported"] == 2 and Checkpoint(checkpoint_path).failed == []
+
+def test_transaction_in_mempool_is_waited_for():
+    from lesson_import import PipelinedSubmitter
+
+    states = [{"type": "pending_transaction", "expiration_timestamp_secs": "9999999999"},
+              {"type": "user_transaction", "success": True}]
+
+    async def fetch_transaction(txn_hash):
+        return states.pop(0)
+
+    submitter = PipelinedSubmitter(SimpleNamespace(fetch_transaction=fetch_transaction), None, "0x1::m", signing=object())
+    assert asyncio.run(submitter.is_committed("0xabc", poll_interval=0)) is True
+    assert states == []
+
+def test_payload_serializes_to_bcs():
+    pytest.importorskip("aptos_sdk")
+    from aptos_sdk.bcs import Serializer
+    from lesson_import import PipelinedSubmitter
+
+    from aptos_sdk.account_address import AccountAddress
+
+    class Account:
+        def address(self):
+            return AccountAddress.from_str("0x" + "1" * 64)
+
+    submitter = PipelinedSubmitter(None, Account(), "0x1::LearningApp", signing=object())
+    serializer = Serializer()
+    submitter._payload({"title": "Wallets", "description": "sha256:" + "0" * 64, "reward_amount": 10}).serialize(serializer)
+    assert b"Wallets" in serializer.output()
+    submitter._noop_payload().serialize(Serializer())
+
+class FakeChain:
+    """Commits each sequence number only after every lower one, like one account's mempool"""
+
+    def __init__(self, fail_once):
+        self.fail_once = set(fail_once)
+        self.mempool = {}
+        self.committed = []
+
+    async def account_sequence_number(self, address):
+        return len(self.committed)
+
+    async def create_bcs_transaction(self, sender, payload, sequence_number):
+        return {"row": payload, "sequence_number": sequence_number}
+
+    async def submit_signed(self, txn):
+        await asyncio.sleep(0)
+        if txn["row"] in self.fail_once:
+            self.fail_once.discard(txn["row"])
+            raise RuntimeError("rejected")
+        txn_hash = f"0x{txn['row']}-{txn['sequence_number']}"
+        self.mempool.setdefault(txn["sequence_number"], (txn["row"], txn_hash))
+        while len(self.committed) in self.mempool:
+            self.committed.append(self.mempool.pop(len(self.committed)))
+        return txn_hash
+
+    async def wait_for_transaction(self, txn_hash):
+        for _ in range(500):
+            if any(committed_hash == txn_hash for _, committed_hash in self.committed):
+                return
+            await asyncio.sleep(0.001)
+        raise TimeoutError(txn_hash)
+
+def gap_submitter(chain, window=10):
+    from lesson_import import PipelinedSubmitter
+
+    class Signing:
+        async def amap(self, sign, key, items):
+            return items
+
+    class Key:
+        def hex(self):
+            return "0x0"
+
+    class Account:
+        private_key = Key()
+
+        def address(self):
+            return "0x1"
+
+    clients = SimpleNamespace(rest=chain, submit_signed=chain.submit_signed, wait_for_transaction=chain.wait_for_transaction)
+    submitter = PipelinedSubmitter(clients, Account(), "0x1::m", window=window, signing=Signing())
+    submitter._payload = lambda lesson: lesson["row"]
+    submitter._noop_payload = lambda: "noop"
+    return submitter
+
+def test_rejected_transaction_gap_is_filled_and_the_rest_resubmitted():
+    chain = FakeChain(fail_once=[3])
+    submitter = gap_submitter(chain, window=5)
+    results = asyncio.run(submitter.submit_all([{"row": i} for i in range(10)]))
+
+    # Row 4 was already in the mempool behind the gap; row 5 takes the gap and the rest follow row 4
+    assert isinstance(results[3], RuntimeError)
+    assert all(isinstance(results[i], str) for i in range(10) if i != 3)
+    assert [row for row, _ in chain.committed] == [0, 1, 2, 5, 4, 6, 7, 8, 9]
+    assert submitter.sequence_number == 9
+
+def test_gap_with_nothing_left_to_submit_is_filled_by_a_no_op():
+    chain = FakeChain(fail_once=[2])
+    submitter = gap_submitter(chain)
+    results = asyncio.run(submitter.submit_all([{"row": i} for i in range(6)]))
+
+    assert isinstance(results[2], RuntimeError)
+    assert all(isinstance(results[i], str) for i in (0, 1, 3, 4, 5))
+    assert [row for row, _ in chain.committed] == [0, 1, "noop", 3, 4, 5]
+    assert None not in results
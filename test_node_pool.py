@@ -0,0 +1,77 @@
+import asyncio
+import random
+import pytest
+from node_pool import NodePool, parse_node_urls, is_failover_error
+
+def test_parse_node_urls():
+    assert parse_node_urls(" http://a/, http://b ,,") == ["http://a", "http://b"]
+
+def test_failover_error_classification(api_error):
+    assert is_failover_error(ConnectionError("reset"))
+    assert is_failover_error(api_error(429))
+    assert is_failover_error(api_error(503))
+    assert not is_failover_error(api_error(400))
+
+def test_failover_moves_to_next_node(api_error):
+    pool = NodePool(["http://a", "http://b"])
+    calls = []
+
+    async def op(endpoint):
+        calls.append(endpoint.url)
+        if endpoint.url == "http://a":
+            raise api_error(503)
+        return endpoint.url
+
+    assert asyncio.run(pool.failover(op)) == "http://b"
+    assert calls == ["http://a", "http://b"]
+    assert pool.endpoints[0].consecutive_failures == 1
+
+def test_failover_does_not_retry_client_errors(api_error):
+    pool = NodePool(["http://a", "http://b"])
+
+    async def op(endpoint):
+        raise api_error(400)
+
+    with pytest.raises(api_error):
+        asyncio.run(pool.failover(op))
+    assert pool.endpoints[1].consecutive_failures == 0
+
+def test_pick_prefers_fast_nodes():
+    pool = NodePool(["http://slow", "http://fast"], rng=random.Random(7))
+    pool.endpoints[0].record_success(1.0)
+    pool.endpoints[1].record_success(0.01)
+
+    picks = [pool.pick().url for _ in range(200)]
+    assert picks.count("http://fast") > 180
+
+def test_hedged_read_returns_fastest_node():
+    pool = NodePool(["http://slow", "http://fast"], hedge_delay=0.01)
+
+    async def op(endpoint):
+        await asyncio.sleep(1.0 if endpoint.url == "http://slow" else 0.0)
+        return endpoint.url
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        result = await pool.hedged(op)
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "http://fast"
+    assert elapsed < 0.5
+
+def test_health_check_marks_lagging_node():
+    pool = NodePool(["http://a", "http://b", "http://c"], max_lag=100)
+    versions = {"http://a": 10_000, "http://b": 9_950}
+
+    async def probe(endpoint):
+        if endpoint.url not in versions:
+            raise ConnectionError("down")
+        return versions[endpoint.url]
+
+    asyncio.run(pool.check_health(probe))
+    assert [ep.healthy for ep in pool.endpoints] == [True, True, False]
+
+    versions["http://b"] = 9_000
+    asyncio.run(pool.check_health(probe))
+    assert [ep.url for ep in pool.ranked()] == ["http://a"]
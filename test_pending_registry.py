@@ -0,0 +1,64 @@
+import time
+from pending_registry import TimerWheel, PendingRegistry
+
+
+def test_wheel_fires_due_timers_and_supports_cancel():
+    wheel = TimerWheel(tick=1.0, slots=8, now=0)
+    wheel.schedule("a", 2.5)
+    wheel.schedule("b", 3.0)
+    wheel.schedule("c", 20.0)  # more than one revolution out
+    wheel.schedule("gone", 2.0)
+    assert wheel.cancel("gone")
+
+    assert wheel.advance(2.9) == []
+    assert wheel.advance(3.0) == ["a", "b"]
+    # c shares a slot with tick 4 but waits for its own round
+    assert wheel.advance(12.0) == []
+    assert wheel.advance(100.0) == ["c"]
+    assert len(wheel) == 0
+
+
+def test_timers_already_due_fire_on_next_advance():
+    wheel = TimerWheel(tick=1.0, slots=8, now=10.2)
+    wheel.schedule("late", 10.0, now=10.2)
+    assert wheel.advance(10.2) == ["late"]
+
+
+def test_stuck_expiry_and_resolution(clock):
+    expired = []
+    registry = PendingRegistry(on_expired=expired.append, grace=5, stuck_after=30, clock=clock)
+    registry.add("0x1", "alice", 0, expires_at=clock.now + 600)
+    registry.add("0x2", "alice", 1, expires_at=clock.now + 600)
+    registry.add("0x3", "bob", 7, expires_at=clock.now + 60)
+
+    clock.now += 31
+    registry.poll()
+    assert registry.stats()["stuck"] == 3
+
+    # Alice's account moved to sequence 1: only her first transaction executed
+    assert registry.resolve_sequence("alice", 1) == 1
+    assert registry.stats() == {"pending": 2, "stuck": 2, "expired": 0, "resolved": 1}
+
+    clock.now += 60
+    assert [entry["hash"] for entry in registry.poll()] == ["0x3"]
+    assert expired[0]["sender"] == "bob" and expired[0]["sequence_number"] == 7
+    assert registry.senders() == ["alice"]
+    assert registry.resolve("0x2")["sequence_number"] == 1
+    assert registry.stats() == {"pending": 0, "stuck": 0, "expired": 1, "resolved": 2}
+
+
+def test_hundreds_of_thousands_of_entries(clock):
+    clock.now = 0.0
+    registry = PendingRegistry(grace=0, stuck_after=0, clock=clock)
+    count = 200_000
+    start = time.perf_counter()
+    for i in range(count):
+        registry.add(f"0x{i:x}", f"sender{i % 100}", i // 100, expires_at=(i % 600) + 1)
+    for sender in range(0, 100, 2):
+        registry.resolve_sequence(f"sender{sender}", count)
+    expired = 0
+    for second in range(1, 602):
+        clock.now = second
+        expired += len(registry.poll())
+    assert expired == count // 2 and len(registry) == 0
+    assert time.perf_counter() - start < 20
@@ -0,0 +1,104 @@
+import time
+import tracemalloc
+from profiling import SamplingProfiler, RequestProfiles, start_tracemalloc, stop_tracemalloc, top_allocations
+
+
+def busy_wait(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def test_sampler_collects_collapsed_stacks():
+    profiler = SamplingProfiler()
+    profiler.start(seconds=5, interval=0.001)
+    busy_wait(0.2)
+    profiler.stop()
+
+    assert not profiler.running
+    assert profiler.samples > 0
+    lines = profiler.collapsed().splitlines()
+    assert any("busy_wait (test_profiling.py" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_collapsed_while_sampling():
+    profiler = SamplingProfiler()
+    profiler.start(seconds=5, interval=0.0005)
+    try:
+        # Reading while the sampler adds new stacks must not see the counter change size
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            profiler.collapsed()
+            busy_wait(0.0001)
+    finally:
+        profiler.stop()
+    assert profiler.collapsed()
+
+
+def test_sampler_stops_itself_after_duration():
+    profiler = SamplingProfiler()
+    profiler.start(seconds=0.05, interval=0.001)
+    time.sleep(0.3)
+    assert not profiler.running
+    assert profiler.status()["stopped_at"] is not None
+
+
+def test_request_profiles_one_at_a_time_and_bounded():
+    profiles = RequestProfiles(kept=2)
+    first = profiles.begin()
+    assert first is not None
+    assert profiles.begin() is None
+    busy_wait(0.01)
+    profile_id = profiles.end(first, "GET /progress/0x1")
+    assert "GET /progress/0x1" in profiles.get(profile_id)
+
+    for _ in range(2):
+        profiles.end(profiles.begin(), "GET /lessons")
+    assert profiles.get(profile_id) is None
+    assert len(profiles.ids()) == 2
+
+
+def test_top_allocations_reports_sites():
+    was_tracing = tracemalloc.is_tracing()
+    start_tracemalloc()
+    try:
+        data = [bytearray(1000) for _ in range(100)]
+        report = top_allocations(limit=5)
+        assert report["current_bytes"] > 0
+        assert len(report["top"]) <= 5
+        assert any("test_profiling.py" in site["site"] for site in report["top"])
+        del data
+    finally:
+        if not was_tracing:
+            stop_tracemalloc()
+
+
+def test_middleware_profiles_only_admin_requests():
+    import asyncio
+    from profiling import ProfileMiddleware
+
+    async def app(scope, receive, send):
+        busy_wait(0.01)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    profiles = RequestProfiles()
+    middleware = ProfileMiddleware(app, profiles, authorize=lambda token: token == "secret")
+
+    def request(*headers):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/x", "headers": list(headers)}
+        asyncio.run(middleware(scope, None, send))
+        return dict(sent[0]["headers"])
+
+    assert request() == {}
+    assert request((b"x-profile", b"1"), (b"x-admin-token", b"wrong")) == {}
+    headers = request((b"x-profile", b"1"), (b"x-admin-token", b"secret"))
+    assert profiles.ids() == [headers[b"x-profile-id"].decode()]
+    assert "GET /x" in profiles.get(profiles.ids()[0])
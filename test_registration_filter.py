@@ -0,0 +1,53 @@
+import time
+from registration_filter import BloomFilter, NegativeCache, RegistrationFilter, normalize_address
+
+def address(i):
+    return "0x" + format(i, "064x")
+
+def test_normalize_address():
+    assert normalize_address("0xABC") == "0x" + "0" * 61 + "abc"
+    assert normalize_address("abc") == normalize_address("0x0abc")
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(address(i))
+
+    assert all(address(i) in bloom for i in range(1000))
+    false_positives = sum(address(i) in bloom for i in range(1000, 11000))
+    assert false_positives < 300
+
+def test_negative_cache_expires_entries(clock):
+    cache = NegativeCache(ttl=30, clock=clock)
+    cache.add("0xa")
+
+    assert "0xa" in cache
+    clock.now += 30
+    assert "0xa" not in cache
+
+def test_registration_clears_negative_entry():
+    registration_filter = RegistrationFilter(use_bloom=False)
+    registration_filter.mark_unregistered("0xa")
+    assert registration_filter.known_unregistered("0xA")
+
+    registration_filter.on_registered("registered:0xa")
+    assert not registration_filter.known_unregistered("0xa")
+
+def test_bloom_answers_for_unknown_addresses_and_resizes():
+    registered = [address(i) for i in range(3)]
+    registration_filter = RegistrationFilter(source=lambda: registered, use_bloom=True)
+    registration_filter.load()
+
+    assert not registration_filter.known_unregistered(address(1))
+    assert registration_filter.known_unregistered(address(99))
+
+    registration_filter.bloom.capacity = 3
+    registered.append(address(99))
+    registration_filter.mark_registered(address(99))
+    # The resize reads the read model on a background thread
+    for _ in range(100):
+        if registration_filter.bloom.capacity >= 10000:
+            break
+        time.sleep(0.01)
+    assert registration_filter.bloom.capacity >= 10000
+    assert not registration_filter.known_unregistered(address(99))
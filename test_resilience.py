@@ -0,0 +1,130 @@
+import asyncio
+import random
+import pytest
+from resilience import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy, is_retryable
+from node_pool import NodePool
+
+def test_retryable_classification(api_error):
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ConnectionResetError())
+    assert is_retryable(api_error(503))
+    assert is_retryable(api_error(429))
+    assert not is_retryable(api_error(404))
+    assert not is_retryable(KeyError("data"))
+    assert not is_retryable(CircuitOpenError("http://a", 5))
+
+def test_breaker_opens_then_half_opens_after_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert not breaker.available()
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # A failed probe opens the breaker again straight away
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 30
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_breaker_admits_one_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.allow()
+    # Everyone else sees the breaker open while the probe is in flight
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow() and breaker.allow()
+
+def test_recovering_node_gets_one_probe_not_the_backlog(clock):
+    pool = NodePool(["http://a"], failure_threshold=1)
+    endpoint = pool.endpoints[0]
+    endpoint.breaker.clock = clock
+    endpoint.breaker.record_failure()
+    clock.now += 60
+    calls = []
+
+    async def op(endpoint):
+        calls.append(endpoint.url)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def burst():
+        return await asyncio.gather(*(pool.failover(op) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert calls == ["http://a"]
+    assert results.count("ok") == 1
+    assert all(isinstance(result, CircuitOpenError) for result in results if result != "ok")
+    assert endpoint.breaker.state == CircuitBreaker.CLOSED
+
+def test_retry_policy_retries_transient_errors_only(api_error):
+    policy = RetryPolicy(max_attempts=3, base_delay=0, rng=random.Random(1))
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise api_error(503)
+        return "ok"
+
+    assert asyncio.run(policy.call(flaky)) == "ok"
+    assert len(calls) == 3
+
+    def missing():
+        calls.append(1)
+        raise api_error(404)
+
+    calls.clear()
+    with pytest.raises(api_error):
+        policy.call_sync(missing)
+    assert len(calls) == 1
+
+def test_retry_budget_caps_retries():
+    policy = RetryPolicy(max_attempts=5, base_delay=0, budget=RetryBudget(ratio=0, min_tokens=2))
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        policy.call_sync(down)
+    with pytest.raises(ConnectionError):
+        policy.call_sync(down)
+    # Two retries in the budget: three attempts for the first call, one for the second
+    assert len(calls) == 4
+
+def test_pool_fails_fast_when_every_breaker_is_open(api_error):
+    pool = NodePool(["http://a"], failure_threshold=2)
+    calls = []
+
+    async def op(endpoint):
+        calls.append(endpoint.url)
+        raise api_error(503)
+
+    for _ in range(2):
+        with pytest.raises(api_error):
+            asyncio.run(pool.failover(op))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(pool.failover(op))
+    assert len(calls) == 2
+
+def test_client_errors_do_not_trip_breaker(api_error):
+    pool = NodePool(["http://a"], failure_threshold=1)
+
+    async def op(endpoint):
+        raise api_error(404)
+
+    with pytest.raises(api_error):
+        asyncio.run(pool.failover(op))
+    assert pool.endpoints[0].breaker.state == "closed"
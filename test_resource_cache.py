@@ -0,0 +1,98 @@
+import asyncio
+from resource_cache import ResourceCache
+
+class FakeNode:
+    def __init__(self):
+        self.sequence_number = 5
+        self.ledger_version = 100
+        self.value = 1
+        self.fetches = 0
+        self.probes = 0
+
+    async def fetch(self, address, resource_type, min_version):
+        self.fetches += 1
+        await asyncio.sleep(0)
+        return {"value": self.value}, self.ledger_version, self.sequence_number
+
+    async def probe(self, address, min_version):
+        self.probes += 1
+        return self.sequence_number, self.ledger_version
+
+def make_cache(clock, **kwargs):
+    node = FakeNode()
+    cache = ResourceCache(node.fetch, node.probe, revalidate_after=2, max_age=60, clock=clock, **kwargs)
+    return cache, node
+
+def test_fresh_entry_is_served_without_node_calls(clock):
+    cache, node = make_cache(clock)
+
+    async def run():
+        await cache.get("0xa", "Student")
+        return await cache.get("0xa", "Student")
+
+    assert asyncio.run(run()) == {"value": 1}
+    assert (node.fetches, node.probes) == (1, 0)
+
+def test_unchanged_sequence_revalidates_and_advances_version(clock):
+    cache, node = make_cache(clock)
+
+    async def run():
+        await cache.get("0xa", "Student")
+        clock.now += 3
+        node.ledger_version = 150
+        data = await cache.get("0xa", "Student", min_version=140)
+        return data, cache.stats()
+
+    data, stats = asyncio.run(run())
+    assert data == {"value": 1}
+    assert node.fetches == 1
+    assert stats["revalidations"] == 1
+
+def test_sequence_change_refetches(clock):
+    cache, node = make_cache(clock)
+
+    async def run():
+        await cache.get("0xa", "Student")
+        clock.now += 3
+        node.sequence_number, node.value = 6, 2
+        return await cache.get("0xa", "Student")
+
+    assert asyncio.run(run()) == {"value": 2}
+    assert node.fetches == 2
+
+def test_concurrent_misses_share_one_fetch(clock):
+    cache, node = make_cache(clock)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("0xa", "Student") for _ in range(10)))
+
+    assert asyncio.run(run()) == [{"value": 1}] * 10
+    assert node.fetches == 1
+
+def test_invalidate_drops_entries_for_address(clock):
+    cache, node = make_cache(clock)
+
+    async def run():
+        await cache.get("0xa", "Student")
+        await cache.get("0xb", "Student")
+        cache.invalidate("0xa")
+        await cache.get("0xa", "Student")
+        await cache.get("0xb", "Student")
+
+    asyncio.run(run())
+    assert node.fetches == 3
+
+def test_invalidate_only_discards_in_flight_fetches_of_that_address(clock):
+    cache, node = make_cache(clock)
+
+    async def run():
+        loads = [asyncio.ensure_future(cache.get(address, "Student")) for address in ("0xa", "0xb")]
+        await asyncio.sleep(0)
+        cache.invalidate("0xa")
+        await asyncio.gather(*loads)
+        await cache.get("0xa", "Student")
+        await cache.get("0xb", "Student")
+
+    asyncio.run(run())
+    # 0xa is fetched again; 0xb's fetch, in flight during the invalidation, was kept
+    assert node.fetches == 3 and cache.stats()["hits"] == 1
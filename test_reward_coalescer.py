@@ -0,0 +1,100 @@
+import time
+from reward_coalescer import RewardCoalescer
+from shared_state import SharedStore
+
+STUDENT = "0x" + "1" * 64
+SENDER = "0x" + "f" * 64
+
+def make_coalescer(clock, tmp_path, send_transfer, **kwargs):
+    coalescer = RewardCoalescer(SharedStore(str(tmp_path / "state.db")), send_transfer, clock=clock, **kwargs)
+    return coalescer
+
+def test_rewards_in_window_become_one_transfer(tmp_path, clock):
+    transfers = []
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: transfers.append(args) or "0xhash", window=60)
+
+    for lesson_id in range(5):
+        coalescer.record(STUDENT, SENDER, 2, lesson_id)
+    assert coalescer.flush_due() == []
+
+    clock.now += 60
+    results = coalescer.flush_due()
+
+    assert transfers == [(SENDER, STUDENT, 10)]
+    assert results[0]["lessons"] == [0, 1, 2, 3, 4]
+    assert coalescer.pending(STUDENT)["amount"] == 0
+
+def test_threshold_flushes_immediately(tmp_path, clock):
+    transfers = []
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: transfers.append(args) or "0xhash", window=3600, threshold=5)
+
+    coalescer.record(STUDENT, SENDER, 3)
+    assert transfers == []
+    coalescer.record(STUDENT, SENDER, 3)
+    assert transfers == [(SENDER, STUDENT, 6)]
+
+def test_failed_transfer_keeps_balance(tmp_path, clock):
+    def fail(*args):
+        raise ConnectionError("node down")
+
+    coalescer = make_coalescer(clock, tmp_path, fail, window=60)
+    coalescer.record(STUDENT, SENDER, 4, 1)
+
+    result = coalescer.flush(STUDENT)
+
+    assert result[0]["status"] == "failed"
+    pending = coalescer.pending(STUDENT)
+    assert pending["amount"] == 4
+    assert pending["lessons"] == [1]
+    assert pending["in_flight"] is None
+
+def test_pending_balance_survives_restart(tmp_path, clock):
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: "0xhash", window=60)
+    coalescer.record(STUDENT, SENDER, 7)
+
+    restarted = make_coalescer(clock, tmp_path, lambda *args: "0xhash", window=60)
+    assert restarted.pending(STUDENT)["amount"] == 7
+    assert restarted.flush()[0]["amount"] == 7
+
+def test_recover_returns_stuck_in_flight_balance(tmp_path, clock):
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: "0xhash", window=60)
+    coalescer.record(STUDENT, SENDER, 7)
+    # Simulate a crash after claiming the balance but before settling it
+    coalescer._claim(STUDENT)
+
+    assert coalescer.recover(older_than=300) == 0
+    clock.now += 300
+    assert coalescer.recover(older_than=300) == 1
+    assert coalescer.pending(STUDENT)["amount"] == 7
+
+def test_transfer_without_hash_keeps_balance(tmp_path, clock):
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: None, window=60)
+    coalescer.record(STUDENT, SENDER, 10)
+
+    result = coalescer.flush(STUDENT)
+
+    assert result[0]["status"] == "failed"
+    assert coalescer.pending(STUDENT)["amount"] == 10
+
+def test_balance_is_paid_from_its_first_sender(tmp_path, clock):
+    transfers = []
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: transfers.append(args) or "0xhash", window=60)
+    coalescer.record(STUDENT, SENDER, 1)
+    coalescer.record(STUDENT, "0x" + "e" * 64, 1)
+    coalescer.flush(STUDENT)
+    assert transfers == [(SENDER, STUDENT, 2)]
+
+def test_background_flush_pays_elapsed_windows(tmp_path, clock):
+    transfers = []
+    coalescer = make_coalescer(clock, tmp_path, lambda *args: transfers.append(args) or "0xhash", window=60)
+    coalescer.record(STUDENT, SENDER, 3)
+    clock.now += 60
+    coalescer.start(interval=0.01)
+    try:
+        for _ in range(200):
+            if transfers:
+                break
+            time.sleep(0.01)
+    finally:
+        coalescer.stop()
+    assert transfers == [(SENDER, STUDENT, 3)]
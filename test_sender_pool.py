@@ -0,0 +1,113 @@
+import pytest
+from sender_pool import SenderLane, SenderPool, NoSenderAvailable
+
+def make_pool(clock, count=3, **kwargs):
+    lanes = [SenderLane(None, f"0x{i}") for i in range(count)]
+    sequences = {lane.address: 10 * i for i, lane in enumerate(lanes)}
+    pool = SenderPool(lanes, sequences.__getitem__, clock=clock, **kwargs)
+    return pool, sequences
+
+def test_least_loaded_spreads_work_over_lanes(clock):
+    pool, _ = make_pool(clock)
+
+    chosen = [pool.choose().address for _ in range(6)]
+
+    assert sorted(chosen) == ["0x0", "0x0", "0x1", "0x1", "0x2", "0x2"]
+
+def test_round_robin_skips_unhealthy_lanes(clock):
+    pool, _ = make_pool(clock, strategy="round_robin")
+    pool.lanes[1].healthy = False
+
+    assert [pool.choose().address for _ in range(4)] == ["0x0", "0x2", "0x0", "0x2"]
+
+def test_sequence_numbers_are_tracked_per_lane(clock):
+    pool, _ = make_pool(clock, count=2)
+    first, second = pool.lanes
+
+    assert [pool.next_sequence(first) for _ in range(3)] == [0, 1, 2]
+    assert [pool.next_sequence(second) for _ in range(2)] == [10, 11]
+
+def test_failure_resyncs_and_benches_after_repeated_errors(clock):
+    pool, sequences = make_pool(clock, count=2, max_failures=2)
+    lane = pool.lanes[0]
+    pool.next_sequence(lane)
+    pool.next_sequence(lane)
+
+    sequences[lane.address] = 1
+    pool.release(lane, success=False, error=Exception("SEQUENCE_NUMBER_TOO_NEW"))
+    assert pool.next_sequence(lane) == 1
+    assert lane.healthy
+
+    pool.release(lane, success=False)
+    assert not lane.healthy
+    assert all(pool.choose() is pool.lanes[1] for _ in range(3))
+
+def test_resync_skips_sequence_numbers_still_in_mempool(clock):
+    from pending_registry import PendingRegistry
+    registry = PendingRegistry(clock=clock)
+    pool, sequences = make_pool(clock, count=1, outstanding=registry.highest_sequence)
+    lane = pool.lanes[0]
+    for _ in range(3):
+        sequence = pool.next_sequence(lane)
+        registry.add(f"0xhash{sequence}", lane.address, sequence, expires_at=clock.now + 600)
+
+    # The chain has executed none of them; a failed fourth submission must not reuse 0-2
+    pool.release(lane, success=False)
+    assert pool.next_sequence(lane) == 3
+    assert registry.highest_sequence("0x9") is None
+
+def test_no_lanes_in_rotation_raises(clock):
+    pool, _ = make_pool(clock, count=1)
+    pool.lanes[0].healthy = False
+
+    with pytest.raises(NoSenderAvailable):
+        pool.choose()
+
+def test_health_check_tops_up_low_lanes_and_readmits_them(clock):
+    balances = {"0x0": 5, "0x1": 500}
+    top_ups = []
+    pool, _ = make_pool(clock, count=2, get_balance=balances.__getitem__,
+                        top_up=lambda address, amount: top_ups.append((address, amount)),
+                        watermark=100, topup_amount=1000, max_failures=1)
+    pool.release(pool.lanes[1], success=False)
+
+    pool.check_health()
+
+    assert top_ups == [("0x0", 1000)]
+    assert pool.lanes[1].healthy
+
+def test_stuck_lane_leaves_rotation_until_work_drains(clock):
+    pool, _ = make_pool(clock, count=2, stuck_after=60)
+    stuck = pool.choose()
+
+    clock.now += 61
+    pool.check_health()
+    assert not stuck.healthy
+
+    pool.release(stuck, success=False)
+    pool.check_health()
+    assert stuck.healthy
+
+def test_workers_claim_disjoint_lanes(tmp_path):
+    import subprocess
+    import sys
+    from shared_state import SharedStore
+    from sender_pool import claim_worker_slot, release_worker_slot, lanes_for_worker
+
+    store = SharedStore(str(tmp_path / "state.db"))
+    # Slot 0 is held by a live process, slot 1 by one that has exited
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    store.put("sender_workers", "0", {"pid": 1})
+    store.put("sender_workers", "1", {"pid": dead.pid})
+
+    assert claim_worker_slot(store, 3) == 1
+    assert claim_worker_slot(store, 3) == 1
+    release_worker_slot(store, 1)
+    assert store.get("sender_workers", "1") is None
+
+    lanes = [SenderLane(None, f"0x{i}") for i in range(5)]
+    shares = [lanes_for_worker(lanes, index, 2) for index in range(2)]
+    assert [lane.address for lane in shares[0] + shares[1]] == ["0x0", "0x2", "0x4", "0x1", "0x3"]
+    with pytest.raises(ValueError):
+        lanes_for_worker(lanes, 0, 6)
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("aptos_sdk")
+from fastapi.testclient import TestClient
+import server
+from registration_filter import RegistrationFilter
+from resource_cache import ResourceCache
+
+STUDENTS = {f"0x{i:064x}": i for i in range(1, 7)}
+MISSING = f"0x{99:064x}"
+NOT_A_STUDENT = f"0x{98:064x}"
+
+class NotFound(Exception):
+    status_code = 404
+
+class FakeNode:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.fetches = []
+        self.probes = 0
+
+    async def fetch(self, address, resource_type, min_version):
+        self.fetches.append(address)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if address == MISSING:
+            raise NotFound("Account not found")
+        resources = []
+        if address in STUDENTS:
+            resources.append({"type": f"{server.MODULE_ADDRESS}::{server.MODULE_NAME}::Student",
+                              "data": {"lessons_completed": [STUDENTS[address]], "total_rewards": "10"}})
+        return resources, 100, 0
+
+    async def probe(self, address, min_version):
+        self.probes += 1
+        return 0, 100
+
+@pytest.fixture
+def progress_client(monkeypatch):
+    node = FakeNode()
+    cache = ResourceCache(node.fetch, node.probe, revalidate_after=60)
+    clients = SimpleNamespace(resources=cache,
+                              cached_account_resources=lambda address, min_version=None: cache.get(address, "*", min_version))
+    monkeypatch.setattr(server, "clients", clients)
+    monkeypatch.setattr(server, "registration_filter", RegistrationFilter(use_bloom=False))
+    monkeypatch.setattr(server, "PROGRESS_BATCH_CONCURRENCY", 2)
+    # No lifespan: the tracker and health checks are not started
+    return TestClient(server.app), node
+
+def test_progress_batch(progress_client):
+    client, node = progress_client
+    students = list(STUDENTS)
+    addresses = students + [MISSING, students[0], NOT_A_STUDENT, students[0][2:].upper()]
+
+    response = client.post("/progress/batch", json={"addresses": addresses})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    # One result per requested address, in request order; duplicates are read once
+    assert [result["address"] for result in results] == students + [MISSING, students[0], NOT_A_STUDENT, students[0]]
+    assert [result["status"] for result in results] == ["ok"] * 6 + ["not_found", "ok", "not_found", "ok"]
+    assert results[2]["lessons_completed"] == [3]
+    assert sorted(node.fetches) == sorted(students + [MISSING, NOT_A_STUDENT])
+    assert node.peak == 2
+
+    # Cached students and known non-students cost no node request
+    response = client.post("/progress/batch", json={"addresses": addresses})
+    assert response.json()["results"] == results
+    assert len(node.fetches) == 8 and node.probes == 0
+
+def test_progress_batch_size_limit(progress_client, monkeypatch):
+    client, _ = progress_client
+    monkeypatch.setattr(server, "PROGRESS_BATCH_MAX", 2)
+    response = client.post("/progress/batch", json={"addresses": list(STUDENTS)[:3]})
+    assert response.status_code == 400
+
+def test_open_circuit_on_submit_is_503(monkeypatch):
+    from aptos_sdk.account import Account
+    from resilience import CircuitOpenError
+
+    async def sign_and_submit(account, payload):
+        raise CircuitOpenError("all nodes", 4.2)
+
+    monkeypatch.setattr(server, "clients", SimpleNamespace(sign_and_submit=sign_and_submit))
+    monkeypatch.setattr(server, "MODULE_ADDRESS", "0x1")
+    body = {"student_address": f"0x{1:064x}", "public_key": Account.generate().private_key.hex(),
+            "message": "", "signature": "", "network": "devnet"}
+    response = TestClient(server.app).post("/register", json=body)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+def test_socket_answers_malformed_messages_with_an_error():
+    with TestClient(server.app).websocket_connect("/ws") as websocket:
+        for message in ("[]", '"x"', "1", '{"tx": "0xabc"}', "not json"):
+            websocket.send_text(message)
+            assert websocket.receive_json()["type"] == "error"
+        # The socket still follows well-formed requests
+        websocket.send_json({"tx": ["0xabc"]})
+        assert websocket.receive_json() == {"type": "error", "topic": "tx:0xabc", "error": "Transaction is not tracked"}
@@ -0,0 +1,85 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sharded_store import ShardedStore
+
+STUDENTS = ["0x" + format(i, "064x") for i in range(1, 17)]
+SENDER = "0x" + "f" * 64
+
+
+def test_mapping_operations_and_companion_locks():
+    store = ShardedStore(shards=8)
+    store["0xAB"] = {"n": 1}
+    assert "0xAB" in store and store.get("0xAB") == {"n": 1}
+    assert store.setdefault("0xAB", {"n": 2}) == {"n": 1}
+    assert len(store) == 1 and store.keys() == ["0xAB"]
+
+    completions = store.companion(shard_key=lambda key: key[0])
+    # The same address maps to the same lock in both stores
+    assert completions.lock_for(("0xAB", 3)) is store.lock_for("0xAB")
+    assert store.pop("0xAB") == {"n": 1} and store.get("0xAB") is None
+
+
+@pytest.fixture
+def frequent_switches():
+    # Switch threads as often as possible to shake out check-then-act races
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_locked_check_then_act_is_exactly_once(frequent_switches):
+    store = ShardedStore(shards=4)
+    winners = []
+
+    def claim(key):
+        with store.lock_for(key):
+            if key in store:
+                return
+            store[key] = threading.get_ident()
+        winners.append(key)
+
+    keys = [f"0x{i % 50}" for i in range(5000)]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        list(pool.map(claim, keys))
+    assert sorted(winners) == sorted(set(keys))
+
+
+@pytest.mark.parametrize("private_key", [None, "simulated"])
+def test_concurrent_completions_are_exactly_once(frequent_switches, private_key):
+    pytest.importorskip("requests")
+    pytest.importorskip("nacl")
+    from blockchain_manager import BlockchainManager
+
+    # With a private key every completion also commits on the ledger simulator
+    manager = BlockchainManager()
+    for lesson_id in range(1, 6):
+        manager.create_lesson(lesson_id, f"Lesson {lesson_id}", "", 10, private_key)
+    for student in STUDENTS:
+        manager.register_student(student, private_key)
+
+    def complete(job):
+        student, lesson_id = job
+        try:
+            result = manager.complete_lesson(student, SENDER, lesson_id, 10, private_key)
+            assert result["status"] != "failed", result
+            return job
+        except ValueError:
+            manager.get_student_progress(student)
+            return None
+
+    # Every (student, lesson) pair is attempted 20 times from 64 threads
+    jobs = [(student, lesson_id) for _ in range(20) for student in STUDENTS for lesson_id in range(1, 6)]
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        successes = [job for job in pool.map(complete, jobs) if job is not None]
+
+    assert len(successes) == len(set(successes)) == len(STUDENTS) * 5
+    for student in STUDENTS:
+        progress = manager.get_student_progress(student)
+        assert sorted(progress["lessons_completed"]) == [1, 2, 3, 4, 5]
+        assert progress["total_rewards"] == 50
+    assert len(manager.completed_lessons) == len(STUDENTS) * 5
+    if private_key:
+        assert manager.simulator.stats()["committed"] == 5 + len(STUDENTS) * 6
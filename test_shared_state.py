@@ -0,0 +1,51 @@
+import multiprocessing
+from shared_state import SharedStore, InvalidationChannel
+
+def increment(path, times):
+    store = SharedStore(path)
+    for _ in range(times):
+        store.update("counters", "completions", lambda value: (value or 0) + 1)
+
+def test_shared_dict_view(tmp_path):
+    students = SharedStore(str(tmp_path / "state.db")).namespace("students")
+    students["0xa"] = {"lessons_completed": 0}
+
+    assert "0xa" in students
+    assert students["0xa"] == {"lessons_completed": 0}
+    assert list(students) == ["0xa"]
+    assert len(students) == 1
+    del students["0xa"]
+    assert "0xa" not in students
+
+def test_insert_is_first_writer_wins(tmp_path):
+    store = SharedStore(str(tmp_path / "state.db"))
+    assert store.insert("students", "0xa", {"n": 1})
+    assert not store.insert("students", "0xa", {"n": 2})
+    assert store.get("students", "0xa") == {"n": 1}
+
+def test_updates_from_several_processes_are_not_lost(tmp_path):
+    path = str(tmp_path / "state.db")
+    SharedStore(path).put("counters", "completions", 0)
+
+    processes = [multiprocessing.Process(target=increment, args=(path, 50)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert SharedStore(path).get("counters", "completions") == 200
+
+def test_invalidations_reach_other_workers(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a = InvalidationChannel(SharedStore(path))
+    worker_b = InvalidationChannel(SharedStore(path))
+    seen = []
+    worker_b.subscribe("progress:", seen.append)
+    worker_b.poll()
+
+    worker_a.publish("progress:0xa")
+    worker_a.publish("lessons:1")
+
+    assert worker_b.poll() == ["progress:0xa", "lessons:1"]
+    assert seen == ["progress:0xa"]
+    assert worker_b.poll() == []
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from signing_service import SigningService, sign_messages, sign_payloads, sign_raw_transactions
+
+nacl_signing = pytest.importorskip("nacl.signing")
+
+PRIVATE_KEY = "0x" + "11" * 32
+
+
+@pytest.fixture
+def service():
+    service = SigningService(max_workers=2, private_keys=[PRIVATE_KEY], min_batch=4)
+    yield service
+    service.close()
+
+
+def test_pool_results_match_in_process_and_keep_order(service):
+    payloads = [{"function": "0x1::coin::transfer", "arguments": ["0x2", str(i)]} for i in range(50)]
+    assert service.map(sign_payloads, PRIVATE_KEY, payloads) == sign_payloads(PRIVATE_KEY, payloads)
+
+    messages = [str(i).encode() for i in range(50)]
+    verify_key = nacl_signing.SigningKey(bytes.fromhex(PRIVATE_KEY[2:])).verify_key
+    for message, signature in zip(messages, service.map(sign_messages, PRIVATE_KEY, messages)):
+        assert verify_key.verify(message, signature) == message
+
+
+def test_small_batches_skip_the_pool(service):
+    assert service.map(sign_messages, PRIVATE_KEY, [b"a", b"b"]) == sign_messages(PRIVATE_KEY, [b"a", b"b"])
+    assert service._executor is None
+
+
+def test_async_signing_of_raw_transactions(service):
+    pytest.importorskip("aptos_sdk")
+    from aptos_sdk.account import Account
+    from aptos_sdk.bcs import Deserializer, Serializer
+    from aptos_sdk.transactions import (
+        EntryFunction, RawTransaction, SignedTransaction, TransactionArgument, TransactionPayload
+    )
+
+    account = Account.load_key(PRIVATE_KEY)
+    payload = TransactionPayload(EntryFunction.natural(
+        "0x1::aptos_account", "transfer", [],
+        [TransactionArgument(account.address(), Serializer.struct), TransactionArgument(1, Serializer.u64)]
+    ))
+    raw = [RawTransaction(account.address(), n, payload, 2000, 100, 1_900_000_000, 4) for n in range(10)]
+
+    signed = asyncio.run(service.amap(sign_raw_transactions, PRIVATE_KEY, raw))
+    for sequence_number, data in enumerate(signed):
+        transaction = SignedTransaction.deserialize(Deserializer(data))
+        assert transaction.transaction.sequence_number == sequence_number
+        assert transaction.verify()
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from shared_state import SharedStore
+from student_onboarding import (
+    ALREADY_REGISTERED, Checkpoint, Onboarder, chain_registrar, normalize_roster, onboard_roster, simulated_registrar
+)
+
+def write_roster(path, addresses):
+    pd.DataFrame({"address": addresses}).to_csv(path, index=False)
+
+def test_normalize_roster_dedupes_across_chunks():
+    seen = set()
+    students, errors = normalize_roster(pd.DataFrame({"address": ["0xAB", " ab ", "zz", ""]}), 0, seen)
+    assert [s["address"] for s in students] == ["0x" + "0" * 62 + "ab"]
+    assert errors == [(1, "duplicate address"), (2, "invalid address"), (3, "invalid address")]
+
+    students, errors = normalize_roster(pd.DataFrame({"address": ["0x00ab", "0x1"]}), 4, seen)
+    assert [s["row"] for s in students] == [5]
+    assert errors == [(4, "duplicate address")]
+
+def test_rerun_skips_completed_rows(tmp_path):
+    roster = tmp_path / "roster.csv"
+    write_roster(roster, [hex(i) for i in range(1, 11)] + ["0x1"])
+    store = SharedStore(str(tmp_path / "state.db"))
+    calls = []
+
+    def register(student):
+        calls.append(student["address"])
+        return f"0xhash{len(calls)}"
+
+    checkpoint = Checkpoint(str(tmp_path / "roster.checkpoint.json"))
+    checkpoint.rows_done = 4
+    onboarder = Onboarder(register, store, workers=4)
+    try:
+        result = onboard_roster(str(roster), onboarder, checkpoint, chunk_size=3, report=lambda line: None)
+    finally:
+        onboarder.close()
+
+    # Rows 0-3 were done before; the trailing 0x1 is still a duplicate of row 0
+    assert result["registered"] == 6
+    assert result["errors"] == [(10, "duplicate address")]
+    assert sorted(calls) == sorted(f"0x{i:064x}" for i in range(5, 11))
+    assert store.count("students") == 6
+    assert Checkpoint(checkpoint.path).rows_done == 11
+
+    onboarder = Onboarder(register, store, workers=4)
+    checkpoint.rows_done = 0
+    try:
+        result = onboard_roster(str(roster), onboarder, checkpoint, chunk_size=3, report=lambda line: None)
+    finally:
+        onboarder.close()
+    assert result["registered"] == 4
+    assert result["already_registered"] == 6
+
+def test_simulated_onboarding(tmp_path):
+    pytest.importorskip("requests")
+    pytest.importorskip("nacl")
+    from blockchain_manager import BlockchainManager
+
+    roster = tmp_path / "roster.csv"
+    write_roster(roster, [hex(i) for i in range(1, 21)])
+    manager = BlockchainManager()
+    manager.register_student("0x" + "0" * 63 + "1")
+    onboarder = Onboarder(simulated_registrar(manager), workers=8)
+    try:
+        result = onboard_roster(str(roster), onboarder, Checkpoint(str(tmp_path / "cp.json")), report=lambda line: None)
+    finally:
+        onboarder.close()
+
+    assert result["registered"] == 19
+    assert result["already_registered"] == 1
+    assert result["errors"] == []
+    assert len(manager.students) == 20
+
+def test_failed_registration_is_reported(tmp_path):
+    roster = tmp_path / "roster.csv"
+    write_roster(roster, ["0x1", "0x2"])
+
+    def register(student):
+        if student["address"].endswith("2"):
+            raise RuntimeError("node unavailable")
+        return ALREADY_REGISTERED
+
+    onboarder = Onboarder(register, workers=2)
+    try:
+        result = onboard_roster(str(roster), onboarder, Checkpoint(str(tmp_path / "cp.json")), report=lambda line: None)
+    finally:
+        onboarder.close()
+    assert result["already_registered"] == 1
+    assert result["errors"] == [(1, "registration failed: node unavailable")]
+    # The failed row is retried by the next run
+    assert Checkpoint(str(tmp_path / "cp.json")).rows_done == 1
+
+def test_chain_registrar_treats_existing_student_as_registered():
+    address = "0x" + "0" * 63 + "a"
+
+    class FakeManager:
+        on_chain = False
+
+        def create_account_from_private_key(self, private_key):
+            return SimpleNamespace(address=lambda: address)
+
+        def get_student_progress(self, student_address):
+            return {"success": self.on_chain}
+
+        def register_student(self, student_address, private_key):
+            return {"success": False, "error": "Move abort: RESOURCE_ALREADY_EXISTS - 0xhash"}
+
+    manager = FakeManager()
+    register = chain_registrar(manager)
+    student = {"row": 0, "address": address, "private_key": "0xkey"}
+    # Registered between the check and the transaction: the abort counts as done
+    assert register(student) == ALREADY_REGISTERED
+    manager.on_chain = True
+    assert register(student) == ALREADY_REGISTERED
+    assert register(dict(student, private_key=None)) is None
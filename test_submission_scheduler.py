@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from submission_scheduler import (
+    AIMDLimiter, SubmissionScheduler, QueueFullError, is_overload_error,
+    PRIORITY_STUDENT, PRIORITY_BULK
+)
+
+def test_overload_classification(api_error):
+    assert is_overload_error(api_error(429))
+    assert is_overload_error(api_error(400, "mempool_is_full"))
+    assert not is_overload_error(api_error(400, "SEQUENCE_NUMBER_TOO_OLD"))
+
+def test_aimd_limit_grows_and_halves():
+    async def run():
+        limiter = AIMDLimiter(initial=4, max_limit=10)
+        for _ in range(8):
+            await limiter.acquire()
+            limiter.release()
+        grown = limiter.limit
+        await limiter.acquire()
+        limiter.release(overloaded=True)
+        return grown, limiter.limit
+
+    grown, backed_off = asyncio.run(run())
+    assert 5 < grown < 7
+    assert backed_off == pytest.approx(grown / 2)
+
+def test_limiter_serves_waiters_by_priority():
+    async def run():
+        limiter = AIMDLimiter(initial=1)
+        order = []
+        await limiter.acquire()
+
+        async def wait(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+            limiter.release()
+
+        tasks = [asyncio.ensure_future(wait("bulk", PRIORITY_BULK)),
+                 asyncio.ensure_future(wait("student", PRIORITY_STUDENT))]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["student", "bulk"]
+
+def test_sender_queue_runs_in_order_and_rejects_when_full():
+    async def run():
+        scheduler = SubmissionScheduler(max_queue=2)
+        gate = asyncio.Event()
+        order = []
+
+        def job(name):
+            async def op():
+                await gate.wait()
+                order.append(name)
+                return name
+            return op
+
+        first = asyncio.ensure_future(scheduler.submit("0xa", job("a1")))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(scheduler.submit("0xa", job(name), PRIORITY_BULK)) for name in ("a2", "a3")]
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError) as excinfo:
+            await scheduler.submit("0xa", job("a4"))
+        assert excinfo.value.retry_after >= 1
+
+        # Other senders have their own queue
+        other = asyncio.ensure_future(scheduler.submit("0xb", job("b1")))
+        gate.set()
+        results = await asyncio.gather(first, *queued, other)
+        return results, order
+
+    results, order = asyncio.run(run())
+    assert results == ["a1", "a2", "a3", "b1"]
+    assert [name for name in order if name.startswith("a")] == ["a1", "a2", "a3"]
+
+def test_errors_reach_the_caller_and_back_off(api_error):
+    async def run():
+        scheduler = SubmissionScheduler(limiter=AIMDLimiter(initial=8))
+
+        async def op():
+            raise api_error(429, "rate limited")
+
+        with pytest.raises(api_error):
+            await scheduler.submit("0xa", op)
+        return scheduler.limiter.limit
+
+    assert asyncio.run(run()) == 4
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from tx_tracker import TransactionTracker, PENDING, COMMITTED, FAILED
+
+def make_fetcher(responses, calls):
+    """Fake node lookup returning canned transaction JSON per hash"""
+    async def fetch(txn_hash):
+        calls.append(txn_hash)
+        return responses.get(txn_hash)
+    return fetch
+
+def test_poll_once_resolves_committed_and_failed():
+    responses = {
+        "0xaa": {"type": "user_transaction", "success": True, "vm_status": "Executed successfully"},
+        "0xbb": {"type": "user_transaction", "success": False, "vm_status": "Move abort"},
+        "0xcc": {"type": "pending_transaction"}
+    }
+    calls = []
+    tracker = TransactionTracker(make_fetcher(responses, calls))
+    for txn_hash in responses:
+        tracker.track(txn_hash, txn_hash)
+
+    asyncio.run(tracker.poll_once())
+
+    assert tracker.status("0xaa")["status"] == COMMITTED
+    assert tracker.status("0xbb")["status"] == FAILED
+    assert tracker.status("0xbb")["vm_status"] == "Move abort"
+    assert tracker.status("0xcc")["status"] == PENDING
+    assert tracker.pending() == ["0xcc"]
+
+def test_resolved_transactions_are_not_polled_again():
+    responses = {"0xaa": {"type": "user_transaction", "success": True}}
+    calls = []
+    tracker = TransactionTracker(make_fetcher(responses, calls))
+    tracker.track("0xaa")
+
+    asyncio.run(tracker.poll_once())
+    asyncio.run(tracker.poll_once())
+
+    assert calls == ["0xaa"]
+
+def test_unknown_transaction_times_out():
+    tracker = TransactionTracker(make_fetcher({}, []), timeout=0)
+    tracker.track("0xdd")
+
+    asyncio.run(tracker.poll_once())
+
+    assert tracker.status("0xdd")["status"] == FAILED
+
+def test_statuses_keep_request_order():
+    tracker = TransactionTracker(make_fetcher({}, []))
+    for txn_hash in ["0x3", "0x1", "0x2"]:
+        tracker.track(txn_hash)
+
+    assert [entry["hash"] for entry in tracker.statuses(["0x2", "0x3", "0x9"])] == ["0x2", "0x3"]
+
+def test_expired_transactions_fail_and_reach_the_handler():
+    expired = []
+    tracker = TransactionTracker(make_fetcher({}, []), on_expired=expired.append)
+    tracker.track("0xee", "Reward")
+    # Sender, sequence number and expiry arrive from the signing path
+    tracker.track("0xee", sender="0xabc", sequence_number=4, expires_at=time.time() - 60)
+
+    asyncio.run(tracker.poll_once())
+
+    assert tracker.status("0xee")["status"] == FAILED
+    assert tracker.status("0xee")["vm_status"] == "Transaction expired"
+    assert expired[0]["sender"] == "0xabc" and expired[0]["sequence_number"] == 4
+    assert tracker.stats()["expired"] == 1 and tracker.stats()["pending"] == 0
+
+def test_poll_once_bounds_node_reads_in_flight():
+    in_flight, peak = [0], [0]
+
+    async def fetch(txn_hash):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.001)
+        in_flight[0] -= 1
+        return {"type": "user_transaction", "success": True, "version": "1"}
+
+    tracker = TransactionTracker(fetch, poll_concurrency=4)
+    for i in range(50):
+        tracker.track(f"0x{i}")
+    asyncio.run(tracker.poll_once())
+    assert peak[0] == 4
+    assert tracker.pending() == [] and len(tracker) == 50
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import threading
+import time
+from app_logging import get_logger
+from pending_registry import PendingRegistry, PENDING_EXPIRY_GRACE
+
+logger = get_logger(__name__)
+
+# Node reads in flight during one poll pass
+TRACKER_POLL_CONCURRENCY = int(os.getenv("TRACKER_POLL_CONCURRENCY", "32"))
+
+# Transaction states reported by the tracker
+PENDING = "pending"
+COMMITTED = "committed"
+FAILED = "failed"
+
+
+class TransactionTracker:
+    """Poll confirmations for every pending transaction in one background loop"""
+
+    def __init__(self, fetch_transaction, poll_interval: float = 1.0, timeout: float = 120.0, on_expired=None,
+                 poll_concurrency: int = TRACKER_POLL_CONCURRENCY):
+        # fetch_transaction(txn_hash) is a coroutine returning the node's
+        # transaction JSON, or None while the node does not know the hash yet
+        self.fetch_transaction = fetch_transaction
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.poll_concurrency = poll_concurrency
+        # on_expired(entry) decides what to do about a dropped transaction (resubmit, resync)
+        self.on_expired = on_expired
+        # Expiry deadlines live on a timer wheel instead of being checked per poll
+        self.registry = PendingRegistry(on_expired=self._expired, grace=0)
+        self._transactions = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def track(self, txn_hash: str, label: str = "", sender: str = None, sequence_number: int = None,
+              expires_at: float = None) -> dict:
+        """Start tracking a submitted transaction; later calls may fill in its label and expiry
+
+        Without expires_at (the transaction's expiration_timestamp_secs) it
+        fails after the tracker's timeout.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._transactions.get(txn_hash)
+            if entry is None:
+                entry = self._transactions[txn_hash] = {
+                    "hash": txn_hash,
+                    "label": label,
+                    "status": PENDING,
+                    "submitted_at": now,
+                    "updated_at": now,
+                    "vm_status": None,
+                    "version": None,
+                    "sender": sender,
+                    "sequence_number": sequence_number,
+                    "expires_at": expires_at
+                }
+                schedule = True
+            else:
+                entry["label"] = entry["label"] or label
+                entry["sender"] = entry["sender"] or sender
+                if sequence_number is not None:
+                    entry["sequence_number"] = sequence_number
+                if expires_at is not None:
+                    entry["expires_at"] = expires_at
+                schedule = expires_at is not None and entry["status"] == PENDING
+            if schedule:
+                if entry["expires_at"] is not None:
+                    deadline = entry["expires_at"] + PENDING_EXPIRY_GRACE
+                else:
+                    deadline = entry["submitted_at"] + self.timeout
+                self.registry.add(txn_hash, entry["sender"], entry["sequence_number"], deadline,
+                                  label=entry["label"], has_expiry=entry["expires_at"] is not None)
+            return dict(entry)
+
+    def add_listener(self, callback):
+        """Call callback(entry) whenever a transaction commits or fails"""
+        self._listeners.append(callback)
+
+    def status(self, txn_hash: str):
+        """Get the current state of a tracked transaction"""
+        with self._lock:
+            entry = self._transactions.get(txn_hash)
+            return dict(entry) if entry else None
+
+    def statuses(self, txn_hashes) -> list:
+        """Get the current state of several tracked transactions, in order"""
+        with self._lock:
+            return [dict(self._transactions[h]) for h in txn_hashes if h in self._transactions]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._transactions)
+
+    def pending(self) -> list:
+        """Hashes that have not committed or failed yet"""
+        with self._lock:
+            return [h for h, entry in self._transactions.items() if entry["status"] == PENDING]
+
+    def forget(self, txn_hash: str):
+        """Stop tracking a transaction"""
+        with self._lock:
+            self._transactions.pop(txn_hash, None)
+            self.registry.resolve(txn_hash)
+
+    def _update(self, txn_hash: str, status: str, vm_status=None, version=None):
+        with self._lock:
+            entry = self._transactions.get(txn_hash)
+            if entry is None or entry["status"] != PENDING:
+                return
+            self.registry.resolve(txn_hash)
+            entry["status"] = status
+            entry["vm_status"] = vm_status
+            entry["version"] = version
+            entry["updated_at"] = time.time()
+            entry = dict(entry)
+        for callback in self._listeners:
+            try:
+                callback(entry)
+            except Exception:
+                logger.exception("Transaction listener failed")
+
+    def _expired(self, entry: dict):
+        if entry.get("has_expiry"):
+            self._update(entry["hash"], FAILED, "Transaction expired")
+        else:
+            self._update(entry["hash"], FAILED, "Transaction confirmation timeout")
+        if self.on_expired is not None:
+            self.on_expired(entry)
+
+    async def _check(self, txn_hash: str, limit: asyncio.Semaphore):
+        try:
+            async with limit:
+                txn = await self.fetch_transaction(txn_hash)
+        except Exception:
+            # Transient node errors keep the transaction pending
+            txn = None
+
+        if txn is None or txn.get("type") == "pending_transaction":
+            # Expiry is handled by the registry's timer wheel
+            return
+
+        version = int(txn["version"]) if txn.get("version") is not None else None
+        if txn.get("success", False):
+            self._update(txn_hash, COMMITTED, txn.get("vm_status"), version)
+        else:
+            self._update(txn_hash, FAILED, txn.get("vm_status", "Transaction failed"), version)
+
+    async def poll_once(self):
+        """Check every pending transaction once, then expire the ones past their deadline"""
+        pending = self.pending()
+        if pending:
+            # At most poll_concurrency node reads at once, however many hashes are pending
+            limit = asyncio.Semaphore(self.poll_concurrency)
+            await asyncio.gather(*(self._check(h, limit) for h in pending))
+        self.registry.poll()
+
+    def stats(self) -> dict:
+        """Pending, stuck and expired transaction counts"""
+        return self.registry.stats()
+
+    async def run(self):
+        """Poll pending transactions until stopped"""
+        self._stopped = False
+        while not self._stopped:
+            await self.poll_once()
+            await asyncio.sleep(self.poll_interval)
+
+    def stop(self):
+        """Ask the poll loop to exit after its current pass"""
+        self._stopped = True